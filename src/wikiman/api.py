@@ -1,10 +1,12 @@
 """Main API for `wikiman`."""
 
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from markdown import Markdown
+from wikiman import common, family, names, scanner, transaction, tree, utils
 
-from wikiman import common, family, utils
+if TYPE_CHECKING:
+    from wikiman import links
 
 # * -------------------------------------------------------------------------------- * #
 # * FILE OPERATIONS
@@ -14,29 +16,181 @@ from wikiman import common, family, utils
 #     pass
 
 
-def move_page(page: Path, under: Path, position: int) -> None:
-    """Change the position of a page."""
+def create_page(page: Path) -> None:
+    """Create a page that has been initialized but does not exist yet."""
 
-    new_page = utils.init_page(page.stem, under, position)
-    new_page.parent.mkdir()
-    page.rename(new_page)
+    page.parent.mkdir()
+    page.touch()
+    tree.reset()
+
+
+def add_page(name: str, under: Path, position: Optional[int] = None) -> Path:
+    """Add a page under a page, after its other children unless given a position.
+
+    The directories of the pages after it are renumbered in one planned transaction,
+    with a single rename each.
+    """
+
+    check_new_name(name)
+    children = family.get_children(under)
+    position = len(children) if position is None else min(position, len(children))
+    page = utils.init_page(name, under, position)
+
+    plan = transaction.Plan(common.get_context().root)
+    plan.arrange(under, [*children[:position], page, *children[position:]])
+    plan.create(page)
+    plan.execute()
+    tree.reset()
+    return page
+
+
+def move_page(page: Path, under: Path, position: Optional[int] = None) -> Path:
+    """Move a page and its subpages under a page, at a position or after the others.
+
+    The directory of the page is renamed once, carrying its subpages along, and only
+    the pages after it in its old and new places are renumbered.
+    """
+
+    wiki_tree = tree.get_wiki_tree()
+    check_not_root(page)
+    if under == page or under.parent.is_relative_to(page.parent):
+        raise ValueError("Can't move a page under itself.")
+
+    old_parent = wiki_tree.get_parent(page)
+    old_siblings = [child for child in family.get_children(old_parent) if child != page]
+    children = old_siblings if under == old_parent else family.get_children(under)
+    position = len(children) if position is None else min(position, len(children))
+
+    plan = transaction.Plan(common.get_context().root)
+    if under != old_parent:
+        plan.arrange(old_parent, old_siblings)
+    plan.arrange(under, [*children[:position], page, *children[position:]])
+    plan.execute()
+    tree.reset()
+    return plan.locate(page)
+
+
+def rename_page(
+    page: Path, name: str, rewrite_links: bool = False, jobs: Optional[int] = None
+) -> Path:
+    """Rename a page, keeping its position and subpages.
+
+    Pass `rewrite_links` to point the links to the page at its new name once it is
+    renamed, see `update_links`. The pages linking to it are found first, but only
+    rewritten if the rename succeeds. Moving a page keeps its name, so its links never
+    need rewriting.
+    """
+
+    wiki_tree = tree.get_wiki_tree()
+    check_not_root(page)
+    check_new_name(name, page)
+    new_page = utils.init_page(
+        name, wiki_tree.get_parent(page), wiki_tree.get_position(page)
+    )
+    linking_pages = get_linking_pages(page, jobs) if rewrite_links else []
+
+    plan = transaction.Plan(common.get_context().root)
+    plan.rename({page.parent: new_page.parent})
+    plan.rename({plan.locate(page): new_page})
+    plan.execute()
+    tree.reset()
+    if linking_pages:
+        from wikiman import links
+
+        new_pages = [plan.locate(linking_page) for linking_page in linking_pages]
+        links.rewrite_pages(new_pages, page.stem, new_page.stem)
+    return new_page
 
 
 def remove_page(page: Path) -> None:
-    """Remove a page."""
+    """Remove a page and its subpages, and renumber the pages after it."""
 
-    page_dir = page.parent
-    page.unlink()
-    for file in [common.SIDEBAR_FILENAME, common.FOOTER_FILENAME]:
-        (page_dir / file).unlink(missing_ok=True)
-    page_dir.rmdir()
+    wiki_tree = tree.get_wiki_tree()
+    check_not_root(page)
+    parent = wiki_tree.get_parent(page)
+    siblings = [child for child in family.get_children(parent) if child != page]
 
+    plan = transaction.Plan(common.get_context().root)
+    plan.remove(page)
+    plan.arrange(parent, siblings)
+    plan.execute()
+    tree.reset()
 
-def create_page(page: Path) -> None:
-    """Create a page that has been initialized but does not exist yet."""
 
-    page.parent.mkdir()
-    page.touch()
+def check_not_root(page: Path) -> None:
+    """Check that a page isn't the home page, which can't be moved or removed."""
+
+    if page == tree.get_wiki_tree().root_page:
+        raise ValueError("The home page can't be moved, renamed, or removed.")
+
+
+def check_new_name(name: str, page: Optional[Path] = None) -> None:
+    """Check that no other page has a name. Page names are unique in GitHub wikis."""
+
+    try:
+        existing_page = utils.find_page(name)
+    except names.PageNotFoundError:
+        return
+    except names.AmbiguousPageError as exception:
+        raise ValueError(f"Pages named '{name}' already exist.") from exception
+    if existing_page != page:
+        raise ValueError(f"A page named '{name}' already exists: {existing_page}")
+
+
+def resume_edit() -> bool:
+    """Finish an interrupted edit of the wiki. Returns whether there was one."""
+
+    resumed = transaction.resume(common.get_context().root)
+    tree.reset()
+    return resumed
+
+
+def rollback_edit() -> bool:
+    """Undo an interrupted edit of the wiki. Returns whether there was one."""
+
+    rolled_back = transaction.rollback(common.get_context().root)
+    tree.reset()
+    return rolled_back
+
+
+# * -------------------------------------------------------------------------------- * #
+# * LINKS
+
+
+def update_links(page: Path, name: str, jobs: Optional[int] = None) -> list[Path]:
+    """Point the links to a page at a new name. Returns the pages that changed.
+
+    Only the pages that link to the page are opened, found in the links in the
+    manifest, which are brought up to date over a pool of `jobs` processes. Pages are
+    rewritten concurrently, and each one atomically, see `links.rewrite_pages`.
+    """
+
+    from wikiman import links
+
+    return links.rewrite_pages(get_linking_pages(page, jobs), page.stem, name)
+
+
+def get_linking_pages(page: Path, jobs: Optional[int] = None) -> list[Path]:
+    """Get a page and the pages linking to it, which may need their links rewritten."""
+
+    wiki_tree = tree.get_wiki_tree()
+    page_id = wiki_tree.get_id(page)
+    graph = get_link_graph(jobs)
+    # The page may link to itself too, e.g. to its own headings
+    page_ids = [page_id, *graph.backlinks.get(page_id, [])]
+    return [wiki_tree.get_path(linking_id) for linking_id in page_ids]
+
+
+def get_link_graph(jobs: Optional[int] = None) -> "links.LinkGraph":
+    """Get the links between pages, and the links to pages that don't exist.
+
+    Only the pages changed since they were last scanned are read again, over a pool of
+    `jobs` processes.
+    """
+
+    from wikiman import navigation
+
+    return navigation.get_link_graph(jobs)
 
 
 # * -------------------------------------------------------------------------------- * #
@@ -47,72 +201,158 @@ MD_TAB = "&nbsp;" * 4
 
 
 def get_tree(page: Path) -> str:
-    """Get Markdown links for the tree of pages near a page."""
+    """Get Markdown links for the tree of pages near a page.
 
-    # Start the tree at root or with the page and its siblings
-    if page == common.ROOT_PAGE:
-        # Tree is a list of just the root page
-        tree = [utils.bold_md(utils.get_page_link(common.ROOT_PAGE))]
-        page_idx = 0
-    else:
-        # Tree is a list of the page and its siblings
-        siblings = family.get_siblings(page)
-        tree = [utils.get_page_link(page) for page in siblings]
-        page_idx = siblings.index(page)
-        tree[page_idx] = utils.bold_md(tree[page_idx])
+    The page is bold among its siblings, with its children below it, and the siblings
+    are below their parent, among the parent's own siblings. Set `ancestors` in the
+    context to show the siblings of more ancestors, up to the home page.
+
+    Set `window` in the context to only show that many pages of each section, around
+    the page or its ancestor, collapsing the rest into links to the parent of the
+    section. The size of a tree then no longer grows with the size of the sections.
+    """
+
+    context = common.get_context()
+    wiki_tree = tree.get_wiki_tree()
+    root_id = 0
+    page_id = wiki_tree.get_id(page)
+
+    # The page and the ancestors whose siblings are shown, stopping at the home page
+    chain = [page_id]
+    while len(chain) < 2 + context.ancestors and chain[-1] != root_id:
+        chain.append(wiki_tree.parent_ids[chain[-1]])
+
+    depth = len(chain) - 1
+    lines = [
+        MD_TAB * depth + utils.bold_md(get_link_by_id(page_id)),
+        *get_children_window(page_id, depth + 1),
+    ]
+    for level, node_id in enumerate(chain):
+        node_depth = depth - level
+        if level:
+            lines = [MD_TAB * node_depth + get_link_by_id(node_id), *lines]
+        # The home page is shown alone, above its children
+        if node_id == root_id:
+            break
+        before, after = get_siblings_window(
+            wiki_tree.parent_ids[node_id], node_depth, wiki_tree.positions[node_id]
+        )
+        lines = [*before, *lines, *after]
+    return common.MD_NEWLINE.join(lines)
+
+
+def get_children_window(page_id: int, depth: int) -> list[str]:
+    """Get indented links to the first children of a page, and a link to the rest."""
+
+    section = get_section_by_id(page_id, depth)
+    _, end = get_window(len(section))
+    return [*section[:end], *get_more_link(page_id, depth, len(section) - end)]
+
+
+def get_siblings_window(
+    parent_id: int, depth: int, position: int
+) -> tuple[list[str], list[str]]:
+    """Get indented links to the siblings before and after a page, around the page."""
+
+    section = get_section_by_id(parent_id, depth)
+    start, end = get_window(len(section), position)
+    more_after = get_more_link(parent_id, depth, len(section) - end)
+    return (
+        [*get_more_link(parent_id, depth, start), *section[start:position]],
+        [*section[position + 1 : end], *more_after],
+    )
+
+
+def get_window(count: int, position: Optional[int] = None) -> tuple[int, int]:
+    """Get the start and end of the window shown of a section, around a position."""
+
+    window = common.get_context().window
+    if window is None or count <= window:
+        return 0, count
+    if position is None:
+        return 0, window
+    start = min(max(position - window // 2, 0), count - window)
+    return start, start + window
 
-    # Insert child links below the page
-    children = family.get_children(page)
-    child_links = [utils.get_page_link(page) for page in children]
-    tree = insert_subtree(subtree=child_links, tree=tree, index=page_idx)
 
-    # Only worry about parents if it's not the root page
-    if page != common.ROOT_PAGE:
+def get_more_link(parent_id: int, depth: int, count: int) -> list[str]:
+    """Get an indented link to the parent of a section, for pages not shown, if any."""
 
-        parent = family.get_parent(page)
+    if not count:
+        return []
+    url = utils.get_page_url(tree.get_wiki_tree().get_path(parent_id))
+    return [MD_TAB * depth + utils.get_md_link(f"… and {count} more", url)]
 
-        if parent == common.ROOT_PAGE:
-            # Insert the working tree below the root page
-            parent_links = [utils.get_page_link(common.ROOT_PAGE)]
-            parent_idx = 0
-        else:
-            # Insert the working tree below the parent page in the list of parents
-            parents = family.get_siblings(parent)
-            parent_links = [utils.get_page_link(page) for page in parents]
-            parent_idx = parents.index(parent)
-        tree = insert_subtree(subtree=tree, tree=parent_links, index=parent_idx)
-    return common.MD_NEWLINE.join(tree)
 
+def get_link(page: Path) -> str:
+    """Get a link to a page, formatted only once per run."""
 
-def insert_subtree(subtree: list[str], tree: list[str], index: int) -> list[str]:
-    """Insert a subtree into a tree after the specified index."""
+    return get_link_by_id(tree.get_wiki_tree().get_id(page))
 
-    index += 1  # To insert *after* the specified index.
-    subtree = [MD_TAB + str(line) for line in subtree]
-    tree = tree[:index] + subtree + tree[index:]
-    return tree
+
+def get_link_by_id(page_id: int) -> str:
+    """Get a link to a page by its id in the tree, formatted only once per run."""
+
+    links = common.get_context().links
+    path = tree.get_wiki_tree().paths[page_id]
+    if path not in links:
+        links[path] = utils.get_page_link(Path(path))
+    return links[path]
+
+
+def get_section_by_id(page_id: int, depth: int) -> list[str]:
+    """Get indented links to the children of a page by its id in the tree."""
+
+    sections = common.get_context().sections
+    key = (page_id, depth)
+    if key not in sections:
+        sections[key] = [
+            MD_TAB * depth + get_link_by_id(child_id)
+            for child_id in tree.get_wiki_tree().get_child_ids(page_id)
+        ]
+    return sections[key]
 
 
 def get_toc(page: Path) -> str:
     """Get the table of contents for a page. List only the most significant headings."""
 
-    toc_list: list[str] = []
-    page_url = utils.get_page_url(page)
+    return format_toc(page, get_headings(page))
+
+
+def get_headings(page: Path) -> list[tuple[str, str]]:
+    """Get the name and id of the most significant headings in a page."""
 
-    with open(page) as file:
-        content = file.read()
-        md = Markdown(extensions=["toc"])
-        md.convert(content)
+    return scanner.get_headings(page)
 
-    for token in md.toc_tokens:  # type: ignore  # pylint: disable=no-member
-        token_id = token["id"]
-        name = token["name"]
-        link = utils.get_md_link(name, f"{page_url}#{token_id}")
-        toc_list.append(link)
 
+def parse_headings(content: str) -> list[tuple[str, str]]:
+    """Get the name and id of the most significant headings in Markdown content."""
+
+    return scanner.parse_headings(content)
+
+
+def format_toc(page: Path, headings: list[tuple[str, str]]) -> str:
+    """Get the table of contents for a page given its most significant headings."""
+
+    page_url = utils.get_page_url(page)
+    toc_list = [utils.get_md_link(name, f"{page_url}#{id_}") for name, id_ in headings]
     return common.MD_NEWLINE.join(toc_list)
 
 
+def get_footer(page: Path) -> str:
+    """Get the footer of a page, with the pages linking to it if they are listed."""
+
+    relative_nav = get_relative_nav(page)
+    backlinks = common.get_context().backlinks
+    if backlinks is None:
+        return relative_nav
+    page_ids = backlinks.get(tree.get_wiki_tree().get_id(page))
+    if not page_ids:
+        return relative_nav
+    linked_from = "Linked from: " + ", ".join(map(get_link_by_id, page_ids))
+    return common.MD_NEWLINE.join(filter(None, [relative_nav, linked_from]))
+
+
 def get_relative_nav(page: Path) -> str:
     """Get the parent, previous, and next Markdown links."""
 
@@ -125,21 +365,21 @@ def get_relative_nav(page: Path) -> str:
     if next_page == common.ROOT_PAGE:
         next_link = None
     else:
-        next_link = utils.get_page_link(next_page)
+        next_link = get_link(next_page)
         relative_nav.append(nav_head[0] + next_link)
 
     # Get previous link for any page except the home page
     if page == common.ROOT_PAGE:
         prev_link = None
     else:
-        prev_link = utils.get_page_link(prev_page)
+        prev_link = get_link(prev_page)
         relative_nav.append(nav_head[1] + prev_link)
 
     # Get parent link for any page except for Home, or the first page in a section
     if page == common.ROOT_PAGE or prev_page == parent:
         parent_link = None
     else:
-        parent_link = utils.get_page_link(parent)
+        parent_link = get_link(parent)
         relative_nav.append(nav_head[2] + parent_link)
 
     return MD_TAB.join(relative_nav)
@@ -1,69 +1,370 @@
 """CLI implementation of the `wikiman` API."""
 
-from typing import Optional
+import sys
+from pathlib import Path
+from typing import Optional, Union
 
-import fire
-
-from wikiman import common, utils
+from wikiman import utils
 from wikiman import api
+from wikiman import common
+from wikiman import tree
 
 
 def main() -> None:
-    """The command-line interface. Runs if file is invoked directly, or from prompt."""
+    """The command-line interface. Runs if file is invoked directly, or from prompt.
+
+    Pass `--profile` to any command to print how long each phase took, and which pages
+    were slowest. Pass `--profile=<path>` to also save the profile, as JSON if the path
+    ends in ".json", or otherwise as a `cProfile` dump. Only the main process is seen
+    by `cProfile`, so pass `--jobs 1` to `wikiman up` to see the work on each page.
+
+    Pass `--root <dir>` to any command to manage the wiki in another directory than
+    "wiki". Pass `--root` more than once, or `--config <file>` listing wikis as JSON
+    (see `common.load_config`), to run `wikiman up` on several wikis in one process.
+    """
+
+    args = sys.argv[1:]
+    profile = pop_profile(args)
+    contexts = pop_contexts(args)
+    if not profile:
+        run(args, contexts)
+        return
+
+    from wikiman import profiling
+
+    with profiling.profile(profile):
+        run(args, contexts)
+
+
+def run(args: list[str], contexts: list[common.Context]) -> None:
+    """Run a command on the wiki in "wiki", or on each of the wikis given.
+
+    Several wikis are updated one after another on one shared pool of processes. A wiki
+    that fails, with an error or by exiting, doesn't stop the others. Its error is
+    printed, and the command fails at the end.
+    """
+
+    import fire
+
+    if not contexts:
+        fire.Fire(COMMANDS, command=args)
+        return
+    for context in contexts:
+        context.profile = common.get_context().profile
+    if len(contexts) == 1:
+        with common.use_context(contexts[0]):
+            fire.Fire(COMMANDS, command=args)
+        return
+
+    from wikiman import navigation
+
+    if COMMANDS.get(args[0] if args else "") is not update_navigation:
+        sys.exit("Only `wikiman up` can run on several wikis at once.")
+    failed = 0
+    with navigation.share_pool(contexts, get_jobs(args)):
+        for context in contexts:
+            print(f"{context.root}:")
+            with common.use_context(context):
+                try:
+                    fire.Fire(COMMANDS, command=args)
+                except SystemExit as exception:
+                    if exception.code:
+                        failed += 1
+                        if isinstance(exception.code, str):
+                            print(exception.code, file=sys.stderr)
+                except Exception as exception:
+                    failed += 1
+                    print(f"{type(exception).__name__}: {exception}", file=sys.stderr)
+    if failed:
+        sys.exit(f"{failed} of {len(contexts)} wikis failed.")
+
+
+def pop_profile(args: list[str]) -> Union[str, bool]:
+    """Remove the `--profile` option from the arguments, returning its value if any."""
+
+    for index, arg in enumerate(args):
+        if arg == "--profile":
+            del args[index]
+            return True
+        if arg.startswith("--profile="):
+            del args[index]
+            return arg.removeprefix("--profile=")
+    return False
+
 
-    fire.Fire({"up": update_navigation, "add": add_page})
+def pop_contexts(args: list[str]) -> list[common.Context]:
+    """Remove the `--root` and `--config` options from the arguments.
 
+    Returns the contexts of the wikis they give, in order, if any.
+    """
 
-def update_navigation() -> None:
-    """Update sidebars and footers."""
+    contexts: list[common.Context] = []
+    index = 0
+    while index < len(args):
+        option, equals, value = args[index].partition("=")
+        if option not in ("--root", "--config"):
+            index += 1
+            continue
+        if not equals:
+            if index + 1 == len(args):
+                sys.exit(f"Pass a path to `{option}`.")
+            value = args.pop(index + 1)
+        del args[index]
+        if option == "--root":
+            contexts.append(common.Context(Path(value)))
+        else:
+            contexts.extend(common.load_config(Path(value)))
+    return contexts
 
-    # Heading levels indicated by number of "#" in sequence. Changes header size.
-    md_head = "# "
 
-    for page in common.PAGES:
+def get_jobs(args: list[str]) -> Optional[int]:
+    """Get the number of jobs given by the `--jobs` option in the arguments, if any."""
 
-        # Write the tree of nearby pages and the TOC for this page into the sidebar
-        tree = api.get_tree(page)
-        toc = api.get_toc(page)
-        sidebar_text = common.MD_NEWLINE.join(
-            [f"{md_head}Directory", tree, f"{md_head}Contents", toc]
+    for index, arg in enumerate(args):
+        option, equals, value = arg.partition("=")
+        if option not in ("--jobs", "-j"):
+            continue
+        if not equals:
+            value = args[index + 1] if index + 1 < len(args) else ""
+        # Leave values that aren't numbers for the command to reject
+        return int(value) if value.isdigit() else None
+    return None
+
+
+def update_navigation(
+    force: bool = False,
+    jobs: Optional[int] = None,
+    since: Union[str, bool] = False,
+    durability: str = "none",
+    check: bool = False,
+    fail_fast: bool = False,
+    window: Optional[int] = None,
+    ancestors: int = 0,
+    sitemap: Union[str, bool] = False,
+    sitemap_headings: bool = False,
+    backlinks: bool = False,
+) -> None:
+    """Update sidebars and footers. Pass `--force` to regenerate every page.
+
+    Pages are processed by `--jobs` worker processes, defaulting to the number of cores.
+    Pass `--since <rev>` to only update pages near those changed since a Git revision,
+    or just `--since` to use the revision recorded by the last such update.
+
+    Pass `--durability file` to flush each file to disk before it replaces the old one,
+    or `--durability end` to replace files, then flush them to disk when done.
+
+    Pass `--check` to only check that every file is up to date, writing nothing, and
+    exit with an error listing the stale files if not. Pass `--fail-fast` as well to
+    stop at the first stale file.
+
+    Pass `--window N` to only show N pages of each section in sidebar trees, and
+    `--ancestors N` to show the siblings of N more ancestors of each page.
+
+    Pass `--sitemap` to keep a site map of every page in the home page, or
+    `--sitemap <page>` to keep it in another page. Pass `--sitemap-headings` to list
+    the headings in the table of contents of each page too.
+
+    Pass `--backlinks` to list the pages linking to each page in its footer.
+    """
+
+    from wikiman import navigation
+
+    set_tree_view(window, ancestors)
+    if check:
+        with common.read_only():
+            check_navigation(
+                jobs, fail_fast, get_sitemap_page(sitemap), sitemap_headings, backlinks
+            )
+        return
+
+    report = navigation.update_navigation(
+        force,
+        jobs,
+        since=since,
+        durability=durability,
+        sitemap_page=get_sitemap_page(sitemap),
+        sitemap_headings=sitemap_headings,
+        backlinks=backlinks,
+    )
+    print(report)
+
+
+def check_navigation(
+    jobs: Optional[int],
+    fail_fast: bool,
+    sitemap_page: Optional[Path],
+    sitemap_headings: bool,
+    backlinks: bool,
+) -> None:
+    """Check that every file is up to date, exiting with an error if not."""
+
+    from wikiman import navigation, writer
+
+    try:
+        report = navigation.check_navigation(
+            jobs, fail_fast, sitemap_page, sitemap_headings, backlinks
+        )
+    except writer.StaleFileError as exception:
+        sys.exit(f"{exception} Run the same command without `--check` to update it.")
+    for path in sorted(report.stale):
+        print(path)
+    if report.stale:
+        sys.exit(
+            f"{len(report.stale)} files are out of date."
+            " Run the same command without `--check` to update them."
         )
-        sidebar = page.parent / common.SIDEBAR_FILENAME
-        with open(sidebar, "w") as file:
-            file.write(sidebar_text)
+    print(f"Checked {len(report.rendered)} pages. Every file is up to date.")
 
-        # Write relative navigation links into the footer
-        nav = api.get_relative_nav(page)
-        footer = page.parent / common.FOOTER_FILENAME
-        with open(footer, "w") as file:
-            file.write(nav)
+
+def get_sitemap_page(sitemap: Union[str, bool]) -> Optional[Path]:
+    """Get the page to keep the site map in, the home page by default, if any."""
+
+    if sitemap is True:
+        return tree.get_wiki_tree().root_page
+    return utils.find_page(str(sitemap)) if sitemap else None
+
+
+def links(footers: bool = False, jobs: Optional[int] = None) -> None:
+    """List links to pages that don't exist, exiting with an error if there are any.
+
+    Only pages changed since they were last scanned are read, over `--jobs` worker
+    processes. Pass `--footers` to also update navigation as `wikiman up --backlinks`
+    does, listing the pages linking to each page in its footer.
+    """
+
+    from wikiman import manifest, navigation
+
+    wiki_tree = tree.get_wiki_tree()
+    pages_manifest = manifest.Manifest.load(manifest.get_manifest_path())
+    graph = navigation.get_link_graph(jobs, pages_manifest)
+    if footers:
+        print(
+            navigation.update_navigation(
+                jobs=jobs, pages_manifest=pages_manifest, backlinks=True
+            )
+        )
+
+    index = wiki_tree.get_names()
+    for page_id, link_names in graph.broken.items():
+        for name in link_names:
+            try:
+                index.find(name)
+            except ValueError as exception:
+                print(f"{wiki_tree.get_path(page_id)}: '{name}'. {exception}")
+    if broken := sum(map(len, graph.broken.values())):
+        sys.exit(f"{broken} links are broken.")
+    print(f"Found {len(graph)} links between pages. None are broken.")
+
+
+def watch(
+    poll: bool = False,
+    interval: float = 1.0,
+    debounce: float = 0.1,
+    jobs: Optional[int] = None,
+    window: Optional[int] = None,
+    ancestors: int = 0,
+) -> None:
+    """Keep sidebars and footers up to date as pages change, until stopped by Ctrl+C.
+
+    Changes are picked up with inotify on Linux. Pass `--poll` to check for changes
+    every `--interval` seconds instead. Changes within `--debounce` seconds of each
+    other are handled together. Sidebar trees are shown as with `wikiman up`.
+    """
+
+    from wikiman import watch
+
+    set_tree_view(window, ancestors)
+    print("Watching the wiki for changes. Press Ctrl+C to stop.")
+    try:
+        watch.watch(jobs, poll, interval, debounce)
+    except KeyboardInterrupt:
+        pass
+
+
+def set_tree_view(window: Optional[int], ancestors: int) -> None:
+    """Set how much of the wiki the tree in each sidebar shows."""
+
+    if window is not None and window < 1:
+        raise ValueError("The window must show at least one page.")
+    if ancestors < 0:
+        raise ValueError("The number of ancestors can't be negative.")
+    context = common.get_context()
+    context.window = window
+    context.ancestors = ancestors
 
 
 def add_page(name: str, under: str, position: Optional[int] = None) -> None:
     """Add a new page under a page, optionally specifying position."""
 
-    parent = utils.find_page(under)
+    api.add_page(name, utils.find_page(under), position)
+
+
+def resume_edit() -> None:
+    """Finish an edit of the wiki that was interrupted, e.g. by a crash."""
+
+    if not api.resume_edit():
+        print("No interrupted edit to resume.")
+
+
+def rollback_edit() -> None:
+    """Undo an edit of the wiki that was interrupted, e.g. by a crash."""
+
+    if not api.rollback_edit():
+        print("No interrupted edit to roll back.")
+
+
+def move_page(name: str, under: str, position: Optional[int] = None) -> None:
+    """Move a page and its subpages under a page, optionally specifying position."""
+
+    api.move_page(utils.find_page(name), utils.find_page(under), position)
+
+
+def rename_page(
+    name: str, new_name: str, rewrite_links: bool = False, jobs: Optional[int] = None
+) -> None:
+    """Rename a page. Pass `--rewrite-links` to point the links to it at its new name.
+
+    Only the pages linking to the page are opened, and any changed since they were last
+    scanned are scanned again over `--jobs` worker processes.
+    """
+
+    api.rename_page(utils.find_page(name), new_name, rewrite_links, jobs)
+
+
+def remove_page(name: str) -> None:
+    """Remove a page and its subpages."""
 
-    if position is None:
-        position = len(api.family.get_children(parent))
-    else:
-        # Get the children that will come after the new page
-        children = api.family.get_children(parent)
-        children_after = children[position:]
+    api.remove_page(utils.find_page(name))
 
-        # Shift child directory numbering to accomdate the new page
-        for child in children_after:
-            new_child_position = utils.get_page_position(child) + 1
-            api.move_page(child, parent, new_child_position)
 
-    page = utils.init_page(name, parent, position)
-    api.create_page(page)
+def complete(prefix: str = "", limit: Optional[int] = None) -> None:
+    """Print the names of pages starting with a prefix, e.g. for shell completion."""
 
+    context = common.get_context()
+    for name in tree.load_names(context.root, context.page_pattern).complete(
+        prefix, limit
+    ):
+        print(name)
 
-# def cli_move_page():  # name: str, under: str, position: Optional[int] = None):
-#     """Move a page under a page, optionally specifying position."""
 
-#     pass
+# Commands and their aliases
+COMMANDS = {
+    "update": update_navigation,
+    "up": update_navigation,
+    "links": links,
+    "watch": watch,
+    "add": add_page,
+    "insert": add_page,
+    "move": move_page,
+    "mv": move_page,
+    "rename": rename_page,
+    "rn": rename_page,
+    "remove": remove_page,
+    "rm": remove_page,
+    "resume": resume_edit,
+    "rollback": rollback_edit,
+    "complete": complete,
+}
 
 # ! -------------------------------------------------------------------------------- ! #
 # ! RUN MAIN
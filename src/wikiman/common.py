@@ -1,24 +1,235 @@
 """Common values."""
 
+import json
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+if TYPE_CHECKING:
+    from wikiman.tree import WikiTree
 
 # Patterns specific to GitHub Wiki
 PAGE_PATTERN = "[!_]*.md"
 SIDEBAR_FILENAME = "_Sidebar.md"
 FOOTER_FILENAME = "_Footer.md"
 
+# Wikiman keeps its own files in a hidden directory in the root of the wiki
+CACHE_DIRNAME = ".wikiman"
+MANIFEST_FILENAME = "manifest.json"
+TREE_FILENAME = "tree.json"
+JOURNAL_FILENAME = "journal.jsonl"
+
 # The origin repo should be a GitHub wiki, and pages should be in the "wiki" subfolder
 ROOT_NAME = "wiki"
-
-# Get pages to be used throughout the module
 WIKI_ROOT = Path(ROOT_NAME)
 
-if not WIKI_ROOT.exists():
-    WIKI_ROOT.mkdir()
-    (WIKI_ROOT / "Home.md").touch()
-
-PAGES = sorted(WIKI_ROOT.glob(f"**/{PAGE_PATTERN}"))
-ROOT_PAGE = PAGES[-1]
-
 # Two newlines signifies a paragraph break in Markdown.
 MD_NEWLINE = "  \n"
+
+# Keys of each wiki in a config file, the arguments of its context
+CONFIG_KEYS = {
+    "root",
+    "remote_url",
+    "sidebar_filename",
+    "footer_filename",
+    "page_pattern",
+}
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CONTEXT
+
+
+class Context:
+    """The wiki being managed. Its pages and remote URL are discovered on first use.
+
+    Nothing is discovered when `wikiman` is imported, so that commands which don't need
+    the whole wiki (and `--help`) start quickly no matter how large the wiki is.
+
+    Pass a remote URL to use it rather than discover it. Pass the names of the sidebar
+    and footer files, and the pattern of the names of pages, to manage a wiki laid out
+    differently from a GitHub wiki. Several wikis may be managed in one process, each
+    in its own context, see `use_context`.
+    """
+
+    # Settings of a run rather than of the wiki, which may change between runs
+    SETTINGS = ("profile", "read_only", "window", "ancestors", "backlinks")
+
+    def __init__(
+        self,
+        root: Path = WIKI_ROOT,
+        remote_url: Optional[str] = None,
+        sidebar_filename: str = SIDEBAR_FILENAME,
+        footer_filename: str = FOOTER_FILENAME,
+        page_pattern: str = PAGE_PATTERN,
+    ):
+
+        self.root = root
+        self.sidebar_filename = sidebar_filename
+        self.footer_filename = footer_filename
+        self.page_pattern = page_pattern
+        self._tree: Optional["WikiTree"] = None
+        self._remote_url: Optional[str] = None
+        if remote_url is not None:
+            from wikiman.remote import get_wiki_url
+
+            # Given in any form that the environment or the Git config would allow
+            self._remote_url = get_wiki_url(remote_url)
+
+        # Links to pages by path, and indented links to the children of pages by their
+        # ids in the tree and depth, which are cleared along with the tree
+        self.links: dict[str, str] = {}
+        self.sections: dict[tuple[int, int], list[str]] = {}
+
+        # Whether to time the phases of each command, see `wikiman.profiling`
+        self.profile = False
+        # Whether to leave the wiki untouched, including wikiman's own files
+        self.read_only = False
+
+        # Show at most this many pages of each section in sidebar trees, if given, and
+        # the siblings of this many more ancestors of each page than just its parent
+        self.window: Optional[int] = None
+        self.ancestors = 0
+
+        # The pages linking to each page by their ids in the tree, shown in footers if
+        # given, see `wikiman.links`
+        self.backlinks: Optional[dict[int, list[int]]] = None
+
+    @property
+    def tree(self) -> "WikiTree":
+        """The index of the pages in the wiki, walked on first use."""
+
+        if self._tree is None:
+            from wikiman.profiling import get_timer
+            from wikiman.tree import load_wiki_tree
+
+            timer = get_timer()
+            if not self.read_only:
+                init_wiki(self.root)
+            self._tree = load_wiki_tree(self.root, self.page_pattern)
+            timer.lap("discover")
+        return self._tree
+
+    @tree.setter
+    def tree(self, wiki_tree: "WikiTree") -> None:
+        self._tree = wiki_tree
+        self.sections.clear()
+
+    @property
+    def remote_url(self) -> str:
+        """The URL of the wiki on GitHub, resolved on first use."""
+
+        if self._remote_url is None:
+            from wikiman.remote import get_remote_url
+
+            self._remote_url = get_remote_url(self.root)
+        return self._remote_url
+
+    def get_settings(self) -> dict[str, Any]:
+        """Get the settings of the current run, e.g. to send to worker processes."""
+
+        return {name: getattr(self, name) for name in self.SETTINGS}
+
+    def reset(self) -> None:
+        """Forget the pages in the wiki. Call this after changing the file structure."""
+
+        self._tree = None
+        self.links.clear()
+        self.sections.clear()
+        self.backlinks = None
+
+
+@contextmanager
+def read_only() -> Iterator[None]:
+    """Leave the wiki untouched within, including wikiman's own files."""
+
+    context = get_context()
+    was_read_only = context.read_only
+    context.read_only = True
+    try:
+        yield
+    finally:
+        context.read_only = was_read_only
+
+
+@contextmanager
+def use_context(context: Context) -> Iterator[Context]:
+    """Manage the wiki of another context within, then go back to the wiki before."""
+
+    global _context
+    old_context = _context
+    _context = context
+    try:
+        yield context
+    finally:
+        _context = old_context
+
+
+def load_config(path: Path) -> list[Context]:
+    """Load the contexts of the wikis listed in a JSON config file.
+
+    The file holds a list of wikis, each with its "root" and any other arguments of a
+    context, e.g. `[{"root": "docs/wiki", "remote_url": "https://..."}]`. Roots are
+    relative to the directory of the file.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        wikis = json.load(file)
+    if not isinstance(wikis, list):
+        raise ValueError(f"'{path}' must hold a list of wikis.")
+    contexts: list[Context] = []
+    for wiki in wikis:
+        if not isinstance(wiki, dict) or "root" not in wiki:
+            raise ValueError(f"Each wiki in '{path}' must have a root.")
+        if unknown := set(wiki) - CONFIG_KEYS:
+            raise ValueError(f"Unknown keys in '{path}': {', '.join(sorted(unknown))}")
+        contexts.append(Context(**{**wiki, "root": path.parent / wiki["root"]}))
+    return contexts
+
+
+def init_wiki(root: Path) -> None:
+    """Create the wiki with just a home page if it doesn't exist yet."""
+
+    if not root.exists():
+        root.mkdir()
+        (root / "Home.md").touch()
+
+
+def init_cache_dir(root: Path) -> Path:
+    """Create the hidden directory for wikiman's own files, out of version control."""
+
+    cache_dir = root / CACHE_DIRNAME
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    gitignore = cache_dir / ".gitignore"
+    if not gitignore.exists():
+        gitignore.write_text("*\n")
+    return cache_dir
+
+
+_context: Optional[Context] = None
+
+
+def get_context() -> Context:
+    """Get the context of the wiki being managed, creating it on first use."""
+
+    global _context
+    if _context is None:
+        _context = Context()
+    return _context
+
+
+def set_context(context: Context) -> None:
+    """Manage the wiki in another context, e.g. one passed to a worker process."""
+
+    global _context
+    _context = context
+
+
+def __getattr__(name: str) -> Any:
+    """Discover the pages in the wiki only when they are first asked for."""
+
+    if name == "PAGES":
+        return sorted(get_context().tree.pages)
+    if name == "ROOT_PAGE":
+        return get_context().tree.root_page
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,34 +2,22 @@
 
 from pathlib import Path
 
-from wikiman import common
+from wikiman import tree
 
 
 def get_siblings(page: Path) -> list[Path]:
     """Get a page and its siblings. The home page has its children as its siblings."""
 
-    parent = get_parent(page)
-    return get_children(parent)
+    return list(tree.get_wiki_tree().get_siblings(page))
 
 
 def get_parent(page: Path) -> Path:
-    """Get the parent of a page."""
+    """Get the parent of a page. The home page is its own parent."""
 
-    if page == common.ROOT_PAGE:
-        # Make the Home page its own parent
-        parent = page
-    else:
-        # Make the page in the parent directory its parent
-        page_directory = page.parent
-        parent_directory = page_directory.parent
-        # If each page has its own directory, glob should get only one page, the parent
-        parent = sorted(parent_directory.glob(common.PAGE_PATTERN))[0]
-
-    return parent
+    return tree.get_wiki_tree().get_parent(page)
 
 
 def get_children(page: Path) -> list[Path]:
     """Get the children of a page."""
 
-    parent_directory = page.parent
-    return sorted(parent_directory.glob(f"*/{common.PAGE_PATTERN}"))
+    return list(tree.get_wiki_tree().get_children(page))
@@ -0,0 +1,244 @@
+"""Find the pages changed since a Git revision, and the pages near them.
+
+Pages whose content changed only need their own table of contents updated. Pages that
+were added, removed, or renamed change the tree views and the next, previous, and up
+links of the pages near them, so only those pages are updated, rather than every page.
+"""
+
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from wikiman import common, manifest, tree
+
+if TYPE_CHECKING:
+    from git import Repo
+
+# Kinds of changes in a Git diff that only change the content of a file
+CONTENT_CHANGE_TYPES = ("M", "T")
+
+
+@dataclass
+class Changes:
+    """Pages changed since a revision, keyed by their paths relative to the wiki."""
+
+    modified: set[str] = field(default_factory=set)  # Only the content changed
+    structure: set[str] = field(default_factory=set)  # Added, removed, or renamed
+
+    def add(self, other: "Changes") -> None:
+        """Add the changes in another set of changes to these."""
+
+        self.modified |= other.modified
+        self.structure |= other.structure
+
+    def to_dict(self) -> dict[str, list[str]]:
+        """Get the changes in a form that can be saved as JSON."""
+
+        return {"modified": sorted(self.modified), "structure": sorted(self.structure)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Changes":
+        """Get changes saved with `to_dict`."""
+
+        return cls(set(data.get("modified", [])), set(data.get("structure", [])))
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CHANGES
+
+
+def get_changes_since(
+    since: Union[str, bool], pages_manifest: manifest.Manifest
+) -> Optional[Changes]:
+    """Get the pages changed since a revision, and record this run in the manifest.
+
+    Pass `True` to get the pages changed since the last recorded run, including those
+    that weren't committed at the time. Returns `None` if there is no such run, or if
+    its commit is gone, in which case every page should be updated.
+    """
+
+    root = tree.get_wiki_tree().root
+    repo = get_repo(root)
+    changes: Optional[Changes]
+    if since is True:
+        record = pages_manifest.history
+        try:
+            changes = get_changes(repo, root, record["commit"]) if record else None
+        except ValueError:
+            changes = None
+        if changes is not None:
+            changes.add(Changes.from_dict(record))
+    else:
+        changes = get_changes(repo, root, str(since))
+
+    # Pages not committed yet may change again before the next commit, so record them
+    head = get_head(repo)
+    pages_manifest.set_history(
+        {"commit": head, **get_changes(repo, root, head).to_dict()}
+    )
+    return changes
+
+
+def get_repo(root: Path) -> "Repo":
+    """Get the Git repo containing the wiki."""
+
+    import git
+
+    try:
+        return git.Repo(root, search_parent_directories=True)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError) as exception:
+        raise ValueError(f"No Git repo found at or above '{root}'.") from exception
+
+
+def get_head(repo: "Repo") -> str:
+    """Get the commit that is checked out."""
+
+    try:
+        return repo.head.commit.hexsha
+    except ValueError as exception:
+        raise ValueError("The Git repo of the wiki has no commits yet.") from exception
+
+
+def get_changes(repo: "Repo", root: Path, revision: str) -> Changes:
+    """Get the pages changed between a revision and the working tree, even untracked."""
+
+    import git
+
+    try:
+        commit = repo.commit(revision)
+    except (git.BadName, ValueError) as exception:
+        raise ValueError(f"Unknown revision '{revision}'.") from exception
+
+    prefix = get_prefix(repo, root)
+    changes = Changes()
+    for diff in commit.diff(None, M=True):
+        keys = {
+            key
+            for path in (diff.a_path, diff.b_path)
+            if path and (key := get_key(prefix, path))
+        }
+        if diff.change_type in CONTENT_CHANGE_TYPES:
+            changes.modified |= keys
+        else:
+            changes.structure |= keys
+    for path in repo.untracked_files:
+        if key := get_key(prefix, path):
+            changes.structure.add(key)
+    return changes
+
+
+def get_prefix(repo: "Repo", root: Path) -> str:
+    """Get the path of the wiki root relative to the repo, as Git shows it."""
+
+    working_tree = Path(repo.working_tree_dir or ".").resolve()
+    relative_root = root.resolve().relative_to(working_tree).as_posix()
+    return "" if relative_root == "." else f"{relative_root}/"
+
+
+def get_key(prefix: str, path: str) -> Optional[str]:
+    """Get the key of a page from its path in the repo, if it is a page in the wiki."""
+
+    if not path.startswith(prefix):
+        return None
+    key = path[len(prefix) :]
+    *directories, name = key.split("/")
+    if any(part.startswith(".") for part in directories) or not fnmatch(
+        name, common.get_context().page_pattern
+    ):
+        return None
+    return key
+
+
+# * -------------------------------------------------------------------------------- * #
+# * DEPENDENTS
+
+
+def get_dependents(changes: Changes) -> list[Path]:
+    """Get the pages whose navigation may show changed pages, in preorder."""
+
+    wiki_tree = tree.get_wiki_tree()
+    root = wiki_tree.root
+    directory_pages: Optional[dict[Path, Path]] = None
+
+    dependents: set[Path] = set()
+    for key in changes.modified - changes.structure:
+        page = root / key
+        if page in wiki_tree:
+            dependents.add(page)
+    for key in changes.structure:
+        page = root / key
+        if page in wiki_tree:
+            dependents |= get_family(wiki_tree.get_parent(page))
+            dependents |= {page, wiki_tree.get_nearest(page)[0]}
+            continue
+        # The page is gone, so update the family of its nearest remaining ancestor
+        if directory_pages is None:
+            directory_pages = {
+                page.parent: page for page in reversed(wiki_tree.pages)
+            }
+        dependents |= get_family(get_ancestor(page, directory_pages))
+
+    # Pages are numbered in the order they were walked
+    page_ids = sorted(wiki_tree.get_id(page) for page in dependents)
+    return [wiki_tree.get_path(page_id) for page_id in page_ids]
+
+
+def get_family(parent: Path) -> set[Path]:
+    """Get the pages whose navigation shows the children of a page, or links to them.
+
+    The tree view of a page shows its children, its siblings, and the siblings of its
+    parent, or of more ancestors if set in the context. So the children of a page show
+    up in the tree views of the page itself, the children, and the grandchildren, or
+    more descendants. The next links that change are those of the pages read just
+    before each child, and of the last page read under the parent.
+    """
+
+    wiki_tree = tree.get_wiki_tree()
+    levels = 1 + common.get_context().ancestors
+    family = {parent}
+    children = wiki_tree.get_children(parent)
+    for position, child in enumerate(children):
+        family.add(child)
+        family |= get_descendants(child, levels)
+        if position:
+            family.add(get_last(children[position - 1]))
+
+    last = get_last(parent)
+    family |= {last, wiki_tree.get_nearest(last)[0]}
+    return family
+
+
+def get_descendants(page: Path, levels: int) -> set[Path]:
+    """Get the descendants of a page, down to a number of levels below it."""
+
+    wiki_tree = tree.get_wiki_tree()
+    descendants: set[Path] = set()
+    pages = [page]
+    for _ in range(levels):
+        pages = [child for page in pages for child in wiki_tree.get_children(page)]
+        descendants.update(pages)
+    return descendants
+
+
+def get_last(page: Path) -> Path:
+    """Get the last page read under a page, or the page itself if it has no children."""
+
+    wiki_tree = tree.get_wiki_tree()
+    while children := wiki_tree.get_children(page):
+        page = children[-1]
+    return page
+
+
+def get_ancestor(page: Path, directory_pages: dict[Path, Path]) -> Path:
+    """Get the nearest ancestor of a page that is gone, given the pages by directory."""
+
+    wiki_tree = tree.get_wiki_tree()
+    for directory in page.parents:
+        if (ancestor := directory_pages.get(directory)) is None:
+            continue
+        # Another page in the same directory was a sibling of the page
+        if directory == page.parent:
+            return wiki_tree.get_parent(ancestor)
+        return ancestor
+    return wiki_tree.root_page
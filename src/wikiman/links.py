@@ -0,0 +1,206 @@
+"""Find links between pages of the wiki, and the links to pages that don't exist.
+
+Links are found in the same read of each page as its headings, and kept by name in the
+manifest, so that only pages that changed are read again. Both kinds of links to wiki
+pages are found: `[[Page Name]]` or `[[Link text|Page Name]]` links, as on GitHub, and
+links to the URL of a page in the wiki. Links in code, and in the site map kept by
+wikiman, aren't links between pages and are skipped.
+
+When a page is renamed, the links to it are pointed at its new name, only opening the
+pages that link to it according to the manifest.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import unquote
+
+from wikiman import common, manifest, names, scanner, sitemap, tree, utils, writer
+
+WIKI_LINK = re.compile(r"\[\[(?:[^\]|]*\|)?(?P<name>[^\]|]+)\]\]")
+# Characters that end a URL in Markdown, or end the name of the page in a URL
+URL_END = r"\s()<>\[\]\"'`#?"
+# Punctuation after a bare URL ends a sentence rather than the name of a page
+TRAILING_PUNCTUATION = ".,;:!"
+
+
+@dataclass
+class LinkGraph:
+    """Links between pages, by the ids of the pages in the tree, and broken links."""
+
+    links: dict[int, list[int]] = field(default_factory=dict)  # From each page
+    backlinks: dict[int, list[int]] = field(default_factory=dict)  # To each page
+    broken: dict[int, list[str]] = field(default_factory=dict)  # Names not found
+
+    def __len__(self) -> int:
+        return sum(len(page_ids) for page_ids in self.links.values())
+
+
+def find_links(content: str) -> list[str]:
+    """Get the names of the pages linked from some Markdown content, in order."""
+
+    url_pattern = get_url_pattern(common.get_context().remote_url)
+    found: dict[str, None] = {}  # Names in the order they were found, only once each
+    for text, is_link_text in get_chunks(content):
+        if not is_link_text:
+            continue
+        for match in WIKI_LINK.finditer(text):
+            if name := get_wiki_link_name(match):
+                found[name] = None
+        for match in url_pattern.finditer(text):
+            if name := unquote(match["name"].rstrip(TRAILING_PUNCTUATION)):
+                found[name] = None
+    return list(found)
+
+
+def rewrite_links(content: str, old_name: str, new_name: str) -> str:
+    """Point the links to a page in some Markdown content at its new name."""
+
+    url_pattern = get_url_pattern(common.get_context().remote_url)
+    old_name = names.normalize(old_name)
+    new_name = utils.get_dashed_name(new_name)
+
+    def rewrite_wiki_link(match: re.Match[str]) -> str:
+        name = get_wiki_link_name(match)
+        if name is None or names.normalize(name) != old_name:
+            return match[0]
+        text = match[0][: match.start("name") - match.start()]
+        _, hash_, heading = match["name"].partition("#")
+        # Keep the name spaced or dashed as it was
+        name = new_name if " " not in name else utils.get_human_name(new_name)
+        return f"{text}{name}{hash_}{heading}]]"
+
+    def rewrite_url(match: re.Match[str]) -> str:
+        name = match["name"].rstrip(TRAILING_PUNCTUATION)
+        if names.normalize(unquote(name)) != old_name:
+            return match[0]
+        url = match[0][: -len(match["name"])]
+        return f"{url}{new_name}{match['name'][len(name) :]}"
+
+    return "".join(
+        url_pattern.sub(rewrite_url, WIKI_LINK.sub(rewrite_wiki_link, text))
+        if is_link_text
+        else text
+        for text, is_link_text in get_chunks(content)
+    )
+
+
+def get_chunks(content: str) -> Iterator[tuple[str, bool]]:
+    """Split Markdown content into text which may hold links, and code and such.
+
+    Each chunk comes with whether it may hold links. Joined, the chunks are the content.
+    A site map is only skipped once its end marker is found, otherwise the start marker
+    is just a comment, and the lines after it are the page's own.
+    """
+
+    fence: Optional[str] = None
+    sitemap_lines: Optional[list[str]] = None  # The lines of a site map, if in one
+    for line in content.splitlines(keepends=True):
+        stripped_line = line.rstrip("\r\n")
+        if fence:
+            fence = None if stripped_line.rstrip(" ") == fence else fence
+            yield line, False
+            continue
+        if sitemap_lines is not None:
+            sitemap_lines.append(line)
+            if stripped_line.strip() == sitemap.END_MARKER:
+                yield "".join(sitemap_lines), False
+                sitemap_lines = None
+            continue
+        if match := scanner.FENCE.match(stripped_line):
+            fence = match["fence"]
+            yield line, False
+            continue
+        if stripped_line.strip() == sitemap.START_MARKER:
+            sitemap_lines = [line]
+            continue
+
+        start = 0
+        for match in scanner.CODE_SPAN.finditer(line):
+            yield line[start : match.start()], True
+            yield match[0], False
+            start = match.end()
+        yield line[start:], True
+
+    if sitemap_lines is not None:
+        yield sitemap_lines[0], False
+        yield from get_chunks("".join(sitemap_lines[1:]))
+
+
+def get_wiki_link_name(match: re.Match[str]) -> Optional[str]:
+    """Get the name of the page in a `[[Page Name]]` link, unless it links to a file."""
+
+    name = match["name"].split("#")[0].strip()
+    # Links to images and other files have paths or URLs, which names can't
+    return name if name and "/" not in name else None
+
+
+@lru_cache(maxsize=None)
+def get_url_pattern(remote_url: str) -> re.Pattern[str]:
+    """Get the pattern of links to pages in the wiki at a URL."""
+
+    return re.compile(re.escape(remote_url) + rf"(?P<name>[^{URL_END}/]+)")
+
+
+def get_link_graph(pages_manifest: manifest.Manifest) -> LinkGraph:
+    """Get the links between pages from the links of each page in the manifest.
+
+    Links to names shared by more than one page are broken, as are links to names that
+    no page has. Pages linking to themselves, e.g. to their own headings, are skipped.
+    """
+
+    wiki_tree = tree.get_wiki_tree()
+    index = wiki_tree.get_names()
+    graph = LinkGraph()
+    for page_id, key in enumerate(wiki_tree.get_keys()):
+        linked_ids: dict[int, None] = {}
+        for name in pages_manifest.get(key).get("links", []):
+            pages = index.pages.get(names.normalize(name), [])
+            if len(pages) != 1:
+                graph.broken.setdefault(page_id, []).append(name)
+                continue
+            linked_id = wiki_tree.ids[os.fspath(pages[0])]
+            if linked_id != page_id:
+                linked_ids[linked_id] = None
+        if linked_ids:
+            graph.links[page_id] = list(linked_ids)
+        for linked_id in linked_ids:
+            graph.backlinks.setdefault(linked_id, []).append(page_id)
+    return graph
+
+
+# * -------------------------------------------------------------------------------- * #
+# * REWRITING
+
+
+def rewrite_pages(pages: list[Path], old_name: str, new_name: str) -> list[Path]:
+    """Point the links to a page at its new name in some pages, returning those changed.
+
+    Pages are rewritten on a pool of threads, each to a hidden temporary file which then
+    replaces the page, so that no page is ever left half-written. Then the pages and
+    their directories are flushed to disk.
+    """
+
+    with ThreadPoolExecutor(writer.THREADS) as executor:
+        changed = executor.map(
+            partial(rewrite_page, old_name=old_name, new_name=new_name), pages
+        )
+        changed_pages = [page for page, is_changed in zip(pages, changed) if is_changed]
+    if changed_pages:
+        writer.sync(changed_pages)
+    return changed_pages
+
+
+def rewrite_page(page: Path, old_name: str, new_name: str) -> bool:
+    """Point the links to a page at its new name in one page, if it has any."""
+
+    content = page.read_bytes().decode("utf-8")
+    new_content = rewrite_links(content, old_name, new_name)
+    if new_content == content:
+        return False
+    writer.write_atomically(page, new_content.encode("utf-8"))
+    return True
@@ -0,0 +1,121 @@
+"""A manifest of the pages as of the last time navigation was generated."""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+from wikiman import common
+
+# Bump this whenever the shape of the manifest or the generated navigation changes
+VERSION = 3
+
+
+def get_manifest_path() -> Path:
+    """Get the path to the manifest for the wiki."""
+
+    root = common.get_context().root
+    return root / common.CACHE_DIRNAME / common.MANIFEST_FILENAME
+
+
+def get_digest(*parts: Any) -> str:
+    """Get a short digest of some text, bytes, or JSON-serializable values."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif not isinstance(part, bytes):
+            part = json.dumps(part).encode()
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Size, modification time, content hash, headings, links, and digests of pages.
+
+    Each entry is keyed by the path of the page relative to the root of the wiki, and
+    holds the following:
+
+    - "size" and "mtime": Cheap to check with `os.stat`, used to skip hashing.
+    - "hash": Digest of the content, used to skip parsing the headings.
+    - "headings": The name and id of the most significant headings of the page.
+    - "links": The names of the pages linked from the page, see `links`.
+    - "toc": Digest of the headings, used to decide whether to re-render the sidebar.
+    - "nav": Digest of the tree and relative navigation around the page.
+    - "files": Size and modification time of the sidebar and footer as last written,
+      used to notice when they are edited, deleted, or left stale by something else.
+
+    The history holds the Git commit checked out during the last `wikiman up --since`,
+    and the pages that differed from it at the time.
+    """
+
+    def __init__(self, path: Path):
+
+        self.path = path
+        self.pages: dict[str, dict[str, Any]] = {}
+        self.history: dict[str, Any] = {}
+        self.changed = False
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        """Load a manifest, or start an empty one if it is missing, corrupt or stale."""
+
+        manifest = cls(path)
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return manifest
+        if isinstance(data, dict) and data.get("version") == VERSION:
+            manifest.pages = data["pages"]
+            manifest.history = data.get("history", {})
+        return manifest
+
+    def save(self) -> None:
+        """Save the manifest if it changed.
+
+        The cache directory is kept out of version control.
+        """
+
+        if not self.changed:
+            return
+        common.init_cache_dir(self.path.parent.parent)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": VERSION, "pages": self.pages, "history": self.history},
+                file,
+            )
+        self.changed = False
+
+    def get(self, key: str) -> dict[str, Any]:
+        """Get the entry for a page, or an empty entry if the page is new."""
+
+        return self.pages.get(key, {})
+
+    def update(self, key: str, entry: dict[str, Any]) -> None:
+        """Update the entry for a page."""
+
+        if self.pages.get(key) != entry:
+            self.pages[key] = entry
+            self.changed = True
+
+    def remove(self, key: str) -> None:
+        """Forget a page that is no longer in the wiki."""
+
+        if self.pages.pop(key, None) is not None:
+            self.changed = True
+
+    def prune(self, keys: set[str]) -> None:
+        """Forget the pages that are no longer in the wiki."""
+
+        for key in set(self.pages) - keys:
+            self.remove(key)
+
+    def set_history(self, history: dict[str, Any]) -> None:
+        """Record the Git history of the wiki as of this update."""
+
+        if self.history != history:
+            self.history = history
+            self.changed = True
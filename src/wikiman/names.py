@@ -0,0 +1,122 @@
+"""Find pages by name, complete names from a prefix, and suggest names that are close.
+
+Names are matched ignoring case and whether words are separated by dashes or spaces,
+just as GitHub matches the names of wiki pages.
+"""
+
+import os
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+# Only suggest names that are at least this similar, from 0 to 1
+SUGGESTION_CUTOFF = 0.6
+SUGGESTIONS = 3
+
+Page = Union[Path, str]
+
+
+class PageNotFoundError(ValueError):
+    """No page has this name."""
+
+
+class AmbiguousPageError(ValueError):
+    """More than one page has this name."""
+
+
+class NameIndex:
+    """The pages in the wiki by name, with the names sorted for completion.
+
+    Pages may be paths, or strings when only their names are needed.
+    """
+
+    def __init__(self, pages: Iterable[Page]):
+
+        self.pages: dict[str, list[Page]] = {}
+        for page in pages:
+            self.pages.setdefault(normalize(get_name(page)), []).append(page)
+        self.names = sorted(self.pages)
+
+        # Names by the words in them, only indexed once asked for
+        self.words: Optional[dict[str, list[str]]] = None
+
+    def find(self, name: str) -> Page:
+        """Find the page with a name."""
+
+        pages = self.pages.get(normalize(name))
+        if pages is None:
+            message = "Page not found."
+            if suggestions := self.suggest(name):
+                message += f" Did you mean {' or '.join(suggestions)}?"
+            raise PageNotFoundError(message)
+        if len(pages) > 1:
+            raise AmbiguousPageError(
+                f"More than one page is named '{name}': "
+                + ", ".join(str(page) for page in pages)
+            )
+        return pages[0]
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> list[str]:
+        """Get the names of the pages that start with a prefix, in sorted order."""
+
+        prefix = normalize(prefix)
+        completions: list[str] = []
+        for index in range(bisect_left(self.names, prefix), len(self.names)):
+            name = self.names[index]
+            if not name.startswith(prefix):
+                break
+            completions.extend(get_name(page) for page in self.pages[name])
+            if limit is not None and len(completions) >= limit:
+                break
+        return completions[:limit]
+
+    def suggest(self, name: str, count: int = SUGGESTIONS) -> list[str]:
+        """Get the names of the pages with names closest to a name, if any are close.
+
+        Names sharing a word with the name are compared first, and only if none of them
+        are close are all names compared. Either way, only names of about the same
+        length are compared, since names much longer or shorter can't be close enough.
+        """
+
+        from difflib import get_close_matches
+
+        name = normalize(name)
+        if self.words is None:
+            self.words = {}
+            for other_name in self.names:
+                for word in set(other_name.split("-")):
+                    self.words.setdefault(word, []).append(other_name)
+
+        # Similarity is at most 2 * shorter / (shorter + longer)
+        ratio = SUGGESTION_CUTOFF / (2 - SUGGESTION_CUTOFF)
+        sharing_words = {
+            other_name
+            for word in name.split("-")
+            for other_name in self.words.get(word, [])
+        }
+        for candidates in (sharing_words, self.names):
+            matches = get_close_matches(
+                name,
+                [
+                    candidate
+                    for candidate in candidates
+                    if ratio * len(name) <= len(candidate) <= len(name) / ratio
+                ],
+                count,
+                SUGGESTION_CUTOFF,
+            )
+            if matches:
+                return [get_name(self.pages[match][0]) for match in matches]
+        return []
+
+
+def get_name(page: Page) -> str:
+    """Get the name of a page from its path."""
+
+    return os.path.splitext(os.path.basename(page))[0]
+
+
+def normalize(name: str) -> str:
+    """Get a name as it is matched, in lowercase and with dashes between words."""
+
+    return name.replace(" ", "-").lower()
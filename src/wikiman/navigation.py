@@ -0,0 +1,605 @@
+"""Generate sidebars and footers for every page in the wiki."""
+
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Union
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+from wikiman import api, common, links, manifest, profiling, sitemap, tree, writer
+
+# Heading levels indicated by number of "#" in sequence. Changes header size.
+MD_HEAD = "# "
+
+
+@dataclass
+class Report:
+    """What happened during an update of the navigation."""
+
+    rendered: list[Path] = field(default_factory=list)  # Pages rendered again
+    written: int = 0  # Files written because their content changed
+    unchanged: int = 0  # Files rendered again, but already up to date on disk
+    stale: list[Path] = field(default_factory=list)  # Files out of date, if checking
+    timings: list[profiling.Timing] = field(default_factory=list)  # If profiling
+
+    def add(self, other: "Report") -> None:
+        """Add what happened in another report to this one."""
+
+        self.rendered.extend(other.rendered)
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.stale.extend(other.stale)
+        self.timings.extend(other.timings)
+
+    def __str__(self) -> str:
+        return (
+            f"Rendered {len(self.rendered)} pages."
+            f" Wrote {self.written} files, {self.unchanged} unchanged."
+        )
+
+
+def update_navigation(
+    force: bool = False,
+    jobs: Optional[int] = None,
+    pages_manifest: Optional[manifest.Manifest] = None,
+    since: Optional[Union[str, bool]] = None,
+    durability: str = writer.NONE,
+    sitemap_page: Optional[Path] = None,
+    sitemap_headings: bool = False,
+    backlinks: bool = False,
+) -> Report:
+    """Update sidebars and footers, reporting what was rendered and written.
+
+    Only pages whose content changed since the last run are parsed again, and only
+    pages whose table of contents or surrounding tree changed are rendered again. Pass
+    `force` to ignore the manifest and render every page.
+
+    Pages are parsed and rendered over a pool of `jobs` processes, defaulting to the
+    number of cores. The output is the same no matter the number of jobs. Each process
+    writes files on a pool of threads as it renders, as durably as asked, see `writer`.
+
+    Pass a Git revision as `since` to only look at the pages changed since then, and
+    the pages whose navigation shows them. Pass `True` to use the revision recorded by
+    the last such update, or update every page if there is none.
+
+    Pass a page as `sitemap_page` to update a site map of the wiki in it, listing the
+    headings in the table of contents of each page too if `sitemap_headings`.
+
+    Pass `backlinks` to list the pages linking to each page in its footer. Every page is
+    scanned for links first, over the same pool, so that each page is still read once.
+
+    The manifest is loaded from the wiki, unless one that is already loaded is passed.
+    """
+
+    if force and since:
+        raise ValueError("Can't force an update of every page since a revision.")
+    if backlinks and since:
+        raise ValueError("Can't list backlinks when updating pages since a revision.")
+    writer.check_durability(durability)
+
+    wiki_tree = tree.get_wiki_tree()
+    timer = profiling.get_timer()
+    manifest_path = manifest.get_manifest_path()
+    if force:
+        pages_manifest = manifest.Manifest(manifest_path)
+    elif pages_manifest is None:
+        pages_manifest = manifest.Manifest.load(manifest_path)
+    timer.lap("manifest")
+
+    pages = wiki_tree.pages
+    keys = wiki_tree.get_keys()
+    changes = None
+    if since:
+        from wikiman import history
+
+        if changes := history.get_changes_since(since, pages_manifest):
+            pages = history.get_dependents(changes)
+            keys = [page.relative_to(wiki_tree.root).as_posix() for page in pages]
+        timer.lap("git")
+
+    with show_backlinks(pages_manifest, jobs, backlinks):
+        report = render_pages(
+            pages, keys, pages_manifest, jobs, force, partial(writer.Writer, durability)
+        )
+    timer.lap("pages")
+
+    if sitemap_page is not None:
+        if sitemap.update_sitemap(sitemap_page, pages_manifest, sitemap_headings):
+            report.written += 1
+            # Rescan the page now, rather than as a changed page in the next update
+            key = sitemap_page.relative_to(wiki_tree.root).as_posix()
+            pages_manifest.update(key, scan_page(sitemap_page, pages_manifest.get(key)))
+        timer.lap("sitemap")
+
+    if changes is None:
+        pages_manifest.prune(set(keys))
+    else:
+        for key in changes.structure:
+            if wiki_tree.root / key not in wiki_tree:
+                pages_manifest.remove(key)
+    pages_manifest.save()
+    timer.lap("manifest")
+    return report
+
+
+def check_navigation(
+    jobs: Optional[int] = None,
+    fail_fast: bool = False,
+    sitemap_page: Optional[Path] = None,
+    sitemap_headings: bool = False,
+    backlinks: bool = False,
+) -> Report:
+    """Check that every sidebar and footer is up to date, without writing anything.
+
+    Every page is rendered in memory and compared to its files, over a pool of `jobs`
+    processes, each comparing files on a pool of threads. The files that differ are
+    reported as stale. Pass `fail_fast` to raise `StaleFileError` at the first one
+    instead. Nothing is written, not even wikiman's own files. Pass a page as
+    `sitemap_page` to check its site map too, and `backlinks` to check the backlinks
+    in footers, as for `update_navigation`.
+    """
+
+    with common.read_only():
+        wiki_tree = tree.get_wiki_tree()
+        timer = profiling.get_timer()
+        pages = wiki_tree.pages
+        keys = wiki_tree.get_keys()
+        # Every page is rendered, so the manifest is neither loaded nor saved
+        pages_manifest = manifest.Manifest(manifest.get_manifest_path())
+        with show_backlinks(pages_manifest, jobs, backlinks):
+            report = render_pages(
+                pages,
+                keys,
+                pages_manifest,
+                jobs,
+                force=True,
+                get_writer=partial(writer.Checker, fail_fast=fail_fast),
+            )
+        timer.lap("pages")
+
+        if sitemap_page is not None:
+            if sitemap.update_sitemap(
+                sitemap_page, pages_manifest, sitemap_headings, check=True
+            ):
+                if fail_fast:
+                    raise writer.StaleFileError(f"'{sitemap_page}' is out of date.")
+                report.stale.append(sitemap_page)
+            timer.lap("sitemap")
+        return report
+
+
+def render_pages(
+    pages: list[Path],
+    keys: list[str],
+    pages_manifest: manifest.Manifest,
+    jobs: Optional[int] = None,
+    force: bool = False,
+    get_writer: Callable[[], writer.Writer] = writer.Writer,
+) -> Report:
+    """Render pages over a pool of processes, updating the manifest but not saving it.
+
+    Pages are handed out in chunks, and each chunk gets its own writer for its files.
+    """
+
+    old_entries = [pages_manifest.get(key) for key in keys]
+    report = Report()
+    workers = get_workers(jobs, len(keys))
+    size = get_chunk_size(workers, len(keys))
+    with get_executor(workers) as executor:
+        results = executor.map(
+            update_chunk,
+            get_chunks(pages, size),
+            get_chunks(old_entries, size),
+            repeat(force),
+            repeat(get_writer),
+        )
+        try:
+            for chunk_keys, (entries, chunk_report) in zip(
+                get_chunks(keys, size), results
+            ):
+                for key, entry in zip(chunk_keys, entries):
+                    pages_manifest.update(key, entry)
+                report.add(chunk_report)
+                for timing in chunk_report.timings:
+                    profiling.record(timing)
+        except BaseException:
+            # Don't wait for chunks that haven't started, e.g. to fail fast
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return report
+
+
+def scan_pages(
+    pages: list[Path],
+    keys: list[str],
+    pages_manifest: manifest.Manifest,
+    jobs: Optional[int] = None,
+) -> None:
+    """Scan pages over a pool of processes, updating the manifest but not saving it.
+
+    Only pages whose content changed are read, and their manifest entries are then up
+    to date, so that rendering them afterwards doesn't read them again.
+    """
+
+    old_entries = [pages_manifest.get(key) for key in keys]
+    workers = get_workers(jobs, len(keys))
+    size = get_chunk_size(workers, len(keys))
+    with get_executor(workers) as executor:
+        results = executor.map(
+            scan_chunk, get_chunks(pages, size), get_chunks(old_entries, size)
+        )
+        for chunk_keys, entries in zip(get_chunks(keys, size), results):
+            for key, entry in zip(chunk_keys, entries):
+                pages_manifest.update(key, entry)
+
+
+def scan_chunk(
+    pages: list[Path], old_entries: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Get the manifest entries of some pages, only parsing those that changed."""
+
+    return [scan_page(page, old_entry) for page, old_entry in zip(pages, old_entries)]
+
+
+def get_link_graph(
+    jobs: Optional[int] = None, pages_manifest: Optional[manifest.Manifest] = None
+) -> links.LinkGraph:
+    """Get the links between pages, only reading the pages changed since last time.
+
+    Pages are scanned over a pool of `jobs` processes, and the manifest is saved with
+    their links. The manifest is loaded from the wiki, unless one is passed.
+    """
+
+    wiki_tree = tree.get_wiki_tree()
+    timer = profiling.get_timer()
+    if pages_manifest is None:
+        pages_manifest = manifest.Manifest.load(manifest.get_manifest_path())
+    timer.lap("manifest")
+    scan_pages(wiki_tree.pages, wiki_tree.get_keys(), pages_manifest, jobs)
+    timer.lap("scan")
+    graph = links.get_link_graph(pages_manifest)
+    timer.lap("links")
+    if not common.get_context().read_only:
+        pages_manifest.save()
+    return graph
+
+
+@contextmanager
+def show_backlinks(
+    pages_manifest: manifest.Manifest, jobs: Optional[int], backlinks: bool = True
+) -> Iterator[None]:
+    """List the pages linking to each page in footers rendered within, if asked to.
+
+    Every page is scanned for links first, updating the manifest but not saving it.
+    """
+
+    if not backlinks:
+        yield
+        return
+
+    wiki_tree = tree.get_wiki_tree()
+    timer = profiling.get_timer()
+    scan_pages(wiki_tree.pages, wiki_tree.get_keys(), pages_manifest, jobs)
+    context = common.get_context()
+    context.backlinks = links.get_link_graph(pages_manifest).backlinks
+    timer.lap("links")
+    try:
+        yield
+    finally:
+        context.backlinks = None
+
+
+def update_pages(pages: Iterable[Path], pages_manifest: manifest.Manifest) -> Report:
+    """Update the sidebars and footers of just some pages, in the current process.
+
+    Only use this when the structure of the wiki hasn't changed, e.g. when only the
+    content of these pages has. The manifest is updated, but not saved.
+    """
+
+    root = tree.get_wiki_tree().root
+    pages = list(pages)
+    keys = [page.relative_to(root).as_posix() for page in pages]
+    entries, report = update_chunk(pages, [pages_manifest.get(key) for key in keys])
+    for key, entry in zip(keys, entries):
+        pages_manifest.update(key, entry)
+    for timing in report.timings:
+        profiling.record(timing)
+    return report
+
+
+def update_chunk(
+    pages: list[Path],
+    old_entries: list[dict[str, Any]],
+    force: bool = False,
+    get_writer: Callable[[], writer.Writer] = writer.Writer,
+) -> tuple[list[dict[str, Any]], Report]:
+    """Update the sidebars and footers of some pages, writing files while rendering."""
+
+    report = Report()
+    entries: list[dict[str, Any]] = []
+    with get_writer() as file_writer:
+        for page, old_entry in zip(pages, old_entries):
+            entry, page_report = update_page(page, old_entry, file_writer, force)
+            entries.append(entry)
+            report.add(page_report)
+    # Note the files of rendered pages as they are on disk now that they are written
+    rendered = set(report.rendered)
+    for page, entry in zip(pages, entries):
+        if page in rendered:
+            entry["files"] = get_navigation_stats(page)
+    if file_writer.writes:
+        report.written += len(file_writer.changed)
+    else:
+        report.stale.extend(file_writer.changed)
+    report.unchanged += file_writer.unchanged
+    return entries, report
+
+
+def update_page(
+    page: Path,
+    old_entry: dict[str, Any],
+    file_writer: writer.Writer,
+    force: bool = False,
+) -> tuple[dict[str, Any], Report]:
+    """Update the sidebar and footer of a page if they are stale, queueing the files."""
+
+    report = Report()
+    timer = profiling.get_timer(os.fspath(page), report.timings.append)
+    entry = scan_page(page, old_entry)
+    timer.lap("scan")
+
+    page_tree = api.get_tree(page)
+    timer.lap("tree")
+    nav = api.get_footer(page)
+    entry["nav"] = manifest.get_digest(page_tree, nav)
+    entry["files"] = get_navigation_stats(page)
+    timer.lap("nav")
+
+    # Sidebars and footers that are missing or were changed by hand are stale, too
+    is_stale = (
+        force
+        or entry["toc"] != old_entry.get("toc")
+        or entry["nav"] != old_entry.get("nav")
+        or entry["files"] is None
+        or entry["files"] != old_entry.get("files")
+    )
+    if is_stale:
+        toc = api.format_toc(page, entry["headings"])
+        timer.lap("toc")
+        write_navigation(page, get_sidebar(page_tree, toc), nav, file_writer)
+        timer.lap("write")
+        report.rendered.append(page)
+
+    return entry, report
+
+
+# * -------------------------------------------------------------------------------- * #
+# * WORKERS
+
+
+def get_chunk_size(workers: int, count: int) -> int:
+    """Get the size of the chunks of pages handed out, a few for each worker."""
+
+    return max(1, count if workers == 1 else count // (workers * 4))
+
+
+def get_chunks(items: list[Any], size: int) -> list[list[Any]]:
+    """Split items into chunks of a size, to be handed to workers."""
+
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+class SerialExecutor:
+    """Map like a process pool does, but in the current process."""
+
+    def __enter__(self) -> "SerialExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+    def map(
+        self, fn: Callable[..., Any], *iterables: Iterable[Any], chunksize: int = 1
+    ) -> Iterator[Any]:
+        return map(fn, *iterables)
+
+
+def get_workers(jobs: Optional[int], count: int) -> int:
+    """Get the number of workers for some number of pages, defaulting to the cores."""
+
+    jobs = jobs or os.cpu_count() or 1
+    return max(1, min(jobs, count))
+
+
+def get_executor(
+    workers: int,
+) -> Union[SerialExecutor, "SharedExecutor", "ProcessPoolExecutor"]:
+    """Get a pool of worker processes sharing the context, or run serially for one.
+
+    The pool shared by several wikis is used instead if the wiki is one of them, see
+    `share_pool`.
+    """
+
+    if workers == 1:
+        return SerialExecutor()
+
+    context = common.get_context()
+    if _shared_executor is not None and _shared_executor.has(context):
+        return _shared_executor
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    context.remote_url  # Resolve it once, rather than in every worker
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=common.set_context, initargs=(context,)
+    )
+
+
+class SharedExecutor:
+    """Map on a pool of worker processes shared by several wikis, in the current one.
+
+    Each worker gets every wiki once, when it starts. The settings of the current run,
+    which may have changed since, are sent along with each chunk of pages instead. The
+    pool outlives each use, and chunks already handed out are left to finish.
+    """
+
+    def __init__(self, executor: "ProcessPoolExecutor", contexts: list[common.Context]):
+
+        self.executor = executor
+        self.contexts = contexts
+        self.trees = [context.tree for context in contexts]
+
+    def __enter__(self) -> "SharedExecutor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+    def has(self, context: common.Context) -> bool:
+        """Check whether the workers have the wiki of a context, as it is now."""
+
+        return any(
+            context is other and context.tree is wiki_tree
+            for other, wiki_tree in zip(self.contexts, self.trees)
+        )
+
+    def map(
+        self, fn: Callable[..., Any], *iterables: Iterable[Any], chunksize: int = 1
+    ) -> Iterator[Any]:
+        context = common.get_context()
+        index = next(i for i, other in enumerate(self.contexts) if other is context)
+        return self.executor.map(
+            partial(run_in_context, index, context.get_settings(), fn), *iterables
+        )
+
+
+_shared_executor: Optional[SharedExecutor] = None
+
+
+@contextmanager
+def share_pool(
+    contexts: list[common.Context], jobs: Optional[int] = None
+) -> Iterator[None]:
+    """Update several wikis on one pool of `jobs` worker processes within.
+
+    Every wiki is discovered up front, so that each worker gets them all once. A wiki
+    whose structure changes within is updated on a pool of its own again, as is a wiki
+    that can't be discovered, which is left to fail when it is updated.
+    """
+
+    global _shared_executor
+    discovered: list[common.Context] = []
+    for context in contexts:
+        with common.use_context(context):
+            try:
+                context.tree
+                context.remote_url
+            except Exception:
+                continue
+        discovered.append(context)
+    workers = jobs or os.cpu_count() or 1
+    if workers == 1:
+        yield
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=set_contexts, initargs=(discovered,)
+    ) as executor:
+        _shared_executor = SharedExecutor(executor, discovered)
+        try:
+            yield
+        finally:
+            _shared_executor = None
+
+
+# The wikis a worker of a shared pool works on
+_contexts: list[common.Context] = []
+
+
+def set_contexts(contexts: list[common.Context]) -> None:
+    """Keep the wikis a shared pool works on, in a worker process."""
+
+    _contexts[:] = contexts
+
+
+def run_in_context(
+    index: int, settings: dict[str, Any], fn: Callable[..., Any], *args: Any
+) -> Any:
+    """Call a function on one of the wikis of a shared pool, in a worker process."""
+
+    context = _contexts[index]
+    for name, value in settings.items():
+        setattr(context, name, value)
+    common.set_context(context)
+    return fn(*args)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * PAGES
+
+
+def scan_page(page: Path, old_entry: dict[str, Any]) -> dict[str, Any]:
+    """Get the manifest entry for a page, only parsing it if its content changed."""
+
+    stat = os.stat(page)
+    entry = dict(old_entry, size=stat.st_size, mtime=stat.st_mtime_ns)
+    if all(old_entry.get(name) == entry[name] for name in ("size", "mtime", "toc")):
+        return entry
+
+    content = page.read_bytes()
+    entry["hash"] = manifest.get_digest(content)
+    if entry["hash"] != old_entry.get("hash") or "toc" not in old_entry:
+        text = content.decode("utf-8")
+        headings = api.parse_headings(text)
+        entry["headings"] = [list(heading) for heading in headings]
+        entry["links"] = links.find_links(text)
+        entry["toc"] = manifest.get_digest(entry["headings"])
+    return entry
+
+
+def get_sidebar(page_tree: str, toc: str) -> str:
+    """Get the sidebar for a page given its tree and table of contents."""
+
+    return common.MD_NEWLINE.join(
+        [f"{MD_HEAD}Directory", page_tree, f"{MD_HEAD}Contents", toc]
+    )
+
+
+def get_navigation_stats(page: Path) -> Optional[list[list[int]]]:
+    """Get the size and modification time of the sidebar and footer of a page.
+
+    Returns `None` if either of them is missing.
+    """
+
+    context = common.get_context()
+    try:
+        stats = [
+            os.stat(page.parent / filename)
+            for filename in (context.sidebar_filename, context.footer_filename)
+        ]
+    except FileNotFoundError:
+        return None
+    return [[stat.st_size, stat.st_mtime_ns] for stat in stats]
+
+
+def write_navigation(
+    page: Path, sidebar_text: str, footer_text: str, file_writer: writer.Writer
+) -> None:
+    """Queue the sidebar and footer of a page, which are skipped if up to date."""
+
+    context = common.get_context()
+    file_writer.write(page.parent / context.sidebar_filename, sidebar_text)
+    file_writer.write(page.parent / context.footer_filename, footer_text)
@@ -0,0 +1,259 @@
+"""Time the phases of a command, overall and per page, to see where the time goes.
+
+Phases are timed by laps of a timer, each lap ending one phase and starting the next, so
+that pages being processed don't pay for a context manager per phase. Timers do nothing
+unless profiling is on, which is set in the context so that worker processes see it.
+
+Every lap is passed to the hooks added with `add_hook`. For example, to time a script:
+
+    profiler = profiling.Profiler()
+    profiling.add_hook(profiler.add)
+    common.get_context().profile = True
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional, TextIO, Union
+
+from wikiman import common
+
+# Show this many of the slowest pages in the summary
+SLOWEST = 10
+
+NANOSECONDS = 1e9
+
+
+class Timing(NamedTuple):
+    """The wall and CPU time spent in one phase, for one page if any."""
+
+    phase: str
+    page: Optional[str]  # The path of the page
+    wall: int  # nanoseconds
+    cpu: int  # nanoseconds, of the thread doing the work
+
+
+Hook = Callable[[Timing], None]
+
+HOOKS: list[Hook] = []
+
+
+def add_hook(hook: Hook) -> None:
+    """Call a function with the timing of every phase while profiling."""
+
+    HOOKS.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Stop calling a function added with `add_hook`."""
+
+    HOOKS.remove(hook)
+
+
+def record(timing: Timing) -> None:
+    """Pass the timing of a phase to the hooks."""
+
+    for hook in HOOKS:
+        hook(timing)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * TIMERS
+
+
+class Timer:
+    """Time consecutive phases of work, for a page if given."""
+
+    def __init__(self, page: Optional[str] = None, on_lap: Hook = record):
+
+        self.page = page
+        self.on_lap = on_lap
+        self.wall = time.perf_counter_ns()
+        self.cpu = time.thread_time_ns()
+
+    def lap(self, phase: str) -> None:
+        """End a phase, timed from the last lap or from when timing started."""
+
+        wall = time.perf_counter_ns()
+        cpu = time.thread_time_ns()
+        self.on_lap(Timing(phase, self.page, wall - self.wall, cpu - self.cpu))
+        self.wall = wall
+        self.cpu = cpu
+
+
+class NullTimer:
+    """Time nothing, when not profiling."""
+
+    def lap(self, phase: str) -> None:
+        """Do nothing."""
+
+
+NULL_TIMER = NullTimer()
+
+
+def get_timer(
+    page: Optional[str] = None, on_lap: Hook = record
+) -> Union[Timer, NullTimer]:
+    """Get a timer for phases of work, which only times them if profiling."""
+
+    return Timer(page, on_lap) if common.get_context().profile else NULL_TIMER
+
+
+# * -------------------------------------------------------------------------------- * #
+# * PROFILER
+
+
+class Stats:
+    """The number of times a phase ran, and the wall and CPU time spent in it."""
+
+    def __init__(self):
+
+        self.count = 0
+        self.wall = 0
+        self.cpu = 0
+
+    def add(self, timing: Timing) -> None:
+        """Count a phase and add its time."""
+
+        self.count += 1
+        self.wall += timing.wall
+        self.cpu += timing.cpu
+
+    def update(self, other: "Stats") -> None:
+        """Add the counts and times of other stats to these."""
+
+        self.count += other.count
+        self.wall += other.wall
+        self.cpu += other.cpu
+
+    def to_dict(self) -> dict[str, Any]:
+        """Get the stats, with times in seconds."""
+
+        return {
+            "count": self.count,
+            "wall": self.wall / NANOSECONDS,
+            "cpu": self.cpu / NANOSECONDS,
+        }
+
+
+class Profiler:
+    """Totals of every phase, overall and per page."""
+
+    def __init__(self):
+
+        self.phases: dict[str, Stats] = {}
+        self.pages: dict[str, dict[str, Stats]] = {}
+        self.total = Stats()
+        self.start()
+
+    def start(self) -> None:
+        """Start timing the whole command."""
+
+        self.wall = time.perf_counter_ns()
+        self.cpu = time.process_time_ns()
+
+    def stop(self) -> None:
+        """Stop timing the whole command."""
+
+        self.total.add(
+            Timing(
+                "total",
+                None,
+                time.perf_counter_ns() - self.wall,
+                time.process_time_ns() - self.cpu,
+            )
+        )
+
+    def add(self, timing: Timing) -> None:
+        """Add the timing of a phase."""
+
+        self.phases.setdefault(timing.phase, Stats()).add(timing)
+        if timing.page is not None:
+            page_phases = self.pages.setdefault(timing.page, {})
+            page_phases.setdefault(timing.phase, Stats()).add(timing)
+
+    def get_slowest(self, count: Optional[int] = SLOWEST) -> list[tuple[str, Stats]]:
+        """Get the pages that took the longest in all of their phases combined."""
+
+        totals: list[tuple[str, Stats]] = []
+        for page, page_phases in self.pages.items():
+            total = Stats()
+            for stats in page_phases.values():
+                total.update(stats)
+            totals.append((page, total))
+        totals.sort(key=lambda item: item[1].wall, reverse=True)
+        return totals[:count]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Get every phase overall and per page, with the slowest pages first."""
+
+        return {
+            "total": self.total.to_dict(),
+            "phases": {name: stats.to_dict() for name, stats in self.phases.items()},
+            "pages": [
+                {
+                    "page": page,
+                    **total.to_dict(),
+                    "phases": {
+                        name: stats.to_dict()
+                        for name, stats in self.pages[page].items()
+                    },
+                }
+                for page, total in self.get_slowest(None)
+            ],
+        }
+
+    def summarize(self, file: Optional[TextIO] = None) -> None:
+        """Print a table of the phases and the slowest pages, to stderr by default."""
+
+        file = file or sys.stderr
+        print(f"{'Wall (s)':>10}{'CPU (s)':>10}{'Count':>10}  Phase", file=file)
+        for name, stats in [("total", self.total), *self.phases.items()]:
+            print(f"{format_stats(stats)}{stats.count:>10}  {name}", file=file)
+        if slowest := self.get_slowest():
+            print(f"\n{'Wall (s)':>10}{'CPU (s)':>10}  Slowest pages", file=file)
+            for page, total in slowest:
+                print(f"{format_stats(total)}  {page}", file=file)
+
+
+def format_stats(stats: Stats) -> str:
+    """Format the wall and CPU time of some stats as columns, in seconds."""
+
+    return f"{stats.wall / NANOSECONDS:>10.3f}{stats.cpu / NANOSECONDS:>10.3f}"
+
+
+@contextmanager
+def profile(output: Union[str, Path, bool] = True) -> Iterator[Profiler]:
+    """Profile everything done within, then print a summary.
+
+    Pass a path to save the profile as well, as JSON if it ends in ".json", or otherwise
+    as a `cProfile` dump of the current process, e.g. for `snakeviz` or `pstats`.
+    """
+
+    context = common.get_context()
+    profiler = Profiler()
+    add_hook(profiler.add)
+    context.profile = True
+
+    path = None if isinstance(output, bool) else Path(output)
+    cprofiler = None
+    if path is not None and path.suffix != ".json":
+        from cProfile import Profile
+
+        cprofiler = Profile()
+        cprofiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        context.profile = False
+        remove_hook(profiler.add)
+        if path is not None and cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(path)
+        elif path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(profiler.to_dict(), file, indent=2)
+        profiler.summarize()
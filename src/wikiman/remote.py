@@ -0,0 +1,155 @@
+"""Resolve the URL of the wiki on GitHub from the Git config, without running Git."""
+
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+# Override the URL with this environment variable, or with this key in the Git config
+REMOTE_URL_VARIABLE = "WIKIMAN_REMOTE_URL"
+REMOTE_URL_SECTION = ("wikiman", "")
+REMOTE_URL_KEY = "remoteurl"
+
+ORIGIN_SECTION = ("remote", "origin")
+URL_KEY = "url"
+
+SECTION = re.compile(
+    r'\[\s*(?P<name>[\w.-]+)(?:\s+"(?P<subsection>(?:\\.|[^"])*)")?\s*\]'
+)
+SCP_LIKE_URL = re.compile(r"(?:[^@/]+@)?(?P<host>[^:/]+):(?P<path>(?!/).*)")
+URL = re.compile(
+    r"(?P<scheme>[\w+.-]+)://(?:[^@/]+@)?(?P<host>[^:/]+)(?::\d+)?/(?P<path>.*)"
+)
+
+ESCAPES = {"n": "\n", "t": "\t", "b": "\b"}
+
+GitConfig = dict[tuple[str, str], dict[str, str]]
+
+
+def get_remote_url(start: Path) -> str:
+    """Get the URL of the wiki that the Git repo containing a path is a clone of."""
+
+    override = os.environ.get(REMOTE_URL_VARIABLE)
+    if override:
+        return get_wiki_url(override)
+    return read_remote_url(start)
+
+
+def read_remote_url(start: Path) -> str:
+    """Read the URL of the wiki from the config of the Git repo containing a path.
+
+    The URL isn't cached here, but once per wiki by its context, see `common.Context`.
+    """
+
+    git_dir = find_git_dir(start)
+    if git_dir is None:
+        raise ValueError(
+            f"No Git repo found at or above '{start}'."
+            f" Clone your wiki, or set {REMOTE_URL_VARIABLE}."
+        )
+
+    config = read_git_config(get_common_dir(git_dir) / "config")
+    override = config.get(REMOTE_URL_SECTION, {}).get(REMOTE_URL_KEY)
+    remote = override or config.get(ORIGIN_SECTION, {}).get(URL_KEY)
+    if not remote:
+        raise ValueError(
+            f"The Git repo at '{git_dir}' has no 'origin' remote."
+            f" Add one, or set {REMOTE_URL_VARIABLE}."
+        )
+    return get_wiki_url(remote)
+
+
+def get_wiki_url(remote: str) -> str:
+    """Get the URL of a wiki from the URL of its Git remote, in HTTPS or SSH form.
+
+    URLs that already point at a wiki, e.g. "https://github.com/user/repo/wiki", are
+    returned as-is, with a trailing slash.
+    """
+
+    url = remote.strip().rstrip("/")
+    if url.endswith("/wiki"):
+        return f"{url}/"
+
+    if match := URL.fullmatch(url):
+        scheme = match["scheme"] if match["scheme"] in ("http", "https") else "https"
+        url = f"{scheme}://{match['host']}/{match['path']}"
+    elif match := SCP_LIKE_URL.fullmatch(url):
+        url = f"https://{match['host']}/{match['path']}"
+
+    url = url.removesuffix(".git").removesuffix(".wiki")
+    return f"{url}/wiki/"
+
+
+# * -------------------------------------------------------------------------------- * #
+# * GIT DIRECTORY
+
+
+def find_git_dir(start: Path) -> Optional[Path]:
+    """Find the Git directory of the repo containing a path, e.g. ".git".
+
+    In worktrees and submodules ".git" is a file pointing to the actual Git directory.
+    """
+
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text(encoding="utf-8").strip()
+            if content.startswith("gitdir:"):
+                return (directory / content.removeprefix("gitdir:").strip()).resolve()
+    return None
+
+
+def get_common_dir(git_dir: Path) -> Path:
+    """Get the Git directory shared by all worktrees, which holds the config."""
+
+    commondir = git_dir / "commondir"
+    if commondir.is_file():
+        return (git_dir / commondir.read_text(encoding="utf-8").strip()).resolve()
+    return git_dir
+
+
+def read_git_config(path: Path) -> GitConfig:
+    """Read the sections and keys of a Git config file. Keys are lowercase."""
+
+    config: GitConfig = {}
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return config
+
+    section: dict[str, str] = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        if match := SECTION.match(line):
+            name = (match["name"].lower(), match["subsection"] or "")
+            section = config.setdefault(name, {})
+            line = line[match.end() :].strip()
+            if not line:
+                continue
+        key, _, value = line.partition("=")
+        section[key.strip().lower()] = get_config_value(value)
+    return config
+
+
+def get_config_value(value: str) -> str:
+    """Get a value from the Git config, removing quotes and trailing comments."""
+
+    result: list[str] = []
+    in_quotes = False
+    characters = iter(value.strip())
+    for character in characters:
+        if character == "\\":
+            escaped = next(characters, "")
+            result.append(ESCAPES.get(escaped, escaped))
+        elif character == '"':
+            in_quotes = not in_quotes
+        elif character in "#;" and not in_quotes:
+            break
+        else:
+            result.append(character)
+    return "".join(result).strip()
@@ -0,0 +1,235 @@
+"""Scan pages for headings without rendering them to HTML.
+
+The scanner mirrors how Python-Markdown and its `toc` extension find headings and
+generate their ids, but only looks at each line once. Pages with Markdown that the
+scanner doesn't model (e.g. inline markup in headings, or headings nested in lists,
+quotes, or raw HTML other than a comment alone in its block) are handed to a reused
+`markdown.Markdown` instance instead.
+
+Unlike plain Python-Markdown, lines in fenced code blocks are never headings, just as
+on GitHub.
+"""
+
+import html
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+if TYPE_CHECKING:
+    from markdown import Markdown
+
+TAB_LENGTH = 4  # Python-Markdown expands tabs to this many spaces
+
+ATX_HEADING = re.compile(r"(?P<level>#{1,6})(?P<header>(?:\\.|[^\\])*?)#*$")
+SETEXT_UNDERLINE = re.compile(r"(?:=+|-+)[ ]*$")
+FENCE = re.compile(r"(?P<fence>~{3,}|`{3,})[ ]*")
+FENCE_INFO = re.compile(r"\.?[\w#.+-]*[ ]*")
+CODE_SPAN = re.compile(r"(?<!\\)(`+)(.+?)(?<!`)\1(?!`)")
+INLINE_MARKUP = re.compile(r"[\\*_\[\]<>&]")
+HTML_BLOCK = re.compile(r" {0,3}<")
+COMMENT_BLOCK = re.compile(r" {0,3}<!--(?:(?!-->).)*-->[ ]*$")
+QUOTE = re.compile(r"(?: {0,3}>)+ ?")
+LIST_ITEM = re.compile(r" *(?:[*+-]|\d+\.)[ ]+")
+HORIZONTAL_RULE = re.compile(
+    r" {0,3}(?:(?:-+ {0,2}){3,}|(?:_+ {0,2}){3,}|(?:\*+ {0,2}){3,})$"
+)
+
+
+class UnsupportedMarkdownError(ValueError):
+    """The scanner can't find the headings in this Markdown as Python-Markdown would."""
+
+
+# * -------------------------------------------------------------------------------- * #
+# * HEADINGS
+
+
+def get_headings(page: Path) -> list[tuple[str, str]]:
+    """Get the name and id of the most significant headings in a page."""
+
+    with open(page, encoding="utf-8") as file:
+        try:
+            return get_top_headings(scan_headings(file))
+        except UnsupportedMarkdownError:
+            file.seek(0)
+            return render_headings(file.read())
+
+
+def parse_headings(content: str) -> list[tuple[str, str]]:
+    """Get the name and id of the most significant headings in Markdown content."""
+
+    try:
+        return get_top_headings(scan_headings(content.splitlines()))
+    except UnsupportedMarkdownError:
+        return render_headings(content)
+
+
+def get_top_headings(headings: list[tuple[int, str]]) -> list[tuple[str, str]]:
+    """Get the name and id of the most significant headings, given all headings."""
+
+    from markdown.extensions.toc import nest_toc_tokens, slugify, unique
+
+    used_ids: set[str] = set()
+    tokens: list[Any] = [
+        {"level": level, "name": name, "id": unique(slugify(name, "-"), used_ids)}
+        for level, name in headings
+    ]
+    return [(token["name"], token["id"]) for token in nest_toc_tokens(tokens)]
+
+
+def scan_headings(lines: Iterable[str]) -> list[tuple[int, str]]:
+    """Get the level and name of every heading in some lines of Markdown."""
+
+    headings: list[tuple[int, str]] = []
+    fence: Optional[str] = None  # The fence of the code block we're in, if any
+    first_line: Optional[str] = None  # The first line of a block may be a heading
+    is_block_start = True  # Whether the next line starts a block
+    is_code = False  # Whether we're in an indented code block
+    has_lists = False  # Indented lines may be nested in a list rather than code
+    is_comment = False  # Whether the block is a comment, which must end at a blank line
+    is_nested = False  # Whether the block has lines in a quote or a list
+
+    for line in lines:
+        line = line.rstrip("\r\n").expandtabs(TAB_LENGTH)
+
+        # Skip fenced code blocks, which are blocks of their own
+        if fence:
+            if line.rstrip(" ") == fence:
+                fence = None
+                is_block_start = True
+            continue
+        if match := FENCE.match(line):
+            if not FENCE_INFO.fullmatch(line, match.end()):
+                raise UnsupportedMarkdownError("Fence with an unusual info string.")
+            if is_comment:
+                raise UnsupportedMarkdownError("Raw HTML.")
+            fence = match["fence"]
+            first_line = None
+            is_code = False
+            is_nested = False
+            continue
+
+        # Blank lines separate blocks
+        if not line.strip(" "):
+            first_line = None
+            is_block_start = True
+            is_code = False
+            is_comment = False
+            is_nested = False
+            continue
+        if is_comment:
+            raise UnsupportedMarkdownError("Raw HTML.")
+
+        # Indented code blocks end at the first line that isn't indented
+        is_indented = line.startswith(" " * TAB_LENGTH)
+        if is_code:
+            if is_indented:
+                continue
+            is_block_start = True
+            is_code = False
+
+        # A comment alone in its block, such as a marker, is a block of its own
+        if is_block_start and COMMENT_BLOCK.match(line):
+            is_comment = True
+            continue
+
+        # Underlines may make a heading of a line in a quote or a list, nested in it
+        if is_nested and SETEXT_UNDERLINE.match(line):
+            raise UnsupportedMarkdownError("Heading nested in a quote or a list.")
+        is_nested = check_nesting(line, has_lists) or is_nested
+        has_lists = has_lists or bool(LIST_ITEM.match(line))
+
+        # ATX headings may be on any line of a block, and end the block
+        if line.startswith("#"):
+            if not (match := ATX_HEADING.match(line)):
+                raise UnsupportedMarkdownError("Heading ends with a backslash.")
+            headings.append((len(match["level"]), get_name(match["header"])))
+            first_line = None
+            is_block_start = True
+
+        # Setext headings are underlined, must be the first line of a block, and end it
+        elif first_line is not None and SETEXT_UNDERLINE.match(line):
+            level = 1 if line.startswith("=") else 2
+            headings.append((level, get_name(first_line)))
+            first_line = None
+            is_block_start = True
+
+        # Indented blocks are code, and can't start with a heading
+        elif is_block_start:
+            first_line = None if is_indented else line
+            is_code = is_indented
+            # Unless it is underlined, a horizontal rule ends the block
+            is_block_start = bool(HORIZONTAL_RULE.match(line))
+
+        # Horizontal rules end the block
+        elif HORIZONTAL_RULE.match(line):
+            first_line = None
+            is_block_start = True
+        else:
+            first_line = None
+
+    if fence:
+        raise UnsupportedMarkdownError("Code fence is never closed.")
+    return headings
+
+
+def check_nesting(line: str, has_lists: bool) -> bool:
+    """Check that a line doesn't start a heading nested in HTML, a quote, or a list.
+
+    Returns whether the line is in a quote or a list.
+    """
+
+    if HTML_BLOCK.match(line):
+        raise UnsupportedMarkdownError("Raw HTML.")
+
+    if match := QUOTE.match(line):
+        nested = line[match.end() :]
+    elif match := LIST_ITEM.match(line):
+        nested = line[match.end() :]
+    elif has_lists and line.startswith(" " * TAB_LENGTH):
+        nested = line.lstrip(" ")
+    else:
+        return False
+
+    if nested.startswith("#") or SETEXT_UNDERLINE.match(nested):
+        raise UnsupportedMarkdownError("Heading nested in a quote or a list.")
+    return True
+
+
+def get_name(header: str) -> str:
+    """Get the name of a heading the way the `toc` extension would, from plain text."""
+
+    parts = CODE_SPAN.split(header.strip())
+    # Text, backticks, and code alternate in the parts split by the code span pattern
+    text = parts[::3]
+    code = parts[2::3]
+    if any(INLINE_MARKUP.search(part) for part in text) or any(
+        html.escape(part) != part for part in code
+    ):
+        raise UnsupportedMarkdownError("Inline markup in a heading.")
+
+    name_parts = [text[0]]
+    for code_part, text_part in zip(code, text[1:]):
+        name_parts.extend((code_part.strip(), text_part))
+    return " ".join("".join(name_parts).split())
+
+
+# * -------------------------------------------------------------------------------- * #
+# * FALLBACK
+
+_md: Optional["Markdown"] = None
+
+
+def render_headings(content: str) -> list[tuple[str, str]]:
+    """Get the most significant headings by rendering Markdown content to HTML."""
+
+    global _md
+    if _md is None:
+        from markdown import Markdown
+
+        _md = Markdown(extensions=["toc", "fenced_code"])
+    _md.reset()
+    _md.convert(content)
+    return [
+        (token["name"], token["id"])
+        for token in _md.toc_tokens  # type: ignore  # pylint: disable=no-member
+    ]
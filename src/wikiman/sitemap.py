@@ -0,0 +1,124 @@
+"""Generate a site map of the wiki in a page, such as the home page.
+
+The site map is a nested list of links to every page in reading order, optionally with
+the headings listed in the table of contents of each page. It goes between markers in
+the page, or at the end of the page the first time. It is made from the index of the
+wiki and the headings already in the manifest, line by line as it is streamed to disk,
+so that the site map of a large wiki is never held in memory all at once.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from wikiman import manifest, tree, utils, writer
+
+START_MARKER = "<!-- wikiman sitemap start -->"
+END_MARKER = "<!-- wikiman sitemap end -->"
+
+# Indent nested items of the list by this much per level
+INDENT = "  "
+
+
+def update_sitemap(
+    page: Path,
+    pages_manifest: manifest.Manifest,
+    headings: bool = False,
+    check: bool = False,
+) -> bool:
+    """Update the site map in a page if it changed. Returns whether it changed.
+
+    The page is written to a hidden temporary file which then replaces it, and only if
+    its content changed. Pass `check` to only check whether it would change. A site map
+    that was started but never ended raises `ValueError`, leaving the page as it was.
+    """
+
+    old_hash = hashlib.blake2b()
+    new_hash = hashlib.blake2b()
+    temporary_path = page.with_name(f".{page.name}{writer.TEMPORARY_SUFFIX}")
+    try:
+        with open(page, encoding="utf-8") as old_file, open(
+            os.devnull if check else temporary_path, "w", encoding="utf-8"
+        ) as new_file:
+            old_lines = hash_lines(old_file, old_hash)
+            try:
+                for line in replace_sitemap(
+                    old_lines, get_lines(pages_manifest, headings)
+                ):
+                    new_hash.update(line.encode("utf-8"))
+                    new_file.write(line)
+            except ValueError as exception:
+                raise ValueError(f"{exception} Fix '{page}' first.") from exception
+        changed = old_hash.digest() != new_hash.digest()
+        if changed and not check:
+            os.replace(temporary_path, page)
+    finally:
+        if not check:
+            temporary_path.unlink(missing_ok=True)
+    return changed
+
+
+def hash_lines(lines: Iterable[str], line_hash: Any) -> Iterator[str]:
+    """Pass lines through, hashing each one."""
+
+    for line in lines:
+        line_hash.update(line.encode("utf-8"))
+        yield line
+
+
+def replace_sitemap(old_lines: Iterator[str], sitemap: Iterable[str]) -> Iterator[str]:
+    """Get the lines of a page with its site map replaced, or added at the end.
+
+    The markers are set apart by blank lines, so that they are blocks of their own. If
+    the end marker is missing, the lines after the start marker may be the page's own,
+    so rather than drop them, `ValueError` is raised once they are all read.
+    """
+
+    last_line = "\n"
+    for line in old_lines:
+        if line.strip() != START_MARKER:
+            last_line = line
+            yield line
+            continue
+        # Skip the old site map, up to and including its end marker
+        for line in old_lines:
+            if line.strip() == END_MARKER:
+                break
+        else:
+            raise ValueError(f"The site map has no end marker, '{END_MARKER}'.")
+        yield from get_sitemap(sitemap)
+        yield from old_lines
+        return
+
+    if not last_line.endswith("\n"):
+        yield "\n"
+    yield "\n"
+    yield from get_sitemap(sitemap)
+
+
+def get_sitemap(sitemap: Iterable[str]) -> Iterator[str]:
+    """Get the lines of a site map between its markers."""
+
+    yield f"{START_MARKER}\n\n"
+    yield from sitemap
+    yield f"\n{END_MARKER}\n"
+
+
+def get_lines(
+    pages_manifest: manifest.Manifest, headings: bool = False
+) -> Iterator[str]:
+    """Get the lines of the site map, linking to every page in reading order."""
+
+    wiki_tree = tree.get_wiki_tree()
+    for page_id in wiki_tree.get_preorder_ids():
+        page = wiki_tree.get_path(page_id)
+        indent = INDENT * wiki_tree.depths[page_id]
+        yield f"{indent}- {utils.get_page_link(page)}\n"
+        if not headings:
+            continue
+        page_url = utils.get_page_url(page)
+        entry = pages_manifest.get(wiki_tree.get_key(page_id))
+        for name, id_ in entry.get("headings", []):
+            link = utils.get_md_link(name, f"{page_url}#{id_}")
+            yield f"{indent}{INDENT}- {link}\n"
@@ -0,0 +1,276 @@
+"""Plan structural edits of the wiki, and carry them out as a journaled transaction.
+
+Pages are ordered by the numbers prepended to their directories, so inserting, moving,
+or removing a page renumbers its siblings. Rather than moving files one at a time, an
+edit is planned in memory as renames of whole page directories, which carry their
+subtrees along, then executed in an order where no rename clobbers another directory.
+
+A journal in the hidden directory of the wiki records the plan and each step as it is
+done, so that an interrupted edit can be resumed or rolled back.
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Optional, TextIO
+
+from wikiman import common, profiling, utils
+
+# Operations, each with a source and a destination
+RENAME = "rename"  # Rename a directory
+CREATE = "create"  # Create an empty page. The source is the directory of the page.
+
+# Directories are moved out of the way under these prefixes, hidden from the wiki tree
+TEMPORARY_PREFIX = ".wikiman-"
+REMOVED_PREFIX = ".wikiman-removed-"
+
+Step = tuple[str, Path, Path]
+
+
+class InterruptedEditError(RuntimeError):
+    """An earlier edit of the wiki was interrupted, and is still in the journal."""
+
+
+# * -------------------------------------------------------------------------------- * #
+# * PLAN
+
+
+class Plan:
+    """The steps of a structural edit of the wiki, planned before any are taken."""
+
+    def __init__(self, root: Path):
+
+        self.root = root
+        self.steps: list[Step] = []
+
+    def locate(self, path: Path) -> Path:
+        """Get where a path will be after the renames planned so far."""
+
+        for operation, source, destination in self.steps:
+            if operation == RENAME and (path == source or source in path.parents):
+                path = destination / path.relative_to(source)
+        return path
+
+    def arrange(self, under: Path, pages: list[Path]) -> None:
+        """Plan to number the directories of some pages in order, below a page.
+
+        Pages planned to be created must already be at their final position.
+        """
+
+        directory = self.locate(under).parent
+        renames: dict[Path, Path] = {}
+        for position, page in enumerate(pages):
+            source = self.locate(page.parent)
+            destination = directory / utils.get_dir_name(page.stem, position)
+            if source != destination:
+                renames[source] = destination
+        self.rename(renames)
+
+    def rename(self, renames: dict[Path, Path]) -> None:
+        """Plan to rename directories, in an order where none clobbers another.
+
+        A directory is renamed once the one at its destination has moved on. Only when
+        every remaining rename is waiting on another, in a cycle, is one directory moved
+        to a temporary name first.
+        """
+
+        renames = dict(renames)
+        # Renames waiting for a directory to move on, by that directory
+        waiting = {dst: src for src, dst in renames.items() if dst in renames}
+        ready = [src for src, dst in renames.items() if dst not in renames]
+        while renames:
+            if ready:
+                source = ready.pop()
+                self.steps.append((RENAME, source, renames.pop(source)))
+            else:
+                source = next(iter(renames))
+                temporary = source.with_name(TEMPORARY_PREFIX + source.name)
+                self.steps.append((RENAME, source, temporary))
+                destination = renames.pop(source)
+                renames[temporary] = destination
+                waiting[destination] = temporary
+            if source in waiting:
+                ready.append(waiting.pop(source))
+
+    def remove(self, page: Path) -> None:
+        """Plan to remove a page and its subpages.
+
+        The directory of the page is moved out of the wiki as a step that can be undone,
+        and only deleted once every step is done.
+        """
+
+        directory = self.locate(page.parent)
+        self.rename({directory: directory.with_name(REMOVED_PREFIX + directory.name)})
+
+    def create(self, page: Path) -> None:
+        """Plan to create an empty page in a directory of its own."""
+
+        self.steps.append((CREATE, page.parent, page))
+
+    def execute(self) -> None:
+        """Take the planned steps, rolling back if any of them fails."""
+
+        if not self.steps:
+            return
+        journal_path = get_journal_path(self.root)
+        if journal_path.exists():
+            raise InterruptedEditError(
+                "An earlier edit of the wiki was interrupted."
+                " Run `wikiman resume` or `wikiman rollback` first."
+            )
+
+        timer = profiling.get_timer()
+        common.init_cache_dir(self.root)
+        plan = [
+            [operation, self.get_key(source), self.get_key(destination)]
+            for operation, source, destination in self.steps
+        ]
+        with open(journal_path, "w", encoding="utf-8") as journal:
+            write_line(journal, plan)
+        take_steps(self.steps, 0, journal_path)
+        delete_removed(self.steps)
+        timer.lap("edit")
+
+    def get_key(self, path: Path) -> str:
+        """Get a path relative to the root of the wiki, as recorded in the journal."""
+
+        return path.relative_to(self.root).as_posix()
+
+
+# * -------------------------------------------------------------------------------- * #
+# * STEPS
+
+
+def take_steps(steps: list[Step], start: int, journal_path: Path) -> None:
+    """Take steps in order, recording each one that is done in the journal.
+
+    The journal is removed once every step is done. If a step fails, the steps already
+    taken are undone and the journal is removed, too.
+    """
+
+    done = start
+    try:
+        with open(journal_path, "a", encoding="utf-8") as journal:
+            for step in steps[start:]:
+                take_step(*step)
+                done += 1
+                write_line(journal, done)
+    except BaseException:
+        undo_steps(steps[:done])
+        journal_path.unlink()
+        raise
+    journal_path.unlink()
+
+
+def take_step(operation: str, source: Path, destination: Path) -> None:
+    """Take a step of a plan."""
+
+    if destination.exists():
+        raise FileExistsError(f"Can't {operation} '{destination}', it already exists.")
+    if operation == RENAME:
+        source.rename(destination)
+    elif operation == CREATE:
+        source.mkdir(exist_ok=True)
+        destination.touch()
+    else:
+        raise ValueError(f"Unknown operation in the journal: {operation}")
+
+
+def is_done(operation: str, source: Path, destination: Path) -> bool:
+    """Check whether a step was taken, even if it was never recorded in the journal."""
+
+    if operation == RENAME:
+        return destination.exists() and not source.exists()
+    return destination.exists()
+
+
+def undo_steps(steps: list[Step]) -> None:
+    """Undo steps that were taken, in reverse order."""
+
+    for operation, source, destination in reversed(steps):
+        if operation == RENAME:
+            destination.rename(source)
+        elif operation == CREATE:
+            destination.unlink()
+            source.rmdir()
+
+
+def delete_removed(steps: list[Step]) -> None:
+    """Delete the directories of removed pages, once every step is done."""
+
+    for operation, _, destination in steps:
+        if operation == RENAME and destination.name.startswith(REMOVED_PREFIX):
+            shutil.rmtree(destination, ignore_errors=True)
+
+
+def write_line(journal: TextIO, value: object) -> None:
+    """Write a line to the journal, and hand it to the OS right away."""
+
+    journal.write(json.dumps(value) + "\n")
+    journal.flush()
+
+
+# * -------------------------------------------------------------------------------- * #
+# * JOURNAL
+
+
+def get_journal_path(root: Path) -> Path:
+    """Get the path to the journal of structural edits of a wiki."""
+
+    return root / common.CACHE_DIRNAME / common.JOURNAL_FILENAME
+
+
+def read_journal(root: Path) -> Optional[tuple[list[Step], int]]:
+    """Read the steps of an interrupted edit, and how many of them were done.
+
+    The edit may have been interrupted after taking a step but before recording it, so
+    the step after those recorded is checked on disk.
+    """
+
+    journal_path = get_journal_path(root)
+    try:
+        lines = journal_path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return None
+    try:
+        plan = json.loads(lines[0])
+    except (IndexError, ValueError):  # Interrupted before any step was taken
+        return None
+
+    steps = [
+        (operation, root / source, root / destination)
+        for operation, source, destination in plan
+    ]
+    done = 0
+    for line in lines[1:]:
+        try:
+            done = int(line)
+        except ValueError:  # The last line may have been cut short
+            break
+    if done < len(steps) and is_done(*steps[done]):
+        done += 1
+    return steps, done
+
+
+def resume(root: Path) -> bool:
+    """Finish an interrupted edit of a wiki. Returns whether there was one."""
+
+    journal = read_journal(root)
+    if journal is None:
+        get_journal_path(root).unlink(missing_ok=True)
+        return False
+    steps, done = journal
+    take_steps(steps, done, get_journal_path(root))
+    delete_removed(steps)
+    return True
+
+
+def rollback(root: Path) -> bool:
+    """Undo the steps of an interrupted wiki edit. Returns whether there was one."""
+
+    journal = read_journal(root)
+    if journal is not None:
+        steps, done = journal
+        undo_steps(steps[:done])
+    get_journal_path(root).unlink(missing_ok=True)
+    return journal is not None
@@ -0,0 +1,422 @@
+"""An index of the pages in the wiki, built from a single walk of the file structure."""
+
+import json
+import os
+import time
+from array import array
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Optional
+
+from wikiman import common
+from wikiman.names import NameIndex
+
+# Bump this whenever the shape of the cache changes
+CACHE_VERSION = 2
+
+# Don't trust the cache for directories modified this soon before they were walked
+RACY_TIME = 2_000_000_000  # nanoseconds
+
+
+class WikiTree:
+    """The parent, ordered children, position, and depth of every page in the wiki.
+
+    The wiki is walked once with `os.scandir`, and the family of every page is answered
+    from this index afterwards, instead of globbing the file structure on every call.
+
+    Pages are numbered in the order they were walked, and their family is kept in arrays
+    indexed by these ids, with their paths as strings. Paths are only made for the pages
+    asked for, since a path and a dictionary entry for each page would take up most of
+    the memory of a large wiki, and the time to pickle it for each worker process.
+    """
+
+    def __init__(
+        self, root: Path, walk: bool = True, page_pattern: str = common.PAGE_PATTERN
+    ):
+
+        self.root = root
+        self.page_pattern = page_pattern
+        self.paths: list[str] = []  # Paths of the pages by id, in the order walked
+        self.ids: dict[str, int] = {}
+        self.parent_ids = array("i")  # Pages in the root directory are their own parent
+        self.first_child_ids = array("i")  # Each -1 if there is no such page
+        self.last_child_ids = array("i")
+        self.next_sibling_ids = array("i")
+        self.positions = array("i")  # Position of a page among its siblings
+        self.depths = array("i")  # Home is at depth zero
+
+        # Modification times of the directories walked, and when the walk started
+        self.directories: dict[str, int] = {}
+        self.walked = time.time_ns()
+
+        # Ids of the next and previous pages, only tabulated once asked for
+        self.next_ids: Optional[array] = None
+        self.prev_ids: Optional[array] = None
+        # Pages by name, only indexed once asked for
+        self.names: Optional[NameIndex] = None
+
+        if walk:
+            self.walk(root)
+            self.set_root_page()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Worker processes don't save the index, and rebuild ids faster than unpickling
+        state = self.__dict__.copy()
+        state["ids"] = {}
+        state["directories"] = {}
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.ids = {path: page_id for page_id, path in enumerate(self.paths)}
+
+    def __contains__(self, page: Path) -> bool:
+        return os.fspath(page) in self.ids
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def pages(self) -> list[Path]:
+        """The pages in the order they were walked (preorder), made on each call."""
+
+        return [Path(path) for path in self.paths]
+
+    def walk(self, root: Path) -> None:
+        """Index the pages in the root directory and all of its subdirectories.
+
+        Directories are walked depth-first with a stack rather than by recursion, so
+        deeply-nested wikis don't hit the recursion limit.
+        """
+
+        stack: list[tuple[str, int, int]] = [(os.fspath(root), -1, 0)]
+        while stack:
+            directory, parent_id, depth = stack.pop()
+
+            files: list[str] = []
+            subdirectories: list[str] = []
+            self.directories[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        subdirectories.append(entry.name)
+                    elif entry.is_file() and fnmatch(entry.name, self.page_pattern):
+                        files.append(entry.name)
+
+            # Pages below a directory without a page of its own are not in the tree
+            if not files:
+                continue
+
+            first_id = len(self.paths)
+            for name in sorted(files):
+                self.add_page(os.path.join(directory, name), parent_id, depth)
+
+            # If each page has its own directory, the first page is its directory's page
+            for name in sorted(subdirectories, reverse=True):
+                stack.append((os.path.join(directory, name), first_id, depth + 1))
+
+    def add_page(self, path: str, parent_id: int, depth: int) -> int:
+        """Index a page by its path, after its parent and its siblings before it.
+
+        Pass a parent id of -1 for pages in the root directory. Returns the new id.
+        """
+
+        page_id = len(self.paths)
+        if parent_id < 0:
+            # Pages in the root directory come first, and are their own parents
+            self.parent_ids.append(page_id)
+            self.positions.append(page_id)
+        else:
+            self.parent_ids.append(parent_id)
+            if (last_id := self.last_child_ids[parent_id]) < 0:
+                self.first_child_ids[parent_id] = page_id
+                self.positions.append(0)
+            else:
+                self.next_sibling_ids[last_id] = page_id
+                self.positions.append(self.positions[last_id] + 1)
+            self.last_child_ids[parent_id] = page_id
+        self.paths.append(path)
+        self.ids[path] = page_id
+        self.first_child_ids.append(-1)
+        self.last_child_ids.append(-1)
+        self.next_sibling_ids.append(-1)
+        self.depths.append(depth)
+        return page_id
+
+    def set_root_page(self) -> None:
+        """Set the home page, which is the first page in the root directory."""
+
+        if not self.paths or os.path.dirname(self.paths[0]) != os.fspath(self.root):
+            raise ValueError(f"No page found in the root of the wiki: {self.root}")
+        self.root_page = Path(self.paths[0])
+
+    # * ---------------------------------------- * #
+    # * CACHE
+
+    @classmethod
+    def load(
+        cls, root: Path, page_pattern: str = common.PAGE_PATTERN
+    ) -> Optional["WikiTree"]:
+        """Load the index of a wiki from its cache, if no directory changed since.
+
+        Adding, removing, or renaming anything in a directory changes its modification
+        time, so checking the directories with `os.stat` is enough to trust the cache.
+        Directories modified just before they were walked may have changed again in the
+        same tick of the clock, so the cache isn't trusted for them.
+        """
+
+        if (data := read_cache(root, page_pattern)) is None:
+            return None
+
+        wiki_tree = cls(root, walk=False, page_pattern=page_pattern)
+        wiki_tree.walked = data["walked"]
+        wiki_tree.directories = data["directories"]
+        prefix = get_prefix(root)
+        depths = wiki_tree.depths
+        for key, parent_id in zip(data["pages"], data["parents"]):
+            depth = 0 if parent_id < 0 else depths[parent_id] + 1
+            wiki_tree.add_page(prefix + key, parent_id, depth)
+        wiki_tree.set_root_page()
+        return wiki_tree
+
+    def save(self) -> None:
+        """Save the index, if the wiki already has a directory for wikiman's files."""
+
+        path = get_cache_path(self.root)
+        if not path.parent.is_dir():
+            return
+
+        start = len(get_prefix(self.root))
+        data = {
+            "version": CACHE_VERSION,
+            "pattern": self.page_pattern,
+            "walked": self.walked,
+            "directories": [
+                [directory[start:], mtime]
+                for directory, mtime in self.directories.items()
+            ],
+            "pages": [page[start:] for page in self.paths],
+            "parents": [
+                -1 if parent_id == page_id else parent_id
+                for page_id, parent_id in enumerate(self.parent_ids)
+            ],
+        }
+        temporary_path = path.with_name(f"{path.name}.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary_path, path)
+
+    # * ---------------------------------------- * #
+    # * IDS
+
+    def get_id(self, page: Path) -> int:
+        """Get the id of a page."""
+
+        try:
+            return self.ids[os.fspath(page)]
+        except KeyError:
+            raise KeyError(page) from None
+
+    def get_path(self, page_id: int) -> Path:
+        """Get the path of a page by its id."""
+
+        return Path(self.paths[page_id])
+
+    def get_child_ids(self, page_id: int) -> list[int]:
+        """Get the ids of the children of a page, in order."""
+
+        child_ids: list[int] = []
+        child_id = self.first_child_ids[page_id]
+        while child_id >= 0:
+            child_ids.append(child_id)
+            child_id = self.next_sibling_ids[child_id]
+        return child_ids
+
+    def get_keys(self) -> list[str]:
+        """Get the paths of the pages relative to the root, with forward slashes."""
+
+        start = len(get_prefix(self.root))
+        keys = [path[start:] for path in self.paths]
+        if os.sep != "/":
+            keys = [key.replace(os.sep, "/") for key in keys]
+        return keys
+
+    def get_key(self, page_id: int) -> str:
+        """Get the path of a page relative to the root, with forward slashes."""
+
+        key = self.paths[page_id][len(get_prefix(self.root)) :]
+        return key if os.sep == "/" else key.replace(os.sep, "/")
+
+    # * ---------------------------------------- * #
+    # * FAMILY
+
+    def get_parent(self, page: Path) -> Path:
+        """Get the parent of a page. The home page is its own parent."""
+
+        return self.get_path(self.parent_ids[self.get_id(page)])
+
+    def get_children(self, page: Path) -> list[Path]:
+        """Get the children of a page."""
+
+        if (page_id := self.ids.get(os.fspath(page))) is None:
+            return []
+        return [self.get_path(child_id) for child_id in self.get_child_ids(page_id)]
+
+    def get_siblings(self, page: Path) -> list[Path]:
+        """Get a page and its siblings.
+
+        The home page has its children as its siblings.
+        """
+
+        return self.get_children(self.get_parent(page))
+
+    def get_position(self, page: Path) -> int:
+        """Get the position of a page among its siblings."""
+
+        return self.positions[self.get_id(page)]
+
+    def get_depth(self, page: Path) -> int:
+        """Get the depth of a page in the tree. The home page is at depth zero."""
+
+        return self.depths[self.get_id(page)]
+
+    def get_nearest(self, page: Path) -> tuple[Path, Path, Path]:
+        """Get the next, previous, and parent pages of a page."""
+
+        if self.next_ids is None or self.prev_ids is None:
+            self.next_ids, self.prev_ids = self.tabulate_nearest()
+        page_id = self.get_id(page)
+        return (
+            self.get_path(self.next_ids[page_id]),
+            self.get_path(self.prev_ids[page_id]),
+            self.get_path(self.parent_ids[page_id]),
+        )
+
+    def get_names(self) -> NameIndex:
+        """Get the index of the pages by name, each page given as a string."""
+
+        if self.names is None:
+            self.names = NameIndex(self.paths)
+        return self.names
+
+    def get_preorder(self) -> list[Path]:
+        """Get the pages in the order they are read.
+
+        Each page is followed by its children, before its next sibling.
+        """
+
+        return [self.get_path(page_id) for page_id in self.get_preorder_ids()]
+
+    def get_preorder_ids(self) -> list[int]:
+        """Get the ids of the pages in the order they are read."""
+
+        preorder: list[int] = []
+        stack = [0]
+        while stack:
+            page_id = stack.pop()
+            preorder.append(page_id)
+            stack.extend(reversed(self.get_child_ids(page_id)))
+        return preorder
+
+    def tabulate_nearest(self) -> tuple[array, array]:
+        """Tabulate the ids of the next and previous pages of every page in one pass.
+
+        The next page is the page after it in reading order, wrapping around to the home
+        page after the last page. The previous page is the sibling just before it, or
+        its parent if it is the first child. The home page is its own previous page.
+        Pages outside of the tree of the home page are their own next pages.
+        """
+
+        next_ids = array("i", range(len(self.paths)))
+        prev_ids = array("i", self.parent_ids)
+        preorder = self.get_preorder_ids()
+        for page_id, next_id in zip(preorder, [*preorder[1:], 0]):
+            next_ids[page_id] = next_id
+            if (next_sibling_id := self.next_sibling_ids[page_id]) >= 0:
+                prev_ids[next_sibling_id] = page_id
+        return next_ids, prev_ids
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CURRENT TREE
+
+
+def load_wiki_tree(root: Path, page_pattern: str = common.PAGE_PATTERN) -> WikiTree:
+    """Load the index of a wiki from its cache, or walk the wiki if it is stale."""
+
+    wiki_tree = WikiTree.load(root, page_pattern)
+    if wiki_tree is None:
+        wiki_tree = WikiTree(root, page_pattern=page_pattern)
+        if not common.get_context().read_only:
+            wiki_tree.save()
+    return wiki_tree
+
+
+def load_names(root: Path, page_pattern: str = common.PAGE_PATTERN) -> NameIndex:
+    """Load the index of the pages in a wiki by name, quickly enough for completion.
+
+    Pages are left as strings relative to the root if the cache can be trusted, since
+    building the whole tree of paths takes much longer than looking up a name.
+    """
+
+    if (data := read_cache(root, page_pattern)) is None:
+        return load_wiki_tree(root, page_pattern).get_names()
+    return NameIndex(data["pages"])
+
+
+def read_cache(root: Path, page_pattern: str = common.PAGE_PATTERN) -> Optional[dict]:
+    """Read the cached index of a wiki, if no directory changed since it was cached.
+
+    The cache is only trusted if its pages were found with the same pattern. Directories
+    are keyed by their full path in the data returned.
+    """
+
+    try:
+        with open(get_cache_path(root), encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return None
+    if data["pattern"] != page_pattern:
+        return None
+
+    # Paths are joined as strings, which is much faster than with `pathlib`
+    prefix = get_prefix(root)
+    directories = {prefix + key: mtime for key, mtime in data["directories"]}
+    for directory, mtime in directories.items():
+        if mtime > data["walked"] - RACY_TIME:
+            return None
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+    data["directories"] = directories
+    return data
+
+
+def get_prefix(root: Path) -> str:
+    """Get the prefix of the paths of everything in the wiki, as strings."""
+
+    return "" if root == Path(os.curdir) else os.path.join(root, "")
+
+
+def get_cache_path(root: Path) -> Path:
+    """Get the path to the cached index of a wiki."""
+
+    return root / common.CACHE_DIRNAME / common.TREE_FILENAME
+
+
+def get_wiki_tree() -> WikiTree:
+    """Get the index of the wiki, walking the wiki only if it hasn't been walked yet."""
+
+    return common.get_context().tree
+
+
+def reset() -> None:
+    """Forget the index of the wiki. Call this after changing the file structure."""
+
+    common.get_context().reset()
@@ -2,17 +2,21 @@
 
 import re
 from pathlib import Path
+from typing import Any
 
-import git
-
-from wikiman import common, family
+from wikiman import common, family, tree
 
 ILLEGAL_CHARACTERS = re.compile(r'[\\/:*?"<>|\a\b\f\n\r\t\v]')
 
 WIDTH = 2  # Width of the number to prepend to directories
-GIT_REMOTE_URL = (
-    str(git.Repo().remotes.origin.url.removesuffix(".wiki.git")) + "/wiki" + "/"
-)
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve the remote URL only when it is first asked for."""
+
+    if name == "GIT_REMOTE_URL":
+        return common.get_context().remote_url
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # * -------------------------------------------------------------------------------- * #
@@ -22,17 +26,7 @@ GIT_REMOTE_URL = (
 def get_nearest(page: Path) -> tuple[Path, Path, Path]:
     """Get the pages nearest to a page."""
 
-    siblings = family.get_siblings(page)
-    if page == common.ROOT_PAGE:
-        next_page = siblings[0] if siblings else common.ROOT_PAGE
-        prev_page = common.ROOT_PAGE
-    else:
-        page_position = siblings.index(page)
-        next_page = get_next(page, siblings, page_position)
-        prev_page = get_prev(page, siblings, page_position)
-
-    parent = family.get_parent(page)
-    return next_page, prev_page, parent
+    return tree.get_wiki_tree().get_nearest(page)
 
 
 def get_next(page: Path, siblings: list[Path], page_position: int) -> Path:
@@ -51,18 +45,16 @@ def get_next(page: Path, siblings: list[Path], page_position: int) -> Path:
 def get_next_of_last_child(page: Path) -> Path:
     """Get the next page of a last child."""
 
-    parent = family.get_parent(page)
-    is_last_page = parent == common.ROOT_PAGE
-    if is_last_page:
-        return common.ROOT_PAGE
-    siblings_of_parent = family.get_siblings(parent)
-    next_page_position = siblings_of_parent.index(parent) + 1
-    parent_is_last_child = next_page_position >= len(siblings_of_parent)
-    return (
-        get_next_of_last_child(parent)
-        if parent_is_last_child
-        else siblings_of_parent[next_page_position]
-    )
+    wiki_tree = tree.get_wiki_tree()
+    parent = wiki_tree.get_parent(page)
+    # Walk up the ancestors until one of them has a next sibling
+    while parent != wiki_tree.root_page:
+        siblings_of_parent = wiki_tree.get_siblings(parent)
+        next_page_position = wiki_tree.get_position(parent) + 1
+        if next_page_position < len(siblings_of_parent):
+            return siblings_of_parent[next_page_position]
+        parent = wiki_tree.get_parent(parent)
+    return wiki_tree.root_page
 
 
 def get_prev(page: Path, siblings: list[Path], page_position: int) -> Path:
@@ -98,15 +90,9 @@ def init_page(name: str, under: Path, position: int) -> Path:
 
 
 def find_page(name: str) -> Path:
-    """Find an existing page."""
-
-    page_names = [get_dashed_name(page.stem).lower() for page in common.PAGES]
+    """Find an existing page, ignoring case and whether words are dashed or spaced."""
 
-    try:
-        page_location = page_names.index(get_dashed_name(name).lower())
-    except ValueError as exception:
-        raise ValueError("Page not found.") from exception
-    return common.PAGES[page_location]
+    return Path(tree.get_wiki_tree().get_names().find(name))
 
 
 # * -------------------------------------------------------------------------------- * #
@@ -134,7 +120,7 @@ def get_md_link(text: str, link: str) -> str:
 def get_page_url(page: Path) -> str:
     """Get the URL for a page."""
 
-    return GIT_REMOTE_URL + page.stem
+    return common.get_context().remote_url + page.stem
 
 
 # * -------------------------------------------------------------------------------- * #
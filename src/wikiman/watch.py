@@ -0,0 +1,317 @@
+"""Watch the wiki for changes, and keep its navigation up to date as they happen.
+
+The tree of pages and the headings of every page are held in memory between changes.
+When just the content of some pages changes, only their sidebars are rendered again,
+and only if their headings changed. When pages are added, moved, or removed, the tree
+is walked again and the navigation is updated incrementally, as `wikiman up` would.
+
+Changes are picked up with inotify on Linux, and by polling the wiki otherwise.
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from wikiman import common, manifest, navigation, tree
+
+if TYPE_CHECKING:
+    from threading import Event
+
+# Wait this long after a change for more changes, so that a burst is handled at once
+DEBOUNCE = 0.1  # seconds
+# Check for changes this often when polling
+POLL_INTERVAL = 1.0  # seconds
+# Check whether to stop this often while waiting for changes
+WAKE_INTERVAL = 0.5  # seconds
+
+# Kinds of changes to the wiki
+CONTENT = "content"  # The content of a page changed
+STRUCTURE = "structure"  # Pages were added, moved, or removed
+
+Snapshot = dict[Path, tuple[int, int]]
+
+
+# * -------------------------------------------------------------------------------- * #
+# * WATCH
+
+
+def watch(
+    jobs: Optional[int] = None,
+    poll: bool = False,
+    interval: float = POLL_INTERVAL,
+    debounce: float = DEBOUNCE,
+    on_update: Callable[[navigation.Report], None] = print,
+    stop: Optional["Event"] = None,
+) -> None:
+    """Keep the navigation of the wiki up to date until stopped, e.g. by Ctrl+C.
+
+    Report each update that rendered any pages to `on_update`. Pass `poll` to poll the
+    wiki for changes every `interval` seconds, even where inotify is available.
+    """
+
+    root = common.get_context().root
+    wiki = WatchedWiki(jobs)
+    watcher = get_watcher(root, poll, interval)
+    try:
+        on_update(wiki.update_all())
+        while not (stop and stop.is_set()):
+            changes = watcher.read(WAKE_INTERVAL)
+            if not changes:
+                continue
+            while more_changes := watcher.read(debounce):
+                changes |= more_changes
+            report = wiki.update(changes)
+            if report.rendered:
+                on_update(report)
+    finally:
+        watcher.close()
+        wiki.close()
+
+
+class WatchedWiki:
+    """The navigation of the wiki, with the manifest of its pages kept in memory."""
+
+    def __init__(self, jobs: Optional[int] = None):
+
+        self.jobs = jobs
+        self.manifest = manifest.Manifest.load(manifest.get_manifest_path())
+
+    def update_all(self) -> navigation.Report:
+        """Update the navigation of every page that changed since the last update."""
+
+        tree.reset()
+        return navigation.update_navigation(
+            jobs=self.jobs, pages_manifest=self.manifest
+        )
+
+    def update(self, paths: set[Path]) -> navigation.Report:
+        """Update the navigation affected by changes to some paths in the wiki."""
+
+        changes = {path: get_change(path) for path in paths}
+        if STRUCTURE in changes.values():
+            return self.update_all()
+        pages = sorted(path for path, change in changes.items() if change == CONTENT)
+        return navigation.update_pages(pages, self.manifest)
+
+    def close(self) -> None:
+        """Save the manifest, which is otherwise only saved on structural changes."""
+
+        self.manifest.save()
+
+
+def get_change(path: Path) -> Optional[str]:
+    """Get the kind of change to a path in the wiki, if it could affect navigation."""
+
+    context = common.get_context()
+    wiki_tree = tree.get_wiki_tree()
+    relative_path = path.relative_to(wiki_tree.root)
+    if any(part.startswith(".") for part in relative_path.parts) or path.name in (
+        context.sidebar_filename,
+        context.footer_filename,
+    ):
+        return None
+
+    if path in wiki_tree:
+        return CONTENT if path.is_file() else STRUCTURE
+    if path.is_file():
+        return STRUCTURE if fnmatch(path.name, context.page_pattern) else None
+    if path.is_dir():
+        return STRUCTURE
+    # Something that is gone now, which only matters if it was the directory of a page
+    _, _, name = path.name.partition("_")
+    return STRUCTURE if (path / f"{name}.md") in wiki_tree else None
+
+
+# * -------------------------------------------------------------------------------- * #
+# * WATCHERS
+
+
+def get_watcher(
+    root: Path, poll: bool = False, interval: float = POLL_INTERVAL
+) -> Union["InotifyWatcher", "PollingWatcher"]:
+    """Get a watcher using inotify where available, and polling otherwise."""
+
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except OSError:
+            pass
+    return PollingWatcher(root, interval)
+
+
+class PollingWatcher:
+    """Find changes by comparing snapshots of the wiki taken with `os.scandir`.
+
+    A snapshot is taken every `interval` seconds, no matter how often changes are read.
+    """
+
+    def __init__(self, root: Path, interval: float = POLL_INTERVAL):
+
+        self.root = root
+        self.interval = interval
+        self.snapshot = take_snapshot(root)
+        self.next_poll = time.monotonic() + interval
+
+    def read(self, timeout: float) -> set[Path]:
+        """Wait for changes, returning the paths that changed, if any."""
+
+        deadline = time.monotonic() + timeout
+        while self.next_poll <= deadline:
+            time.sleep(max(0.0, self.next_poll - time.monotonic()))
+            self.next_poll = time.monotonic() + self.interval
+            if changes := self.poll():
+                return changes
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        return set()
+
+    def poll(self) -> set[Path]:
+        """Take a snapshot of the wiki, returning the paths changed since the last."""
+
+        snapshot = take_snapshot(self.root)
+        changes = {
+            path
+            for path in self.snapshot.keys() | snapshot.keys()
+            if self.snapshot.get(path) != snapshot.get(path)
+        }
+        self.snapshot = snapshot
+        return changes
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def take_snapshot(root: Path) -> Snapshot:
+    """Get the size and modification time of every page, and every directory."""
+
+    page_pattern = common.get_context().page_pattern
+    snapshot: Snapshot = {}
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                path = directory / entry.name
+                if entry.is_dir():
+                    directories.append(path)
+                    snapshot[path] = (0, 0)
+                elif fnmatch(entry.name, page_pattern):
+                    stat = entry.stat()
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+# inotify events, from "sys/inotify.h"
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Each event is followed by a null-padded name of the given length
+EVENT = struct.Struct("iIII")  # Watch descriptor, mask, cookie, length
+READ_SIZE = 64 * 1024
+
+
+class InotifyWatcher:
+    """Find changes with inotify, watching every directory in the wiki.
+
+    Calls inotify through `ctypes`, so that no extra dependencies are needed.
+    """
+
+    def __init__(self, root: Path):
+
+        import ctypes
+        import ctypes.util
+
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Couldn't initialize inotify.")
+        self.directories: dict[int, Path] = {}  # By watch descriptor
+        self.add_watches(root)
+
+    def add_watches(self, root: Path) -> None:
+        """Watch a directory and all of its subdirectories."""
+
+        directories = [root]
+        while directories:
+            directory = directories.pop()
+            descriptor = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), WATCH_MASK | IN_ONLYDIR
+            )
+            if descriptor < 0:  # It is already gone
+                continue
+            self.directories[descriptor] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir() and not entry.name.startswith("."):
+                            directories.append(directory / entry.name)
+            except OSError:
+                continue
+
+    def remove_watches(self, root: Path) -> None:
+        """Stop watching a directory and all of its subdirectories."""
+
+        for descriptor, directory in list(self.directories.items()):
+            if directory == root or root in directory.parents:
+                self.libc.inotify_rm_watch(self.fd, descriptor)
+                del self.directories[descriptor]
+
+    def read(self, timeout: float) -> set[Path]:
+        """Wait for changes, returning the paths that changed, if any."""
+
+        changes: set[Path] = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                if path := self.get_path(descriptor, mask, name):
+                    changes.add(path)
+        return changes
+
+    def get_path(self, descriptor: int, mask: int, name: str) -> Optional[Path]:
+        """Get the path that changed in an event, and keep watching new directories."""
+
+        if mask & IN_Q_OVERFLOW:  # Events were lost, so treat the whole wiki as changed
+            return self.root
+        directory = self.directories.get(descriptor)
+        if mask & IN_IGNORED:
+            self.directories.pop(descriptor, None)
+            return None
+        if directory is None or name.startswith("."):
+            return None
+
+        path = directory / name
+        if mask & IN_ISDIR:
+            if mask & IN_MOVED_FROM:
+                self.remove_watches(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_watches(path)
+        return path
+
+    def close(self) -> None:
+        """Stop watching."""
+
+        os.close(self.fd)
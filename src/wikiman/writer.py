@@ -0,0 +1,252 @@
+"""Write generated files, skipping those whose content would not change.
+
+A `Writer` writes files on a pool of threads fed through a bounded queue, so that slow
+disks and network filesystems are kept busy while navigation is still being rendered.
+
+Unless asked for durability, files are overwritten in place. Creating a new file costs
+a few times more than overwriting one, and a file left half-written by an interrupted
+run is written again by the next run, since the manifest is only saved at the end. When
+asked for durability, files are written to a hidden temporary file which then replaces
+the file, so that a crash never leaves a file half-written on disk. Then the file and
+its directory are flushed to disk, so that the file and its new name both stay there.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, Iterable, Optional
+
+# Durability policies, for how sure to be that files are on disk before finishing
+NONE = "none"  # Overwrite files in place, leaving it to the operating system
+FILE = "file"  # Flush each file to disk before it replaces the old one
+END = "end"  # Replace files, then flush those written to disk when done
+DURABILITIES = (NONE, FILE, END)
+
+# Write on this many threads, with at most this many files waiting to be written
+THREADS = 8
+QUEUE_SIZE = 256
+
+TEMPORARY_SUFFIX = ".tmp"
+
+
+def encode(text: str) -> bytes:
+    """Encode text as it would be written to a file opened in text mode."""
+
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
+def is_unchanged(path: Path, data: bytes) -> bool:
+    """Check whether a file already holds this data, comparing length, then hash."""
+
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        existing = path.read_bytes()
+    except FileNotFoundError:
+        return False
+    return hashlib.blake2b(existing).digest() == hashlib.blake2b(data).digest()
+
+
+def write_if_changed(
+    path: Path, text: str, atomic: bool = False, fsync: bool = False
+) -> bool:
+    """Write text to a file only if it differs from the file. Return whether it did."""
+
+    data = encode(text)
+    if is_unchanged(path, data):
+        return False
+    if atomic:
+        write_atomically(path, data, fsync)
+    else:
+        path.write_bytes(data)
+    return True
+
+
+def write_atomically(path: Path, data: bytes, fsync: bool = False) -> None:
+    """Write data to a hidden temporary file, then replace the file with it."""
+
+    temporary_path = path.with_name(f".{path.name}{TEMPORARY_SUFFIX}")
+    try:
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        temporary_path.unlink(missing_ok=True)
+        raise
+    if fsync:
+        sync_directory(path.parent)
+
+
+def sync(paths: Iterable[Path]) -> None:
+    """Flush files to disk, then the directories they were renamed in, on threads."""
+
+    paths = list(paths)
+    directories = list(dict.fromkeys(path.parent for path in paths))
+    with ThreadPoolExecutor(THREADS) as executor:
+        # Consume the results so that any error is raised
+        list(executor.map(sync_file, paths))
+        list(executor.map(sync_directory, directories))
+
+
+def sync_file(path: Path) -> None:
+    """Flush a file to disk."""
+
+    with open(path, "rb+") as file:
+        os.fsync(file.fileno())
+
+
+def sync_directory(directory: Path) -> None:
+    """Flush a directory to disk, so that files renamed in it keep their new names.
+
+    Directories can't be opened to flush them on Windows, so they are skipped there.
+    """
+
+    if os.name == "nt":
+        return
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def check_durability(durability: str) -> None:
+    """Check that a durability policy is known."""
+
+    if durability not in DURABILITIES:
+        raise ValueError(
+            f"Durability must be one of {', '.join(DURABILITIES)}, not '{durability}'."
+        )
+
+
+# * -------------------------------------------------------------------------------- * #
+# * WRITER
+
+
+class StaleFileError(Exception):
+    """A file is out of date, found while checking files without writing them."""
+
+
+class Writer:
+    """Write files on a pool of threads, fed through a bounded queue.
+
+    Queueing a file only waits if the queue is full. Pass zero threads to write each
+    file as it is queued instead. Use as a context manager, which waits for every file
+    to be written on exit, then raises the first error that any thread ran into.
+    """
+
+    writes = True  # Whether files are written, or only compared
+
+    def __init__(
+        self,
+        durability: str = NONE,
+        threads: int = THREADS,
+        queue_size: int = QUEUE_SIZE,
+    ):
+
+        check_durability(durability)
+        self.durability = durability
+        self.changed: list[Path] = []  # Files written because their content changed
+        self.unchanged = 0  # Files already up to date on disk
+        self.error: Optional[BaseException] = None
+
+        self.lock = Lock()
+        self.queue: "Queue[Optional[tuple[Path, str]]]" = Queue(queue_size)
+        self.threads = [Thread(target=self.drain, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def write(self, path: Path, text: str) -> None:
+        """Queue text to be written to a file, if it differs from the file."""
+
+        if self.error is not None:
+            raise self.error
+        if self.threads:
+            self.queue.put((path, text))
+        else:
+            self.write_now(path, text)
+
+    def write_now(self, path: Path, text: str) -> None:
+        """Write text to a file if it differs from the file, and count it."""
+
+        changed = write_if_changed(
+            path,
+            text,
+            atomic=self.durability != NONE,
+            fsync=self.durability == FILE,
+        )
+        with self.lock:
+            if changed:
+                self.changed.append(path)
+            else:
+                self.unchanged += 1
+
+    def drain(self) -> None:
+        """Write queued files until told to stop, remembering the first error."""
+
+        while (item := self.queue.get()) is not None:
+            if self.error is not None:
+                continue
+            try:
+                self.write_now(*item)
+            except BaseException as exception:
+                self.error = exception
+
+    def close(self) -> None:
+        """Wait for every queued file to be written, then flush them if asked to."""
+
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.error is not None:
+            raise self.error
+        if self.durability == END and self.changed:
+            sync(self.changed)
+
+
+class Checker(Writer):
+    """Compare files to what would be written on a pool of threads, writing nothing.
+
+    Files that differ are collected as changed. Pass `fail_fast` to raise
+    `StaleFileError` for the first one instead.
+    """
+
+    writes = False
+
+    def __init__(
+        self,
+        fail_fast: bool = False,
+        threads: int = THREADS,
+        queue_size: int = QUEUE_SIZE,
+    ):
+
+        self.fail_fast = fail_fast
+        super().__init__(NONE, threads, queue_size)
+
+    def write_now(self, path: Path, text: str) -> None:
+        """Compare text to a file, and count it."""
+
+        unchanged = is_unchanged(path, encode(text))
+        with self.lock:
+            if unchanged:
+                self.unchanged += 1
+            else:
+                self.changed.append(path)
+        if not unchanged and self.fail_fast:
+            raise StaleFileError(f"'{path}' is out of date.")
@@ -0,0 +1,213 @@
+"""Benchmark `wikiman` on a generated wiki, and report the results as JSON.
+
+Each benchmark runs against its own freshly-generated wiki, so that results are
+comparable across releases. For example:
+
+    python tests/benchmark.py --pages 10000 --output benchmark.json
+"""
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from wikiman import __version__, cli, common, navigation, tree, utils
+
+from generate_random_pages import generate_wiki
+
+# Links in generated wikis point here, so that no Git repo is needed
+REMOTE_URL = "https://github.com/user/repo/wiki/"
+
+FIND_PAGE_LOOKUPS = 1000
+
+Results = dict[str, dict[str, Any]]
+
+
+# * -------------------------------------------------------------------------------- * #
+# * BENCHMARKS
+
+
+def benchmark_up(root: Path, jobs: Optional[int]) -> dict[str, Any]:
+    """Time `wikiman up` on a new wiki, again with nothing changed, then forced."""
+
+    full = timed(lambda: navigation.update_navigation(jobs=jobs))
+    no_op = timed(lambda: navigation.update_navigation(jobs=jobs))
+    common.get_context().reset()
+    force = timed(lambda: navigation.update_navigation(force=True, jobs=jobs))
+    return {"full": full, "no_op": no_op, "force": force}
+
+
+def benchmark_add(root: Path, jobs: Optional[int]) -> dict[str, Any]:
+    """Time `wikiman add` inserting a page at the first position under the home page."""
+
+    common.get_context().tree  # Walk the wiki beforehand, as `wikiman up` would have
+    return timed(lambda: cli.add_page("Benchmark-Page", "Home", 0))
+
+
+def benchmark_find_page(root: Path, jobs: Optional[int]) -> dict[str, Any]:
+    """Time finding the first page, then the average time to find more pages."""
+
+    pages = common.get_context().tree.pages
+    names = [page.stem for page in random.Random(0).choices(pages, k=FIND_PAGE_LOOKUPS)]
+    common.get_context().reset()
+
+    first = timed(lambda: utils.find_page(names[0]))
+    rest = timed(lambda: [utils.find_page(name) for name in names])
+    return {"first": first, "average": rest["seconds"] / len(names)}
+
+
+def benchmark_memory(root: Path, jobs: Optional[int]) -> dict[str, Any]:
+    """Trace the peak memory allocated by `wikiman up` on a new wiki, in one process."""
+
+    tracemalloc.start()
+    try:
+        navigation.update_navigation(jobs=1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": peak}
+
+
+def benchmark_tree(root: Path, jobs: Optional[int]) -> dict[str, Any]:
+    """Trace the memory held by the index of a new wiki, and its size when pickled."""
+
+    tracemalloc.start()
+    try:
+        wiki_tree = tree.WikiTree(root)
+        wiki_tree.get_nearest(wiki_tree.root_page)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "bytes": current,
+        "peak_bytes": peak,
+        "pickled_bytes": len(pickle.dumps(wiki_tree)),
+    }
+
+
+BENCHMARKS: dict[str, Callable[[Path, Optional[int]], dict[str, Any]]] = {
+    "up": benchmark_up,
+    "add": benchmark_add,
+    "find_page": benchmark_find_page,
+    "memory": benchmark_memory,
+    "tree": benchmark_tree,
+}
+
+
+def benchmark_startup() -> dict[str, Any]:
+    """Time importing the CLI in a new process, including starting the interpreter."""
+
+    script = "import time; start = time.perf_counter(); import wikiman.cli;"
+    script += " print(time.perf_counter() - start)"
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, text=True
+    )
+    return {"seconds": time.perf_counter() - start, "import": float(result.stdout)}
+
+
+# * -------------------------------------------------------------------------------- * #
+# * RUN
+
+
+def run_benchmarks(
+    pages: int = 1000,
+    depth: int = 4,
+    fan_out: int = 10,
+    body_size: int = 1000,
+    seed: int = 0,
+    jobs: Optional[int] = None,
+    names: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Run benchmarks, each on its own generated wiki, and get the results."""
+
+    parameters = {
+        "pages": pages,
+        "depth": depth,
+        "fan_out": fan_out,
+        "body_size": body_size,
+        "seed": seed,
+        "jobs": jobs,
+    }
+    results: Results = {"startup": benchmark_startup()}
+
+    context = common.get_context()
+    remote_url = os.environ.get("WIKIMAN_REMOTE_URL")
+    os.environ["WIKIMAN_REMOTE_URL"] = REMOTE_URL
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in names or BENCHMARKS:
+                root = Path(temp_dir) / common.ROOT_NAME
+                generate_wiki(root, pages, depth, fan_out, body_size, seed)
+                common.set_context(common.Context(root))
+                results[name] = BENCHMARKS[name](root, jobs)
+                shutil.rmtree(root)
+    finally:
+        common.set_context(context)
+        if remote_url is None:
+            del os.environ["WIKIMAN_REMOTE_URL"]
+        else:
+            os.environ["WIKIMAN_REMOTE_URL"] = remote_url
+
+    return {
+        "wikiman": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+
+
+def timed(function: Callable[[], Any]) -> dict[str, float]:
+    """Time a function in wall-clock and CPU seconds."""
+
+    start, start_cpu = time.perf_counter(), time.process_time()
+    function()
+    return {
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - start_cpu,
+    }
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Run benchmarks and print the results, or write them to a file."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--body-size", type=int, default=1000, help="In bytes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    options = parser.parse_args(args)
+
+    report = run_benchmarks(
+        options.pages,
+        options.depth,
+        options.fan_out,
+        options.body_size,
+        options.seed,
+        options.jobs,
+        options.only,
+    )
+    text = json.dumps(report, indent=2)
+    if options.output is None:
+        print(text)
+    else:
+        options.output.write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
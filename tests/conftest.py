@@ -44,8 +44,10 @@ def RESTORE_WIKI():
     """Restore the wiki directory before and after running a test."""
 
     restore_wiki()
+    reset_wikiman()
     yield
     restore_wiki()
+    reset_wikiman()
 
 
 # * -------------------------------------------------------------------------------- * #
@@ -120,6 +122,14 @@ def restore_wiki():
     shutil.copytree(TESTS_WIKI_ROOT, WIKI_ROOT)
 
 
+def reset_wikiman():
+    """Make wikiman forget what it knows about the wiki."""
+
+    from wikiman import tree
+
+    tree.reset()
+
+
 # * -------------------------------------------------------------------------------- * #
 # * RUN MAIN
 
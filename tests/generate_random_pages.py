@@ -1,14 +1,154 @@
-"""Generate page names consisting of three random words."""
+"""Generate wikis of pages with names consisting of three random words.
 
-from random_word import RandomWords
+Wikis are generated offline and deterministically, so the same seed always gives the
+same wiki. Run this file to print a random page name, or pass a directory to generate
+a whole wiki there, e.g.:
 
-word_generator = RandomWords()
+    python tests/generate_random_pages.py wiki --pages 10000 --depth 4 --fan-out 10
+"""
 
-words = []
-for _ in range(3):
-    word = word_generator.get_random_word(
-        hasDictionaryDef=True, minDictionaryCount=30
-    ).capitalize()
-    words.append(word)
+import argparse
+import random
+from collections import deque
+from pathlib import Path
+from typing import Optional
 
-print("-".join(words))
+from wikiman import utils
+
+WORDS = (
+    "Advantage Anchor Autumn Balance Basin Beacon Border Breeze Bridge Butcher Canyon"
+    " Carbon Cascade Castle Cedar Channel Circuit Clover Collar Comet Conversion Copper"
+    " Course Crater Crystal Current Delta Desert Detail Diagonal Dynamo Echo Ember"
+    " Equity Falcon Feather Fiber Floating Forest Fossil Furnace Galaxy Garnet Glacier"
+    " Granite Harbor Harvest Height Horizon Huddle Hurry Impeach Island Ivory Jasper"
+    " Journey Kernel Knuckle Lantern Lattice Ledger Lemon Lumber Marble Measure Meadow"
+    " Medium Meridian Merit Middle Mirror Nectar Needle Nickel Oasis Official Orbit"
+    " Orchard Party Pasture Patter Pebble Pepper Pillar Pioneer Prism Quarry Quartz"
+    " Radius Reaction Relic Respite Ribbon Ripple Saddle Serpentine Shadow Signal Slate"
+    " Slide Spindle Summit Tangent Thicket Thrum Timber Transform Transient Transit"
+    " Tundra Union Valley Vacuum Velvet Vermilion Vital Voyage Walnut Waste Willow"
+    " Winter Zenith"
+).split()
+
+WORDS_PER_NAME = 3
+WORDS_PER_SENTENCE = 12
+SENTENCES_PER_PARAGRAPH = 4
+
+# Page directories are numbered with this many digits
+MAX_FAN_OUT = 10**utils.WIDTH
+
+
+def get_page_name(rng: random.Random) -> str:
+    """Get a page name consisting of three random words."""
+
+    return "-".join(rng.choice(WORDS) for _ in range(WORDS_PER_NAME))
+
+
+def get_unique_page_name(rng: random.Random, used_names: set[str]) -> str:
+    """Get a random page name that hasn't been used yet."""
+
+    name = get_page_name(rng)
+    suffix = 1
+    unique_name = name
+    while unique_name.lower() in used_names:
+        suffix += 1
+        unique_name = f"{name}-{suffix}"
+    used_names.add(unique_name.lower())
+    return unique_name
+
+
+def get_page_body(rng: random.Random, name: str, body_size: int) -> str:
+    """Get the body of a page, with sections of paragraphs, of about this many bytes."""
+
+    lines = [f"# {utils.get_human_name(name)}", ""]
+    size = sum(len(line) + 1 for line in lines)
+    while size < body_size:
+        if rng.random() < 0.25:
+            heading = " ".join(rng.choice(WORDS) for _ in range(WORDS_PER_NAME))
+            section = [f"{'#' * rng.randint(2, 3)} {heading}", ""]
+        else:
+            sentences = [
+                " ".join(rng.choices(WORDS, k=WORDS_PER_SENTENCE)).capitalize()
+                for _ in range(SENTENCES_PER_PARAGRAPH)
+            ]
+            section = [". ".join(sentences) + ".", ""]
+        lines.extend(section)
+        size += sum(len(line) + 1 for line in section)
+    return "\n".join(lines)
+
+
+def generate_wiki(
+    root: Path,
+    pages: int = 100,
+    depth: int = 4,
+    fan_out: int = 5,
+    body_size: int = 1000,
+    seed: int = 0,
+) -> list[Path]:
+    """Generate a wiki with this many pages in the root directory.
+
+    Pages are filled in breadth-first, with at most `fan_out` children per page and at
+    most `depth` levels below the home page. Returns the pages in the order generated.
+    """
+
+    if not 1 <= fan_out <= MAX_FAN_OUT:
+        raise ValueError(f"Fan-out must be between 1 and {MAX_FAN_OUT}.")
+    capacity = sum(fan_out**level for level in range(depth + 1))
+    if not 1 <= pages <= capacity:
+        raise ValueError(
+            f"A wiki {depth} levels deep with a fan-out of {fan_out}"
+            f" holds between 1 and {capacity} pages."
+        )
+
+    rng = random.Random(seed)
+    used_names: set[str] = {"home"}
+
+    root.mkdir(parents=True, exist_ok=True)
+    home = root / "Home.md"
+    home.write_text(get_page_body(rng, home.stem, body_size), encoding="utf-8")
+    generated = [home]
+
+    # Parents waiting for children, with their own depth below the home page
+    parents: deque[tuple[Path, int]] = deque([(home, 0)])
+    while len(generated) < pages:
+        parent, parent_depth = parents.popleft()
+        for position in range(min(fan_out, pages - len(generated))):
+            name = get_unique_page_name(rng, used_names)
+            page = utils.init_page(name, parent, position)
+            page.parent.mkdir()
+            page.write_text(get_page_body(rng, name, body_size), encoding="utf-8")
+            generated.append(page)
+            if parent_depth + 1 < depth:
+                parents.append((page, parent_depth + 1))
+    return generated
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Print a random page name, or generate a wiki if a directory is given."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", nargs="?", type=Path, help="Generate a wiki here.")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--body-size", type=int, default=1000, help="In bytes.")
+    parser.add_argument("--seed", type=int, default=None)
+    options = parser.parse_args(args)
+
+    if options.root is None:
+        print(get_page_name(random.Random(options.seed)))
+        return
+
+    pages = generate_wiki(
+        options.root,
+        options.pages,
+        options.depth,
+        options.fan_out,
+        options.body_size,
+        options.seed or 0,
+    )
+    print(f"Generated {len(pages)} pages in '{options.root}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from pytest import mark as m
+from wikiman import api, common, utils
+
 from conftest import WIKI_ROOT
 
 # We hardcode our expected pages rather than pulling from the module under test. This
@@ -128,6 +131,164 @@ PAGES = {
 # * -------------------------------------------------------------------------------- * #
 # * NAVIGATION
 
+# * ---------------------------------------- * #
+# * get_tree
+
+
+def link(name: str, bold: bool = False, depth: int = 0) -> str:
+    """Get the expected line for a page in a tree."""
+
+    page_link = f"[{name.replace('-', ' ')}]({utils.GIT_REMOTE_URL}{name})"
+    return api.MD_TAB * depth + (f"**{page_link}**" if bold else page_link)
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        (
+            "home",
+            (PAGES["home"],),
+            [
+                link("Home", bold=True),
+                link("Impeach-Vermilion-Vacuum", depth=1),
+                link("Equity-Substitute-Huddle", depth=1),
+            ],
+        ),
+        (
+            "under_home",
+            (PAGES["equity-substitute-huddle"],),
+            [
+                link("Home"),
+                link("Impeach-Vermilion-Vacuum", depth=1),
+                link("Equity-Substitute-Huddle", bold=True, depth=1),
+                link("Automatic-Party-Merit", depth=2),
+                link("Medium-Establish-Vital", depth=2),
+                link("Reaction-Diagonal-Patter", depth=2),
+            ],
+        ),
+        (
+            "subpage",
+            (PAGES["transit-thrum-middle"],),
+            [
+                link("Measure-Transient-Respite"),
+                link("Official-Union-Advantage"),
+                link("Close-Waste-Transform", depth=1),
+                link("Transit-Thrum-Middle", bold=True, depth=1),
+                link("Knuckle-Conversion-Wound", depth=2),
+                link("Serpentine-Hurry-Butcher", depth=1),
+                link("Middle-Pasture-Floating"),
+            ],
+        ),
+    ],
+)
+def test_get_tree(test_id, args, expected, RESTORE_WIKI):
+    result = api.get_tree(*args)
+    assert result.split("  \n") == expected
+
+
+def test_get_tree_formats_links_once(RESTORE_WIKI, monkeypatch):
+    formatted = []
+    get_page_link = utils.get_page_link
+
+    def record(page):
+        formatted.append(page)
+        return get_page_link(page)
+
+    monkeypatch.setattr(utils, "get_page_link", record)
+    for page in PAGES.values():
+        api.get_tree(page)
+    assert sorted(formatted) == sorted(PAGES.values())
+
+
+def more(count: int, parent: str, depth: int = 0) -> str:
+    """Get the expected line for pages collapsed out of a tree."""
+
+    return api.MD_TAB * depth + f"[… and {count} more]({utils.GIT_REMOTE_URL}{parent})"
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        (
+            "window",
+            (PAGES["transit-thrum-middle"], 1, 0),
+            [
+                more(1, "Impeach-Vermilion-Vacuum"),
+                link("Official-Union-Advantage"),
+                more(1, "Official-Union-Advantage", depth=1),
+                link("Transit-Thrum-Middle", bold=True, depth=1),
+                link("Knuckle-Conversion-Wound", depth=2),
+                more(1, "Official-Union-Advantage", depth=1),
+                more(1, "Impeach-Vermilion-Vacuum"),
+            ],
+        ),
+        (
+            "window_at_start",
+            (PAGES["close-waste-transform"], 2, 0),
+            [
+                link("Measure-Transient-Respite"),
+                link("Official-Union-Advantage"),
+                link("Close-Waste-Transform", bold=True, depth=1),
+                link("Transit-Thrum-Middle", depth=1),
+                more(1, "Official-Union-Advantage", depth=1),
+                more(1, "Impeach-Vermilion-Vacuum"),
+            ],
+        ),
+        (
+            "window_home",
+            (PAGES["home"], 1, 0),
+            [
+                link("Home", bold=True),
+                link("Impeach-Vermilion-Vacuum", depth=1),
+                more(1, "Home", depth=1),
+            ],
+        ),
+        (
+            "ancestors",
+            (PAGES["transit-thrum-middle"], None, 1),
+            [
+                link("Impeach-Vermilion-Vacuum"),
+                link("Measure-Transient-Respite", depth=1),
+                link("Official-Union-Advantage", depth=1),
+                link("Close-Waste-Transform", depth=2),
+                link("Transit-Thrum-Middle", bold=True, depth=2),
+                link("Knuckle-Conversion-Wound", depth=3),
+                link("Serpentine-Hurry-Butcher", depth=2),
+                link("Middle-Pasture-Floating", depth=1),
+                link("Equity-Substitute-Huddle"),
+            ],
+        ),
+        (
+            "ancestors_up_to_home",
+            (PAGES["official-union-advantage"], None, 5),
+            [
+                link("Home"),
+                link("Impeach-Vermilion-Vacuum", depth=1),
+                link("Measure-Transient-Respite", depth=2),
+                link("Official-Union-Advantage", bold=True, depth=2),
+                link("Close-Waste-Transform", depth=3),
+                link("Transit-Thrum-Middle", depth=3),
+                link("Serpentine-Hurry-Butcher", depth=3),
+                link("Middle-Pasture-Floating", depth=2),
+                link("Equity-Substitute-Huddle", depth=1),
+            ],
+        ),
+    ],
+)
+def test_get_tree_window(test_id, args, expected, RESTORE_WIKI, monkeypatch):
+    page, window, ancestors = args
+    monkeypatch.setattr(common.get_context(), "window", window)
+    monkeypatch.setattr(common.get_context(), "ancestors", ancestors)
+    assert api.get_tree(page).split("  \n") == expected
+
+
+def test_get_tree_window_larger_than_sections(RESTORE_WIKI, monkeypatch):
+    trees = [api.get_tree(page) for page in PAGES.values()]
+    common.get_context().sections.clear()
+    monkeypatch.setattr(common.get_context(), "window", 10)
+    assert [api.get_tree(page) for page in PAGES.values()] == trees
+
+
 # * -------------------------------------------------------------------------------- * #
 # * FILE OPERATIONS
 
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+from pytest import mark as m
+from wikiman import common, tree
+
+import benchmark
+from generate_random_pages import generate_wiki, get_page_name
+
+# * -------------------------------------------------------------------------------- * #
+# * generate_wiki
+
+
+def read_wiki(root) -> dict[str, str]:
+    """Read every page in a wiki, by path relative to the root."""
+
+    return {
+        page.relative_to(root).as_posix(): page.read_text(encoding="utf-8")
+        for page in root.rglob("*.md")
+    }
+
+
+def test_get_page_name_is_seeded():
+    names = [get_page_name(random.Random(1)) for _ in range(2)]
+    assert names[0] == names[1]
+    assert len(names[0].split("-")) == 3
+
+
+def test_generate_wiki_is_seeded(tmp_path):
+    generate_wiki(tmp_path / "a", pages=50, seed=1)
+    generate_wiki(tmp_path / "b", pages=50, seed=1)
+    generate_wiki(tmp_path / "c", pages=50, seed=2)
+    assert read_wiki(tmp_path / "a") == read_wiki(tmp_path / "b")
+    assert read_wiki(tmp_path / "a") != read_wiki(tmp_path / "c")
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        # (<test_id>, (<pages>, <depth>, <fan_out>), <pages at each depth>)
+        ("home_only", (1, 2, 3), [1]),
+        ("full", (13, 2, 3), [1, 3, 9]),
+        ("partial", (8, 2, 3), [1, 3, 4]),
+        ("chain", (4, 3, 1), [1, 1, 1, 1]),
+    ],
+)
+def test_generate_wiki(test_id, args, expected, tmp_path):
+    pages = generate_wiki(tmp_path, *args)
+    wiki_tree = tree.WikiTree(tmp_path)
+
+    assert sorted(wiki_tree.pages) == sorted(pages)
+    depths = [0] * len(expected)
+    for page in pages:
+        depths[wiki_tree.get_depth(page)] += 1
+    assert depths == expected
+
+
+def test_generate_wiki_unique_names(tmp_path):
+    pages = generate_wiki(tmp_path, pages=500, depth=3, fan_out=10)
+    assert len({page.stem.lower() for page in pages}) == len(pages)
+
+
+def test_generate_wiki_body_size(tmp_path):
+    body_size = 5000
+    pages = generate_wiki(tmp_path, pages=10, body_size=body_size)
+    sizes = [page.stat().st_size for page in pages]
+    assert all(body_size <= size < 2 * body_size for size in sizes)
+
+
+@m.parametrize(
+    "test_id, args",
+    [
+        ("too_many_pages", (14, 2, 3)),
+        ("no_pages", (0, 2, 3)),
+        ("no_fan_out", (1, 2, 0)),
+        ("too_much_fan_out", (1, 2, 101)),
+    ],
+)
+def test_generate_wiki_raises(test_id, args, tmp_path):
+    with pytest.raises(ValueError):
+        generate_wiki(tmp_path, *args)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * run_benchmarks
+
+
+def test_run_benchmarks():
+    context = common.get_context()
+    report = benchmark.run_benchmarks(pages=20, depth=2, fan_out=5, jobs=1)
+
+    assert set(report["results"]) == {"startup", *benchmark.BENCHMARKS}
+    assert report["results"]["up"]["full"]["seconds"] > 0
+    assert report["results"]["memory"]["peak_bytes"] > 0
+    assert report["results"]["tree"]["bytes"] > 0
+    assert common.get_context() is context
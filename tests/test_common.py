@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import common, tree
+
+from conftest import WIKI_ROOT
+from test_api import PAGES
+
+# * -------------------------------------------------------------------------------- * #
+# * Context
+
+
+def test_context_defaults():
+    context = common.Context()
+    assert context.root == common.WIKI_ROOT
+    assert context.sidebar_filename == common.SIDEBAR_FILENAME
+    assert context.footer_filename == common.FOOTER_FILENAME
+    assert context.page_pattern == common.PAGE_PATTERN
+
+
+@m.parametrize(
+    "test_id, url",
+    [
+        ("wiki_url", "https://github.com/user/repo/wiki/"),
+        ("no_slash", "https://github.com/user/repo/wiki"),
+        ("clone_url", "https://github.com/user/repo.wiki.git"),
+        ("ssh", "git@github.com:user/repo.wiki.git"),
+    ],
+)
+def test_context_remote_url(test_id, url):
+    expected = "https://github.com/user/repo/wiki/"
+    assert common.Context(remote_url=url).remote_url == expected
+
+
+def test_context_page_pattern(RESTORE_WIKI):
+    context = common.Context(WIKI_ROOT, page_pattern="Home.md")
+    assert context.tree.pages == [PAGES["home"]]
+
+
+def test_get_settings():
+    context = common.Context()
+    context.window = 3
+    assert context.get_settings() == {
+        "profile": False,
+        "read_only": False,
+        "window": 3,
+        "ancestors": 0,
+        "backlinks": None,
+    }
+
+
+def test_use_context(RESTORE_WIKI):
+    old_context = common.get_context()
+    context = common.Context(WIKI_ROOT, page_pattern="Home.md")
+    with common.use_context(context):
+        assert common.get_context() is context
+        assert len(tree.get_wiki_tree()) == 1
+    assert common.get_context() is old_context
+    assert len(tree.get_wiki_tree()) == len(PAGES)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * load_config
+
+
+def test_load_config(tmp_path):
+    path = tmp_path / "wikis.json"
+    wikis = [
+        {"root": "a/wiki"},
+        {"root": "b/wiki", "remote_url": "https://github.com/b/b/wiki"},
+    ]
+    path.write_text(json.dumps(wikis))
+
+    contexts = common.load_config(path)
+
+    assert [context.root for context in contexts] == [
+        tmp_path / "a/wiki",
+        tmp_path / "b/wiki",
+    ]
+    assert contexts[1].remote_url == "https://github.com/b/b/wiki/"
+
+
+@m.parametrize(
+    "test_id, wikis",
+    [
+        ("not_a_list", {"root": "wiki"}),
+        ("no_root", [{"remote_url": "https://github.com/a/a/wiki/"}]),
+        ("unknown_key", [{"root": "wiki", "sidebar": "_Side.md"}]),
+    ],
+)
+def test_load_config_invalid(test_id, wikis, tmp_path):
+    path = tmp_path / "wikis.json"
+    path.write_text(json.dumps(wikis))
+    with pytest.raises(ValueError):
+        common.load_config(path)
+
+
+def test_load_config_relative(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("wikis.json").write_text(json.dumps([{"root": "wiki"}]))
+    assert common.load_config(Path("wikis.json"))[0].root == Path("wiki")
@@ -0,0 +1,187 @@
+import pytest
+from pytest import mark as m
+from wikiman import api, common, history, manifest, navigation, tree
+
+from test_api import PAGES
+from test_navigation import read_navigation
+
+git = pytest.importorskip("git")
+
+# * -------------------------------------------------------------------------------- * #
+# * UTILITY FUNCTIONS
+
+
+@pytest.fixture()
+def REPO(RESTORE_WIKI):
+    """Commit the wiki to a Git repo of its own, with no remote."""
+
+    repo = git.Repo.init(common.WIKI_ROOT)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Wikiman")
+        config.set_value("user", "email", "wikiman@example.com")
+    commit(repo)
+    return repo
+
+
+def commit(repo) -> None:
+    """Commit everything in the wiki."""
+
+    repo.git.add(all=True)
+    repo.index.commit("Change the wiki")
+
+
+def update_since(since) -> navigation.Report:
+    """Update the navigation since a revision, with a freshly walked tree."""
+
+    tree.reset()
+    return navigation.update_navigation(jobs=1, since=since)
+
+
+def check_navigation() -> None:
+    """Check that the navigation is the same as if every page was regenerated."""
+
+    navigation_files = read_navigation()
+    tree.reset()
+    navigation.update_navigation(force=True, jobs=1)
+    assert read_navigation() == navigation_files
+
+
+# * -------------------------------------------------------------------------------- * #
+# * get_changes
+
+
+def test_get_changes(REPO):
+    (PAGES["transit-thrum-middle"].parent / common.SIDEBAR_FILENAME).write_text("")
+    with open(PAGES["close-waste-transform"], "a") as file:
+        file.write("\nChanged\n")
+    PAGES["knuckle-conversion-wound"].unlink()
+    new_page = common.WIKI_ROOT / "New-Page.md"
+    new_page.touch()
+
+    changes = history.get_changes(REPO, common.WIKI_ROOT, "HEAD")
+
+    assert changes.modified == {
+        PAGES["close-waste-transform"].relative_to(common.WIKI_ROOT).as_posix()
+    }
+    assert changes.structure == {
+        PAGES["knuckle-conversion-wound"].relative_to(common.WIKI_ROOT).as_posix(),
+        "New-Page.md",
+    }
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("page", ("", "00_A/A.md"), "00_A/A.md"),
+        ("in_subdirectory", ("wiki/", "wiki/00_A/A.md"), "00_A/A.md"),
+        ("outside", ("wiki/", "README.md"), None),
+        ("sidebar", ("", f"00_A/{common.SIDEBAR_FILENAME}"), None),
+        ("hidden", ("", f"{common.CACHE_DIRNAME}/A.md"), None),
+        ("not_a_page", ("", "00_A/image.png"), None),
+    ],
+)
+def test_get_key(test_id, args, expected):
+    assert history.get_key(*args) == expected
+
+
+def test_get_changes_unknown_revision(REPO):
+    with pytest.raises(ValueError):
+        history.get_changes(REPO, common.WIKI_ROOT, "no-such-revision")
+
+
+def test_get_repo_none(tmp_path):
+    with pytest.raises(ValueError):
+        history.get_repo(tmp_path)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * update_navigation since a revision
+
+
+def test_update_since_first_run(REPO):
+    report = update_since(True)
+    assert len(report.rendered) == len(PAGES)
+    history_record = manifest.Manifest.load(manifest.get_manifest_path()).history
+    assert history_record["commit"] == REPO.head.commit.hexsha
+
+
+def test_update_since_unchanged(REPO):
+    update_since(True)
+    assert not update_since(True).rendered
+    assert not update_since("HEAD").rendered
+
+
+@m.parametrize(
+    "test_id, edit",
+    [
+        (
+            "heading_added",
+            lambda: PAGES["close-waste-transform"].write_text("# Title\n\n## New\n"),
+        ),
+        (
+            "added",
+            lambda: api.add_page("New-Page", PAGES["official-union-advantage"], 1),
+        ),
+        ("added_last", lambda: api.add_page("New-Page", PAGES["transit-thrum-middle"])),
+        ("removed", lambda: api.remove_page(PAGES["transit-thrum-middle"])),
+        ("renamed", lambda: api.rename_page(PAGES["transit-thrum-middle"], "New-Name")),
+        (
+            "moved",
+            lambda: api.move_page(
+                PAGES["official-union-advantage"], PAGES["equity-substitute-huddle"], 0
+            ),
+        ),
+    ],
+)
+def test_update_since(test_id, edit, REPO):
+    update_since(True)
+
+    edit()
+    report = update_since(True)
+
+    assert 0 < len(report.rendered) < len(PAGES)
+    check_navigation()
+
+
+def test_update_since_revision(REPO):
+    update_since(True)
+    api.remove_page(PAGES["transit-thrum-middle"])
+    commit(REPO)
+    api.add_page("New-Page", PAGES["home"], 0)
+    commit(REPO)
+
+    update_since("HEAD~2")
+
+    check_navigation()
+
+
+def test_update_since_reverted_before_commit(REPO):
+    """Pages that weren't committed may be gone by the next update."""
+
+    update_since(True)
+    page = api.add_page("New-Page", PAGES["official-union-advantage"], 1)
+    update_since(True)
+
+    api.remove_page(page)
+    update_since(True)
+
+    check_navigation()
+
+
+def test_update_since_forced(REPO):
+    with pytest.raises(ValueError):
+        navigation.update_navigation(force=True, since="HEAD")
+
+
+@m.parametrize(
+    "test_id, window, ancestors", [("window", 1, 0), ("ancestors", None, 2)]
+)
+def test_update_since_tree_view(test_id, window, ancestors, REPO, monkeypatch):
+    monkeypatch.setattr(common.get_context(), "window", window)
+    monkeypatch.setattr(common.get_context(), "ancestors", ancestors)
+    update_since(True)
+
+    api.add_page("New-Page", PAGES["impeach-vermilion-vacuum"])
+    update_since(True)
+
+    check_navigation()
@@ -0,0 +1,341 @@
+import sys
+
+import pytest
+from pytest import mark as m
+from wikiman import (
+    api,
+    cli,
+    common,
+    links,
+    navigation,
+    sitemap,
+    transaction,
+    tree,
+    utils,
+)
+
+from test_api import PAGES
+from test_navigation import count_parses, read_navigation
+
+URL = "{url}"  # Replaced by the URL of the wiki in the content of each case
+SITEMAP = f"{sitemap.START_MARKER}\n\n"
+END = f"\n{sitemap.END_MARKER}\n"
+
+# * -------------------------------------------------------------------------------- * #
+# * find_links
+
+
+@m.parametrize(
+    "test_id, content, expected",
+    [
+        ("none", "# Heading\n\ntext", []),
+        ("wiki_link", "See [[Home]] and [[Slate Slide]].", ["Home", "Slate Slide"]),
+        ("wiki_link_text", "See [[the home page|Home]].", ["Home"]),
+        ("wiki_link_heading", "See [[Home#contents]].", ["Home"]),
+        ("url", f"See [home]({URL}Home).", ["Home"]),
+        ("url_heading", f"See [home]({URL}Home#contents).", ["Home"]),
+        ("bare_url", f"See {URL}Home.", ["Home"]),
+        ("quoted_url", f"See {URL}Slate%20Slide%20Course", ["Slate Slide Course"]),
+        ("other_url", "See [home](https://example.com/wiki/Home).", []),
+        ("image", "[[images/logo.png]] [[https://example.com/logo.png]]", []),
+        ("duplicates", f"[[Home]] [[Other]] [home]({URL}Home)", ["Home", "Other"]),
+        ("code_span", "See `[[Home]]` and [[Other]].", ["Other"]),
+        ("fence", "```\n[[Home]]\n```\n[[Other]]", ["Other"]),
+        (
+            "sitemap",
+            f"{sitemap.START_MARKER}\n\n- [[Home]]\n\n{sitemap.END_MARKER}\n[[Other]]",
+            ["Other"],
+        ),
+        ("unterminated_sitemap", f"{sitemap.START_MARKER}\n\n- [[Home]]", ["Home"]),
+    ],
+)
+def test_find_links(test_id, content, expected):
+    content = content.replace(URL, utils.GIT_REMOTE_URL)
+    assert links.find_links(content) == expected
+
+
+# * -------------------------------------------------------------------------------- * #
+# * rewrite_links
+
+
+@m.parametrize(
+    "test_id, content, expected",
+    [
+        ("none", "[[Home]] and [[Old Names]]", "[[Home]] and [[Old Names]]"),
+        ("wiki_link", "See [[Old Name]].", "See [[New Name]]."),
+        ("wiki_link_dashed", "See [[old-name]].", "See [[New-Name]]."),
+        ("wiki_link_text", "See [[text|Old Name#a]].", "See [[text|New Name#a]]."),
+        ("url", f"[old]({URL}Old-Name#a)", f"[old]({URL}New-Name#a)"),
+        ("bare_url", f"See {URL}Old%20Name.", f"See {URL}New-Name."),
+        ("code_span", "`[[Old Name]]` [[Old Name]]", "`[[Old Name]]` [[New Name]]"),
+        ("fence", "```\n[[Old Name]]\n```\n", "```\n[[Old Name]]\n```\n"),
+        ("line_endings", "[[Old Name]]\r\n", "[[New Name]]\r\n"),
+        ("sitemap", f"{SITEMAP}[[Old Name]]\n{END}", f"{SITEMAP}[[Old Name]]\n{END}"),
+        ("unterminated_sitemap", f"{SITEMAP}[[Old Name]]", f"{SITEMAP}[[New Name]]"),
+    ],
+)
+def test_rewrite_links(test_id, content, expected):
+    content, expected = (
+        text.replace(URL, utils.GIT_REMOTE_URL) for text in (content, expected)
+    )
+    assert links.rewrite_links(content, "Old-Name", "New-Name") == expected
+
+
+# * -------------------------------------------------------------------------------- * #
+# * get_link_graph
+
+
+def add_links(links_by_page: dict[str, str]) -> None:
+    """Add links to the end of pages."""
+
+    for key, content in links_by_page.items():
+        with open(PAGES[key], "a", encoding="utf-8") as file:
+            file.write(f"\n{content}\n")
+
+
+LINKS = {
+    "slate-slide-course": "[[Home]], [[Transit Thrum Middle]], [[Slate-Slide-Course]]",
+    "automatic-party-merit": "See [[Transit-Thrum-Middle]] and [[Missing Page]].",
+}
+
+
+def test_get_link_graph(RESTORE_WIKI):
+    add_links(LINKS)
+    graph = api.get_link_graph(jobs=1)
+
+    wiki_tree = tree.get_wiki_tree()
+    slate, automatic, transit, home = (
+        wiki_tree.get_id(PAGES[key])
+        for key in (
+            "slate-slide-course",
+            "automatic-party-merit",
+            "transit-thrum-middle",
+            "home",
+        )
+    )
+    assert graph.links == {slate: [home, transit], automatic: [transit]}
+    assert graph.backlinks == {home: [slate], transit: [slate, automatic]}
+    assert graph.broken == {automatic: ["Missing Page"]}
+    assert len(graph) == 3
+
+
+def test_get_link_graph_reads_once(RESTORE_WIKI, monkeypatch):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1)
+    parsed = count_parses(monkeypatch)
+    graph = api.get_link_graph(jobs=1)
+    assert not parsed
+    assert graph.broken
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_get_link_graph_jobs(test_id, jobs, RESTORE_WIKI):
+    add_links(LINKS)
+    assert api.get_link_graph(jobs) == navigation.get_link_graph(jobs=1)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * rename_page with links rewritten
+
+
+def test_update_links(RESTORE_WIKI, monkeypatch):
+    add_links(LINKS)
+    api.get_link_graph(jobs=1)
+    rewritten: list = []
+    rewrite_page = links.rewrite_page
+
+    def record(page, old_name, new_name):
+        rewritten.append(page)
+        return rewrite_page(page, old_name, new_name)
+
+    monkeypatch.setattr(links, "rewrite_page", record)
+    changed = api.update_links(PAGES["transit-thrum-middle"], "New-Name", jobs=1)
+
+    expected = [PAGES[key] for key in ("slate-slide-course", "automatic-party-merit")]
+    assert changed == expected
+    assert sorted(rewritten) == sorted([PAGES["transit-thrum-middle"], *expected])
+    assert "[[New Name]]" in PAGES["slate-slide-course"].read_text(encoding="utf-8")
+
+
+def test_rename_page_rewrite_links(RESTORE_WIKI):
+    add_links(LINKS)
+    new_page = api.rename_page(PAGES["transit-thrum-middle"], "New Name", True, jobs=1)
+    assert new_page.stem == "New-Name"
+    graph = api.get_link_graph(jobs=1)
+    wiki_tree = tree.get_wiki_tree()
+    assert graph.backlinks[wiki_tree.get_id(new_page)] == [
+        wiki_tree.get_id(PAGES[key])
+        for key in ("slate-slide-course", "automatic-party-merit")
+    ]
+    assert list(graph.broken.values()) == [["Missing Page"]]
+
+
+def read_pages() -> dict[str, str]:
+    """Read every page of the wiki."""
+
+    return {key: page.read_text(encoding="utf-8") for key, page in PAGES.items()}
+
+
+def leave_journal() -> None:
+    """Leave the journal of an interrupted edit behind."""
+
+    common.init_cache_dir(common.get_context().root)
+    transaction.get_journal_path(common.get_context().root).write_text("")
+
+
+def fail_to_rename(monkeypatch) -> None:
+    """Make the next step of an edit fail, as if its destination already existed."""
+
+    def fail(operation, source, destination):
+        raise FileExistsError(destination)
+
+    monkeypatch.setattr(transaction, "take_step", fail)
+
+
+@m.parametrize(
+    "test_id, interrupt, exception",
+    [
+        ("journal", lambda _: leave_journal(), transaction.InterruptedEditError),
+        ("step", fail_to_rename, FileExistsError),
+    ],
+)
+def test_rename_page_rewrite_links_fails(
+    test_id, interrupt, exception, RESTORE_WIKI, monkeypatch
+):
+    add_links(LINKS)
+    expected = read_pages()
+    interrupt(monkeypatch)
+    with pytest.raises(exception):
+        api.rename_page(PAGES["transit-thrum-middle"], "New Name", True, jobs=1)
+    assert read_pages() == expected
+
+
+def test_rename_page_rewrite_links_subpages(RESTORE_WIKI):
+    add_links({"slate-slide-course": "[[Impeach Vermilion Vacuum]]"})
+    api.rename_page(PAGES["impeach-vermilion-vacuum"], "New Name", True, jobs=1)
+    assert "[[New Name]]" in next(
+        page.read_text(encoding="utf-8")
+        for page in tree.get_wiki_tree().pages
+        if page.stem == "Slate-Slide-Course"
+    )
+
+
+def test_rename_page_keeps_links(RESTORE_WIKI):
+    add_links(LINKS)
+    api.rename_page(PAGES["transit-thrum-middle"], "New Name")
+    content = PAGES["automatic-party-merit"].read_text(encoding="utf-8")
+    assert "[[Transit-Thrum-Middle]]" in content
+
+
+# * -------------------------------------------------------------------------------- * #
+# * update_navigation with backlinks
+
+
+def read_footer(key: str) -> str:
+    """Read the footer of a page."""
+
+    return (PAGES[key].parent / common.FOOTER_FILENAME).read_text(encoding="utf-8")
+
+
+def test_update_backlinks(RESTORE_WIKI):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1)
+    without_backlinks = read_navigation()
+
+    navigation.update_navigation(jobs=1, backlinks=True)
+
+    linked_from = "Linked from: " + ", ".join(
+        utils.get_page_link(PAGES[key])
+        for key in ("slate-slide-course", "automatic-party-merit")
+    )
+    assert read_footer("transit-thrum-middle").endswith(linked_from)
+    changed = {
+        path
+        for path, text in read_navigation().items()
+        if without_backlinks[path] != text
+    }
+    assert changed == {
+        str(PAGES[key].parent / common.FOOTER_FILENAME)
+        for key in ("transit-thrum-middle", "home")
+    }
+
+
+def test_update_backlinks_no_op(RESTORE_WIKI):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1, backlinks=True)
+    report = navigation.update_navigation(jobs=1, backlinks=True)
+    assert not report.rendered
+    assert report.written == 0
+
+
+def test_update_backlinks_link_removed(RESTORE_WIKI):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1, backlinks=True)
+    PAGES["slate-slide-course"].write_text("# Slate Slide Course\n", encoding="utf-8")
+
+    report = navigation.update_navigation(jobs=1, backlinks=True)
+
+    assert "Linked from" not in read_footer("home")
+    assert read_footer("transit-thrum-middle").endswith(
+        f"Linked from: {utils.get_page_link(PAGES['automatic-party-merit'])}"
+    )
+    assert PAGES["home"] in report.rendered
+    assert not common.get_context().backlinks
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_update_backlinks_jobs(test_id, jobs, RESTORE_WIKI):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1, backlinks=True)
+    expected = read_navigation()
+    navigation.update_navigation(jobs=jobs, force=True, backlinks=True)
+    assert read_navigation() == expected
+
+
+def test_update_backlinks_since(RESTORE_WIKI):
+    with pytest.raises(ValueError):
+        navigation.update_navigation(since="HEAD", backlinks=True)
+
+
+def test_check_backlinks(RESTORE_WIKI):
+    add_links(LINKS)
+    navigation.update_navigation(jobs=1, backlinks=True)
+    assert not navigation.check_navigation(jobs=1, backlinks=True).stale
+    assert navigation.check_navigation(jobs=1).stale == [
+        PAGES[key].parent / common.FOOTER_FILENAME
+        for key in ("home", "transit-thrum-middle")
+    ]
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CLI
+
+
+def test_links_cli(RESTORE_WIKI, monkeypatch, capsys):
+    add_links(LINKS)
+    monkeypatch.setattr(sys, "argv", ["wikiman", "links", "--jobs", "1"])
+    with pytest.raises(SystemExit, match="1 links are broken"):
+        cli.main()
+    page = PAGES["automatic-party-merit"]
+    assert f"{page}: 'Missing Page'. Page not found." in capsys.readouterr().out
+    assert not (PAGES["home"].parent / common.FOOTER_FILENAME).exists()
+
+
+def test_rename_cli_rewrite_links(RESTORE_WIKI, monkeypatch):
+    add_links(LINKS)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["wikiman", "rn", "transit thrum middle", "New Name", "--rewrite-links"],
+    )
+    cli.main()
+    content = PAGES["automatic-party-merit"].read_text(encoding="utf-8")
+    assert "[[New-Name]]" in content
+
+
+def test_links_cli_footers(RESTORE_WIKI, monkeypatch, capsys):
+    add_links({"slate-slide-course": LINKS["slate-slide-course"]})
+    monkeypatch.setattr(sys, "argv", ["wikiman", "links", "--footers", "--jobs", "1"])
+    cli.main()
+    assert capsys.readouterr().out.endswith("2 links between pages. None are broken.\n")
+    assert "Linked from" in read_footer("home")
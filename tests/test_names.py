@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import names
+
+NAMES = [
+    "Home",
+    "Measure-Transient-Respite",
+    "Meridian-Preserve-Winter",
+    "Middle-Pasture-Floating",
+    "Official-Union-Advantage",
+]
+
+PAGES = [Path(f"{name}.md") for name in NAMES]
+
+
+@pytest.fixture()
+def INDEX() -> names.NameIndex:
+    return names.NameIndex(PAGES)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * find
+
+
+@m.parametrize(
+    "test_id, name, expected",
+    [
+        ("dashes", "Middle-Pasture-Floating", Path("Middle-Pasture-Floating.md")),
+        ("spaces", "middle pasture floating", Path("Middle-Pasture-Floating.md")),
+        ("mixed", "MIDDLE pasture-Floating", Path("Middle-Pasture-Floating.md")),
+    ],
+)
+def test_find(test_id, name, expected, INDEX):
+    assert INDEX.find(name) == expected
+
+
+def test_find_suggests(INDEX):
+    with pytest.raises(names.PageNotFoundError, match="Middle-Pasture-Floating"):
+        INDEX.find("Midle-Pasture-Floatin")
+
+
+def test_find_ambiguous():
+    index = names.NameIndex([*PAGES, Path("00_Other") / "Home.md"])
+    with pytest.raises(names.AmbiguousPageError):
+        index.find("home")
+
+
+# * -------------------------------------------------------------------------------- * #
+# * complete
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("all", ("",), NAMES),
+        ("one", ("mid",), ["Middle-Pasture-Floating"]),
+        ("many", ("Me",), ["Measure-Transient-Respite", "Meridian-Preserve-Winter"]),
+        ("spaces", ("measure tr",), ["Measure-Transient-Respite"]),
+        ("limit", ("M", 2), ["Measure-Transient-Respite", "Meridian-Preserve-Winter"]),
+        ("none", ("Z",), []),
+        ("past_last", ("Zz",), []),
+    ],
+)
+def test_complete(test_id, args, expected, INDEX):
+    assert INDEX.complete(*args) == expected
+
+
+# * -------------------------------------------------------------------------------- * #
+# * suggest
+
+
+@m.parametrize(
+    "test_id, name, expected",
+    [
+        ("typo", "Meridain-Preserve-Winter", ["Meridian-Preserve-Winter"]),
+        ("missing_word", "Official-Advantage", ["Official-Union-Advantage"]),
+        ("nothing_close", "Zenith", []),
+    ],
+)
+def test_suggest(test_id, name, expected, INDEX):
+    assert INDEX.suggest(name) == expected
@@ -0,0 +1,509 @@
+import concurrent.futures
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import api, cli, common, manifest, navigation, remote, tree, utils, writer
+
+from conftest import TESTS_WIKI_ROOT
+from test_api import PAGES
+
+# * -------------------------------------------------------------------------------- * #
+# * UTILITY FUNCTIONS
+
+
+def read_navigation() -> dict[str, str]:
+    """Read every generated sidebar and footer in the wiki."""
+
+    return {
+        str(file): file.read_text()
+        for filename in (common.SIDEBAR_FILENAME, common.FOOTER_FILENAME)
+        for file in common.WIKI_ROOT.glob(f"**/{filename}")
+    }
+
+
+def count_parses(monkeypatch) -> list[str]:
+    """Record the content of every page that gets parsed for headings."""
+
+    parsed: list[str] = []
+    parse_headings = api.parse_headings
+
+    def record(content):
+        parsed.append(content)
+        return parse_headings(content)
+
+    monkeypatch.setattr(api, "parse_headings", record)
+    return parsed
+
+
+# * -------------------------------------------------------------------------------- * #
+# * update_navigation
+
+
+def test_update_navigation(RESTORE_WIKI):
+    report = navigation.update_navigation()
+    assert sorted(report.rendered) == sorted(PAGES.values())
+    assert report.written == 2 * len(PAGES)
+    assert manifest.get_manifest_path().exists()
+
+
+def test_update_navigation_no_op(RESTORE_WIKI, monkeypatch):
+    navigation.update_navigation()
+    expected = read_navigation()
+
+    parsed = count_parses(monkeypatch)
+    report = navigation.update_navigation(jobs=1)
+
+    assert not parsed
+    assert not report.rendered
+    assert read_navigation() == expected
+
+
+def test_update_navigation_heading_changed(RESTORE_WIKI, monkeypatch):
+    navigation.update_navigation()
+    page = PAGES["close-waste-transform"]
+    with open(page, "a") as file:
+        file.write("\n## A new heading\n")
+
+    parsed = count_parses(monkeypatch)
+    report = navigation.update_navigation(jobs=1)
+
+    assert len(parsed) == 1
+    assert report.rendered == [page]
+    assert (report.written, report.unchanged) == (1, 1)
+    assert "a-new-heading" in (page.parent / common.SIDEBAR_FILENAME).read_text()
+
+
+def test_update_navigation_body_changed(RESTORE_WIKI):
+    navigation.update_navigation()
+    page = PAGES["close-waste-transform"]
+    with open(page, "a") as file:
+        file.write("\nJust a paragraph, no headings.\n")
+    assert not navigation.update_navigation().rendered
+
+
+def test_update_navigation_page_added(RESTORE_WIKI):
+    navigation.update_navigation()
+    page = PAGES["reaction-diagonal-patter"]
+    new_page = page.parent.parent / "03_New-Page" / "New-Page.md"
+    new_page.parent.mkdir()
+    new_page.touch()
+    tree.reset()
+
+    rendered = navigation.update_navigation().rendered
+
+    # The new page, its siblings, the parent, and the page just before it in the wiki
+    assert new_page in rendered
+    assert page in rendered
+    assert PAGES["equity-substitute-huddle"] in rendered
+    assert PAGES["impeach-vermilion-vacuum"] not in rendered
+
+
+def test_update_navigation_matches_full_update(RESTORE_WIKI):
+    navigation.update_navigation()
+    shutil.move(str(PAGES["transit-thrum-middle"].parent), str(PAGES["home"].parent))
+    tree.reset()
+
+    navigation.update_navigation()
+    incremental = read_navigation()
+    navigation.update_navigation(force=True)
+    assert read_navigation() == incremental
+
+
+def test_update_navigation_missing_files(RESTORE_WIKI):
+    navigation.update_navigation()
+    page = PAGES["close-waste-transform"]
+    (page.parent / common.FOOTER_FILENAME).unlink()
+    report = navigation.update_navigation()
+    assert report.rendered == [page]
+    assert (report.written, report.unchanged) == (1, 1)
+
+
+@m.parametrize(
+    "test_id, filename, same_size",
+    [
+        ("sidebar_appended", common.SIDEBAR_FILENAME, False),
+        ("footer_replaced", common.FOOTER_FILENAME, True),
+    ],
+)
+def test_update_navigation_edited_files(test_id, filename, same_size, RESTORE_WIKI):
+    navigation.update_navigation()
+    expected = read_navigation()
+    page = PAGES["close-waste-transform"]
+    file = page.parent / filename
+    if same_size:
+        file.write_text("x" * len(expected[str(file)]), encoding="utf-8")
+    else:
+        with open(file, "a", encoding="utf-8") as edited_file:
+            edited_file.write("x")
+
+    report = navigation.update_navigation()
+
+    assert report.rendered == [page]
+    assert (report.written, report.unchanged) == (1, 1)
+    assert read_navigation() == expected
+    assert not navigation.update_navigation().rendered
+
+
+def test_update_navigation_skips_unchanged_writes(RESTORE_WIKI):
+    navigation.update_navigation()
+    mtimes = {file: os.stat(file).st_mtime_ns for file in read_navigation()}
+
+    report = navigation.update_navigation(force=True)
+
+    assert (report.written, report.unchanged) == (0, 2 * len(PAGES))
+    assert {file: os.stat(file).st_mtime_ns for file in read_navigation()} == mtimes
+
+
+def test_update_navigation_jobs(RESTORE_WIKI):
+    serial = navigation.update_navigation(force=True, jobs=1)
+    expected = read_navigation()
+    for file in expected:
+        os.remove(file)
+
+    parallel = navigation.update_navigation(force=True, jobs=2)
+
+    assert parallel.rendered == serial.rendered
+    assert read_navigation() == expected
+
+
+@m.parametrize("test_id, durability", [("file", "file"), ("end", "end")])
+def test_update_navigation_durability(test_id, durability, RESTORE_WIKI):
+    navigation.update_navigation(force=True, jobs=1)
+    expected = read_navigation()
+    for file in expected:
+        os.remove(file)
+
+    navigation.update_navigation(force=True, jobs=2, durability=durability)
+
+    assert read_navigation() == expected
+    assert not list(common.WIKI_ROOT.glob(f"**/.*{writer.TEMPORARY_SUFFIX}"))
+
+
+def test_update_navigation_unknown_durability(RESTORE_WIKI):
+    with pytest.raises(ValueError):
+        navigation.update_navigation(durability="sometimes")
+
+
+# * -------------------------------------------------------------------------------- * #
+# * check_navigation
+
+
+def test_check_navigation(RESTORE_WIKI):
+    navigation.update_navigation()
+    report = navigation.check_navigation(jobs=1)
+    assert not report.stale
+    assert report.unchanged == 2 * len(PAGES)
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_check_navigation_stale(test_id, jobs, RESTORE_WIKI):
+    navigation.update_navigation()
+    page = PAGES["close-waste-transform"]
+    with open(page, "a") as file:
+        file.write("\n## A new heading\n")
+    footer = PAGES["home"].parent / common.FOOTER_FILENAME
+    footer.unlink()
+    expected = read_navigation()
+
+    report = navigation.check_navigation(jobs=jobs)
+
+    sidebar = page.parent / common.SIDEBAR_FILENAME
+    assert sorted(report.stale) == sorted([sidebar, footer])
+    assert read_navigation() == expected
+
+
+def test_check_navigation_writes_nothing(RESTORE_WIKI):
+    shutil.rmtree(common.WIKI_ROOT / common.CACHE_DIRNAME, ignore_errors=True)
+    report = navigation.check_navigation(jobs=1)
+    assert len(report.stale) == 2 * len(PAGES)
+    assert not read_navigation()
+    assert not (common.WIKI_ROOT / common.CACHE_DIRNAME).exists()
+    assert not common.get_context().read_only
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_check_navigation_fail_fast(test_id, jobs, RESTORE_WIKI):
+    with pytest.raises(writer.StaleFileError):
+        navigation.check_navigation(jobs=jobs, fail_fast=True)
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("up_to_date", ["--check"], "Every file is up to date."),
+        ("stale", ["--check"], "1 files are out of date."),
+        ("fail_fast", ["--check", "--fail-fast"], "is out of date."),
+    ],
+)
+def test_check_navigation_cli(
+    test_id, args, expected, RESTORE_WIKI, monkeypatch, capsys
+):
+    navigation.update_navigation()
+    if test_id != "up_to_date":
+        (PAGES["home"].parent / common.FOOTER_FILENAME).unlink()
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", "1", *args])
+    try:
+        cli.main()
+        message = capsys.readouterr().out
+    except SystemExit as exception:
+        message = str(exception.code)
+    assert expected in message
+
+
+@m.parametrize(
+    "test_id, filename",
+    [("edited_sidebar", common.SIDEBAR_FILENAME), ("changed_page", None)],
+)
+def test_check_navigation_cli_then_update(
+    test_id, filename, RESTORE_WIKI, monkeypatch, capsys
+):
+    navigation.update_navigation()
+    page = PAGES["close-waste-transform"]
+    if filename is None:
+        with open(page, "a", encoding="utf-8") as file:
+            file.write("\n## A new heading\n")
+    else:
+        with open(page.parent / filename, "a", encoding="utf-8") as file:
+            file.write("x")
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", "1", "--check"])
+    with pytest.raises(SystemExit, match="Run the same command without `--check`"):
+        cli.main()
+
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", "1"])
+    cli.main()
+
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", "1", "--check"])
+    cli.main()
+    assert "Every file is up to date." in capsys.readouterr().out
+
+
+# * -------------------------------------------------------------------------------- * #
+# * Several wikis
+
+
+def read_wiki_navigation(root) -> dict[str, str]:
+    """Read every generated sidebar and footer in a wiki, by path relative to it."""
+
+    return {
+        file.relative_to(root).as_posix(): file.read_text()
+        for filename in (common.SIDEBAR_FILENAME, common.FOOTER_FILENAME)
+        for file in root.glob(f"**/{filename}")
+    }
+
+
+def copy_wikis(tmp_path, names=("a", "b")) -> list[common.Context]:
+    """Copy the wiki to a few directories, and get their contexts."""
+
+    contexts: list[common.Context] = []
+    for name in names:
+        root = tmp_path / name / common.ROOT_NAME
+        shutil.copytree(TESTS_WIKI_ROOT, root)
+        contexts.append(common.Context(root, remote_url=utils.GIT_REMOTE_URL))
+    return contexts
+
+
+def test_update_navigation_filenames(RESTORE_WIKI):
+    context = common.Context(
+        common.WIKI_ROOT,
+        sidebar_filename="_Side.md",
+        footer_filename="_Foot.md",
+    )
+    with common.use_context(context):
+        navigation.update_navigation(jobs=1)
+    for page in PAGES.values():
+        assert (page.parent / "_Side.md").exists()
+        assert (page.parent / "_Foot.md").exists()
+    assert not read_navigation()
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_share_pool(test_id, jobs, RESTORE_WIKI, tmp_path):
+    navigation.update_navigation(jobs=1)
+    expected = read_wiki_navigation(common.WIKI_ROOT)
+    contexts = copy_wikis(tmp_path)
+
+    with navigation.share_pool(contexts, jobs):
+        for context in contexts:
+            with common.use_context(context):
+                report = navigation.update_navigation(jobs=jobs)
+            assert len(report.rendered) == len(PAGES)
+
+    for context in contexts:
+        assert read_wiki_navigation(context.root) == expected
+
+
+def test_share_pool_executor(RESTORE_WIKI, tmp_path):
+    contexts = copy_wikis(tmp_path)
+    with navigation.share_pool(contexts, jobs=2):
+        with common.use_context(contexts[0]):
+            assert isinstance(navigation.get_executor(2), navigation.SharedExecutor)
+            tree.reset()
+            with navigation.get_executor(2) as executor:
+                assert not isinstance(executor, navigation.SharedExecutor)
+        assert not isinstance(navigation.get_executor(1), navigation.SharedExecutor)
+
+
+def test_share_pool_undiscovered(RESTORE_WIKI, tmp_path, monkeypatch):
+    monkeypatch.delenv(remote.REMOTE_URL_VARIABLE, raising=False)
+    contexts = copy_wikis(tmp_path)
+    contexts[0] = common.Context(contexts[0].root)  # Without a remote to find
+    with navigation.share_pool(contexts, jobs=2):
+        with common.use_context(contexts[0]):
+            with pytest.raises(ValueError):
+                navigation.update_navigation(jobs=2)
+        with common.use_context(contexts[1]):
+            assert isinstance(navigation.get_executor(2), navigation.SharedExecutor)
+            navigation.update_navigation(jobs=2)
+    assert read_wiki_navigation(contexts[1].root)
+
+
+def test_share_pool_settings(RESTORE_WIKI, tmp_path):
+    """Settings changed after the pool started are sent along to the workers."""
+
+    (context,) = copy_wikis(tmp_path, ["a"])
+    page = context.root / PAGES["slate-slide-course"].relative_to(common.WIKI_ROOT)
+    with open(page, "a", encoding="utf-8") as file:
+        file.write("\n[[Home]]\n")
+
+    with navigation.share_pool([context], jobs=2), common.use_context(context):
+        context.window = 1
+        navigation.update_navigation(jobs=2, backlinks=True)
+        expected = read_wiki_navigation(context.root)
+        navigation.update_navigation(jobs=1, force=True, backlinks=True)
+        context.window = None
+
+    assert read_wiki_navigation(context.root) == expected
+    assert "Linked from" in expected[common.FOOTER_FILENAME]
+    assert "more" in expected[common.SIDEBAR_FILENAME]
+
+
+@m.parametrize("test_id, roots", [("roots", True), ("config", False)])
+def test_several_wikis_cli(test_id, roots, RESTORE_WIKI, tmp_path, monkeypatch, capsys):
+    contexts = copy_wikis(tmp_path)
+    if roots:
+        monkeypatch.setenv(remote.REMOTE_URL_VARIABLE, utils.GIT_REMOTE_URL)
+        args = [arg for context in contexts for arg in ("--root", str(context.root))]
+    else:
+        config = tmp_path / "wikis.json"
+        config.write_text(
+            json.dumps(
+                [
+                    {"root": f"{name}/wiki", "remote_url": utils.GIT_REMOTE_URL}
+                    for name in ("a", "b")
+                ]
+            )
+        )
+        args = [f"--config={config}"]
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", *args])
+
+    cli.main()
+
+    output = capsys.readouterr().out
+    for context in contexts:
+        assert f"{context.root}:\nRendered {len(PAGES)} pages." in output
+        assert read_wiki_navigation(context.root)
+    assert not read_navigation()
+
+
+def test_several_wikis_cli_failed(RESTORE_WIKI, tmp_path, monkeypatch, capsys):
+    contexts = copy_wikis(tmp_path)
+    monkeypatch.setenv(remote.REMOTE_URL_VARIABLE, utils.GIT_REMOTE_URL)
+    args = [arg for context in contexts for arg in ("--root", str(context.root))]
+    with common.use_context(contexts[1]):
+        navigation.update_navigation(jobs=1)
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--check", *args])
+
+    with pytest.raises(SystemExit, match="1 of 2 wikis failed."):
+        cli.main()
+
+    output = capsys.readouterr()
+    assert "files are out of date" in output.err
+    assert "Every file is up to date." in output.out
+
+
+def test_several_wikis_cli_error(RESTORE_WIKI, tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv(remote.REMOTE_URL_VARIABLE, raising=False)
+    contexts = copy_wikis(tmp_path)
+    config = tmp_path / "wikis.json"
+    # The first wiki fails, having no remote to find
+    config.write_text(
+        json.dumps(
+            [{"root": "a/wiki"}, {"root": "b/wiki", "remote_url": utils.GIT_REMOTE_URL}]
+        )
+    )
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", f"--config={config}"])
+
+    with pytest.raises(SystemExit, match="1 of 2 wikis failed."):
+        cli.main()
+
+    output = capsys.readouterr()
+    assert "ValueError: No Git repo found" in output.err
+    assert f"{contexts[1].root}:\nRendered {len(PAGES)} pages." in output.out
+    assert not read_wiki_navigation(contexts[0].root)
+    assert read_wiki_navigation(contexts[1].root)
+
+
+def test_several_wikis_cli_other_command(tmp_path, monkeypatch):
+    contexts = copy_wikis(tmp_path)
+    args = [arg for context in contexts for arg in ("--root", str(context.root))]
+    monkeypatch.setattr(sys, "argv", ["wikiman", "add", "New Page", "Home", *args])
+    with pytest.raises(SystemExit, match="Only `wikiman up`"):
+        cli.main()
+
+
+@m.parametrize("test_id, jobs, expected", [("serial", 1, []), ("parallel", 2, [2])])
+def test_several_wikis_cli_jobs(
+    test_id, jobs, expected, RESTORE_WIKI, tmp_path, monkeypatch
+):
+    contexts = copy_wikis(tmp_path)
+    monkeypatch.setenv(remote.REMOTE_URL_VARIABLE, utils.GIT_REMOTE_URL)
+    args = [arg for context in contexts for arg in ("--root", str(context.root))]
+    pools: list[int] = []
+
+    class RecordingExecutor(ProcessPoolExecutor):
+        def __init__(self, max_workers, **kwargs):
+            pools.append(max_workers)
+            super().__init__(max_workers, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", str(jobs), *args])
+
+    cli.main()
+
+    assert pools == expected
+    for context in contexts:
+        assert read_wiki_navigation(context.root)
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("none", ["up"], None),
+        ("jobs", ["up", "--jobs", "2"], 2),
+        ("equals", ["up", "--jobs=3"], 3),
+        ("short", ["up", "-j", "4"], 4),
+        ("invalid", ["up", "--jobs", "many"], None),
+    ],
+)
+def test_get_jobs(test_id, args, expected):
+    assert cli.get_jobs(args) == expected
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("none", ["up", "--jobs", "1"], []),
+        ("root", ["up", "--root", "a", "--jobs", "1"], ["a"]),
+        ("roots", ["--root=a", "up", "--root", "b"], ["a", "b"]),
+    ],
+)
+def test_pop_contexts(test_id, args, expected):
+    contexts = cli.pop_contexts(args)
+    assert [context.root for context in contexts] == [Path(root) for root in expected]
+    assert "--root" not in " ".join(args)
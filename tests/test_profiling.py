@@ -0,0 +1,109 @@
+import json
+import pstats
+import sys
+
+from pytest import mark as m
+from wikiman import api, cli, common, navigation, profiling
+
+from test_api import PAGES
+
+PAGE_PHASES = {"scan", "tree", "nav", "toc", "write"}
+
+# * -------------------------------------------------------------------------------- * #
+# * profile
+
+
+@m.parametrize("test_id, jobs", [("serial", 1), ("parallel", 2)])
+def test_profile(test_id, jobs, RESTORE_WIKI, capsys):
+    with profiling.profile() as profiler:
+        navigation.update_navigation(jobs=jobs)
+
+    assert PAGE_PHASES | {"discover", "manifest", "pages"} <= set(profiler.phases)
+    assert profiler.phases["scan"].count == len(PAGES)
+    assert len(profiler.pages) == len(PAGES)
+    assert profiler.total.wall >= profiler.phases["pages"].wall
+    assert "Slowest pages" in capsys.readouterr().err
+    assert not common.get_context().profile
+
+
+def test_profile_json(RESTORE_WIKI, tmp_path):
+    path = tmp_path / "profile.json"
+    with profiling.profile(path):
+        navigation.update_navigation(jobs=1)
+
+    data = json.loads(path.read_text())
+    walls = [page["wall"] for page in data["pages"]]
+    assert len(walls) == len(PAGES)
+    assert walls == sorted(walls, reverse=True)
+    assert set(data["pages"][0]["phases"]) == PAGE_PHASES
+
+
+def test_profile_cprofile(RESTORE_WIKI, tmp_path):
+    path = tmp_path / "profile.prof"
+    with profiling.profile(path):
+        navigation.update_navigation(jobs=1)
+
+    functions = {function for _, _, function in pstats.Stats(str(path)).stats}
+    assert "update_page" in functions
+
+
+def test_profile_edit(RESTORE_WIKI):
+    with profiling.profile() as profiler:
+        api.add_page("New-Page", PAGES["home"], 0)
+    assert {"discover", "edit"} <= set(profiler.phases)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * Hooks
+
+
+def test_hook(RESTORE_WIKI):
+    timings: list[profiling.Timing] = []
+    profiling.add_hook(timings.append)
+    try:
+        navigation.update_navigation(jobs=1)
+        assert not timings
+
+        common.get_context().profile = True
+        navigation.update_navigation(force=True, jobs=1)
+    finally:
+        common.get_context().profile = False
+        profiling.remove_hook(timings.append)
+
+    assert {timing.phase for timing in timings if timing.page} == PAGE_PHASES
+    assert all(timing.wall >= 0 and timing.cpu >= 0 for timing in timings)
+
+
+def test_get_timer_not_profiling():
+    assert profiling.get_timer() is profiling.NULL_TIMER
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CLI
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("none", ["up", "--jobs", "1"], (False, ["up", "--jobs", "1"])),
+        ("flag", ["up", "--profile", "--jobs", "1"], (True, ["up", "--jobs", "1"])),
+        ("path", ["--profile=up.json", "up"], ("up.json", ["up"])),
+    ],
+)
+def test_pop_profile(test_id, args, expected):
+    assert (cli.pop_profile(args), args) == expected
+
+
+def test_main_profile(RESTORE_WIKI, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--profile", "--jobs", "1"])
+    cli.main()
+    output = capsys.readouterr()
+    assert output.out.startswith("Rendered")
+    assert "Slowest pages" in output.err
+
+
+def test_main_profile_root(RESTORE_WIKI, monkeypatch, capsys):
+    argv = ["wikiman", "up", "--profile", "--root", "wiki", "--jobs", "1"]
+    monkeypatch.setattr(sys, "argv", argv)
+    cli.main()
+    assert "  scan\n" in capsys.readouterr().err
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import common, remote
+
+WIKI_URL = "https://github.com/user-name/repo-name/wiki/"
+
+CONFIG = """\
+[core]
+\tbare = false
+[remote "origin"]
+\turl = {url}
+\tfetch = +refs/heads/*:refs/remotes/origin/*
+"""
+
+
+@pytest.fixture(autouse=True)
+def NO_OVERRIDE(monkeypatch):
+    """Ignore any override of the remote URL in the environment."""
+
+    monkeypatch.delenv(remote.REMOTE_URL_VARIABLE, raising=False)
+
+
+def init_repo(path, url="https://github.com/user-name/repo-name.wiki.git"):
+    """Initialize enough of a Git repo for its remote to be resolved."""
+
+    git_dir = path / ".git"
+    git_dir.mkdir(parents=True)
+    (git_dir / "config").write_text(CONFIG.format(url=url))
+    return git_dir
+
+
+# * ---------------------------------------- * #
+# * get_wiki_url
+
+
+@m.parametrize(
+    "test_id, url",
+    [
+        ("https", "https://github.com/user-name/repo-name.wiki.git"),
+        ("https_no_suffix", "https://github.com/user-name/repo-name.wiki"),
+        ("https_repo", "https://github.com/user-name/repo-name.git"),
+        ("credentials", "https://token@github.com/user-name/repo-name.wiki.git"),
+        ("ssh", "git@github.com:user-name/repo-name.wiki.git"),
+        ("ssh_url", "ssh://git@github.com:22/user-name/repo-name.wiki.git"),
+        ("wiki_url", "https://github.com/user-name/repo-name/wiki"),
+    ],
+)
+def test_get_wiki_url(test_id, url):
+    assert remote.get_wiki_url(url) == WIKI_URL
+
+
+# * ---------------------------------------- * #
+# * get_remote_url
+
+
+def test_get_remote_url(tmp_path):
+    init_repo(tmp_path)
+    (tmp_path / "wiki").mkdir()
+    assert remote.get_remote_url(tmp_path / "wiki") == WIKI_URL
+
+
+def test_get_remote_url_ssh(tmp_path):
+    init_repo(tmp_path, url='"git@github.com:user-name/repo-name.wiki.git" # comment')
+    assert remote.get_remote_url(tmp_path) == WIKI_URL
+
+
+def test_get_remote_url_git_file(tmp_path):
+    git_dir = init_repo(tmp_path / "elsewhere")
+    (tmp_path / "clone").mkdir()
+    (tmp_path / "clone" / ".git").write_text(f"gitdir: {git_dir}\n")
+    assert remote.get_remote_url(tmp_path / "clone") == WIKI_URL
+
+
+def test_get_remote_url_worktree(tmp_path):
+    git_dir = init_repo(tmp_path / "main")
+    worktree_git_dir = git_dir / "worktrees" / "feature"
+    worktree_git_dir.mkdir(parents=True)
+    (worktree_git_dir / "commondir").write_text("../..\n")
+    (tmp_path / "feature").mkdir()
+    (tmp_path / "feature" / ".git").write_text(f"gitdir: {worktree_git_dir}\n")
+    assert remote.get_remote_url(tmp_path / "feature") == WIKI_URL
+
+
+def test_get_remote_url_config_override(tmp_path):
+    git_dir = init_repo(tmp_path, url="https://example.com/other.git")
+    with open(git_dir / "config", "a") as file:
+        file.write("[wikiman]\n\tremoteUrl = git@github.com:user-name/repo-name.wiki\n")
+    assert remote.get_remote_url(tmp_path) == WIKI_URL
+
+
+def test_get_remote_url_env_override(tmp_path, monkeypatch):
+    monkeypatch.setenv(remote.REMOTE_URL_VARIABLE, WIKI_URL)
+    assert remote.get_remote_url(tmp_path) == WIKI_URL
+
+
+def test_get_remote_url_relative(tmp_path, monkeypatch):
+    urls: list[str] = []
+    for name in ("a", "b"):
+        init_repo(tmp_path / name, url=f"https://github.com/{name}/{name}.wiki.git")
+        (tmp_path / name / "wiki").mkdir()
+        monkeypatch.chdir(tmp_path / name)
+        urls.append(remote.get_remote_url(Path("wiki")))
+    assert urls == [f"https://github.com/{name}/{name}/wiki/" for name in ("a", "b")]
+
+
+def test_context_remote_url_cached(tmp_path):
+    git_dir = init_repo(tmp_path)
+    context = common.Context(tmp_path / "wiki")
+    assert context.remote_url == WIKI_URL
+    (git_dir / "config").unlink()
+    assert context.remote_url == WIKI_URL
+
+
+def test_get_remote_url_no_origin_raises(tmp_path):
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "config").write_text("[core]\n\tbare = false\n")
+    with pytest.raises(ValueError):
+        remote.get_remote_url(tmp_path)
@@ -0,0 +1,95 @@
+import pytest
+from markdown import Markdown
+from pytest import mark as m
+from wikiman import scanner
+
+from test_api import PAGES
+
+# * -------------------------------------------------------------------------------- * #
+# * UTILITY FUNCTIONS
+
+
+def render_headings(content: str, extensions: list[str]) -> list[tuple[str, str]]:
+    """Get the most significant headings the way `api.get_toc` used to."""
+
+    md = Markdown(extensions=extensions)
+    md.convert(content)
+    return [(token["name"], token["id"]) for token in md.toc_tokens]  # type: ignore
+
+
+# * -------------------------------------------------------------------------------- * #
+# * HEADINGS
+
+# * ---------------------------------------- * #
+# * get_headings
+
+
+@m.parametrize("test_id, page", PAGES.items())
+def test_get_headings_parity(test_id, page, RESTORE_WIKI):
+    expected = render_headings(page.read_text(encoding="utf-8"), ["toc"])
+    with open(page, encoding="utf-8") as file:
+        assert scanner.get_top_headings(scanner.scan_headings(file)) == expected
+    assert scanner.get_headings(page) == expected
+
+
+# * ---------------------------------------- * #
+# * parse_headings
+
+PARSE_HEADINGS_PARAMS = [
+    ("atx", "# One\n\n## Two ##\n\ntext\n# Three"),
+    ("setext", "One\n===\n\nTwo\n---\n\ntext\nNot a heading\n---"),
+    ("nested", "## One\n\n### Nested\n\n## Two\n\n# Three"),
+    ("duplicates", "## Same\n\n## Same\n\n## Same_1"),
+    ("code_span", "## Don't rename `Home.md`\n\n## ``a`b``"),
+    ("indented_code", "    # Not a heading\nHeading\n===\n"),
+    ("horizontal_rule", "text\n\n---\nHeading\n---"),
+    ("unicode", "## Ünïcode héading"),
+    ("emphasis", "## An *emphasized* heading\n\n## A [link](https://example.com)"),
+    ("entities", "## Fish & chips\n\n## Code `<b>`"),
+    ("quote", "> ## Quoted heading\n\n## Heading"),
+    ("list", "- ## Listed heading\n\n## Heading"),
+    ("quote_underlined", "Hello `code` there\n> quote\n==="),
+    ("quote_lazy_underlined", ">\nHello `code` there\n-"),
+    ("list_underlined", "- item\n1. item\n==="),
+    ("list_indented_underlined", "- item\n\n    indented\n-"),
+    ("html", "<div>\n\n## Inside HTML\n\n</div>"),
+    ("comment", "## One\n\n<!-- A comment -->\n\n- [Two](#two)\n\n<!-- -->\n## Two"),
+    ("comment_then_text", "<!-- A comment -->\n## Heading"),
+    ("unclosed_fence", "```\n## Heading"),
+]
+
+
+@m.parametrize("test_id, content", PARSE_HEADINGS_PARAMS)
+def test_parse_headings(test_id, content):
+    expected = render_headings(content, ["toc", "fenced_code"])
+    assert scanner.parse_headings(content) == expected
+
+
+def test_parse_headings_skips_fences():
+    content = "## Heading\n\n```bash\n# A comment\n```\n\n~~~\nTitle\n===\n~~~"
+    assert scanner.parse_headings(content) == [("Heading", "heading")]
+
+
+def test_scan_headings_skips_comments():
+    content = "<!-- A comment -->\n\n## Heading\n\n   <!-- Another -->\n\ntext"
+    assert scanner.scan_headings(content.splitlines()) == [(2, "Heading")]
+
+
+@m.parametrize(
+    "test_id, content",
+    [
+        ("emphasis", "## An *emphasized* heading"),
+        ("quote", "> ## Quoted heading"),
+        ("list", "- ## Listed heading"),
+        ("quote_underlined", "Hello `code` there\n> quote\n==="),
+        ("list_underlined", "- item\n1. item\n==="),
+        ("html", "<div>\n\n## Inside HTML\n\n</div>"),
+        ("comment_then_text", "<!-- A comment -->\n## Heading"),
+        ("comment_then_more", "<!-- A --> <b>comment</b>\n\n## Heading"),
+        ("unclosed_fence", "```\n## Heading"),
+        ("info_string", "```python title\n## Heading\n```"),
+    ],
+)
+def test_scan_headings_raises(test_id, content):
+    with pytest.raises(scanner.UnsupportedMarkdownError):
+        scanner.scan_headings(content.splitlines())
@@ -0,0 +1,198 @@
+import sys
+
+import pytest
+from pytest import mark as m
+from wikiman import api, cli, common, navigation, scanner, sitemap, tree, utils, writer
+
+from test_api import PAGES
+from test_navigation import read_navigation
+
+START = f"{sitemap.START_MARKER}\n\n"
+END = f"\n{sitemap.END_MARKER}\n"
+
+# * -------------------------------------------------------------------------------- * #
+# * replace_sitemap
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("append", (["a\n"], ["- x\n"]), ["a\n", "\n", START, "- x\n", END]),
+        (
+            "append_no_newline",
+            (["a"], ["- x\n"]),
+            ["a", "\n", "\n", START, "- x\n", END],
+        ),
+        (
+            "replace",
+            (["a\n", START, "- old\n", END, "b\n"], ["- x\n"]),
+            ["a\n", START, "- x\n", END, "b\n"],
+        ),
+    ],
+)
+def test_replace_sitemap(test_id, args, expected):
+    old_lines, lines = args
+    old_lines = "".join(old_lines).splitlines(keepends=True)
+    new_lines = sitemap.replace_sitemap(iter(old_lines), lines)
+    assert "".join(new_lines) == "".join(expected)
+
+
+def test_replace_sitemap_unterminated():
+    old_lines = iter(["a\n", START, "- old\n", "## Mine\n"])
+    with pytest.raises(ValueError, match="no end marker"):
+        "".join(sitemap.replace_sitemap(old_lines, ["- x\n"]))
+
+
+# * -------------------------------------------------------------------------------- * #
+# * update_navigation with a site map
+
+
+def read_sitemap(page) -> list[str]:
+    """Read the lines of the site map in a page."""
+
+    content = page.read_text(encoding="utf-8")
+    start = content.index(START) + len(START)
+    return content[start : content.index(END, start)].splitlines(keepends=True)
+
+
+def test_update_sitemap(RESTORE_WIKI):
+    home = PAGES["home"]
+    content = home.read_text(encoding="utf-8")
+
+    report = navigation.update_navigation(jobs=1, sitemap_page=home)
+
+    lines = read_sitemap(home)
+    wiki_tree = tree.get_wiki_tree()
+    assert lines == [
+        "  " * wiki_tree.get_depth(page) + f"- {utils.get_page_link(page)}\n"
+        for page in wiki_tree.get_preorder()
+    ]
+    assert home.read_text(encoding="utf-8").startswith(content)
+    assert report.written == 2 * len(PAGES) + 1
+
+
+@m.parametrize("test_id, check", [("update", False), ("check", True)])
+def test_update_sitemap_unterminated(test_id, check, RESTORE_WIKI):
+    home = PAGES["home"]
+    content = f"# Home\n\n{START}## Important section\n\nUser text that must survive\n"
+    home.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError, match="no end marker"):
+        if check:
+            navigation.check_navigation(jobs=1, sitemap_page=home)
+        else:
+            navigation.update_navigation(jobs=1, sitemap_page=home)
+    assert home.read_text(encoding="utf-8") == content
+    assert not list(home.parent.glob(f".*{writer.TEMPORARY_SUFFIX}"))
+
+
+def test_update_sitemap_no_op(RESTORE_WIKI):
+    home = PAGES["home"]
+    navigation.update_navigation(jobs=1, sitemap_page=home)
+    content = home.read_text(encoding="utf-8")
+
+    report = navigation.update_navigation(jobs=1, sitemap_page=home)
+
+    assert not report.rendered
+    assert report.written == 0
+    assert home.read_text(encoding="utf-8") == content
+
+
+def test_update_sitemap_headings(RESTORE_WIKI):
+    page = PAGES["impeach-vermilion-vacuum"]
+    navigation.update_navigation(jobs=1, sitemap_page=page, sitemap_headings=True)
+
+    wiki_tree = tree.get_wiki_tree()
+    expected: list[str] = []
+    for other_page in wiki_tree.get_preorder():
+        indent = "  " * wiki_tree.get_depth(other_page)
+        url = utils.get_page_url(other_page)
+        expected.append(f"{indent}- {utils.get_page_link(other_page)}\n")
+        expected.extend(
+            f"{indent}  - [{name}]({url}#{id_})\n"
+            for name, id_ in api.get_headings(other_page)
+        )
+    assert read_sitemap(page) == expected
+    assert any("#" in line for line in expected)
+
+
+def test_update_sitemap_scans_headings(RESTORE_WIKI):
+    home = PAGES["home"]
+    expected = api.get_headings(home)
+    navigation.update_navigation(jobs=1, sitemap_page=home, sitemap_headings=True)
+    with open(home, encoding="utf-8") as file:
+        assert scanner.get_top_headings(scanner.scan_headings(file)) == expected
+
+
+def test_update_sitemap_page_added(RESTORE_WIKI):
+    home = PAGES["home"]
+    navigation.update_navigation(jobs=1, sitemap_page=home)
+    with open(home, "a", encoding="utf-8") as file:
+        file.write("\nAfter the site map.\n")
+    new_page = PAGES["transit-thrum-middle"].parent / "01_New-Page" / "New-Page.md"
+    new_page.parent.mkdir()
+    new_page.touch()
+    tree.reset()
+
+    navigation.update_navigation(jobs=1, sitemap_page=home)
+
+    lines = [line.strip() for line in read_sitemap(home)]
+    assert f"- {utils.get_page_link(new_page)}" in lines
+    assert home.read_text(encoding="utf-8").endswith("After the site map.\n")
+
+
+# * -------------------------------------------------------------------------------- * #
+# * check_navigation with a site map
+
+
+@m.parametrize("test_id, fail_fast", [("report", False), ("fail_fast", True)])
+def test_check_sitemap(test_id, fail_fast, RESTORE_WIKI):
+    home = PAGES["home"]
+    navigation.update_navigation(jobs=1)
+    content = home.read_text(encoding="utf-8")
+
+    if fail_fast:
+        with pytest.raises(writer.StaleFileError):
+            navigation.check_navigation(jobs=1, fail_fast=True, sitemap_page=home)
+    else:
+        report = navigation.check_navigation(jobs=1, sitemap_page=home)
+        assert report.stale == [home]
+    assert home.read_text(encoding="utf-8") == content
+    assert not list(home.parent.glob(f".*{writer.TEMPORARY_SUFFIX}"))
+
+
+def test_check_sitemap_up_to_date(RESTORE_WIKI):
+    home = PAGES["home"]
+    navigation.update_navigation(jobs=1, sitemap_page=home, sitemap_headings=True)
+    expected = read_navigation()
+    report = navigation.check_navigation(
+        jobs=1, sitemap_page=home, sitemap_headings=True
+    )
+    assert not report.stale
+    assert read_navigation() == expected
+
+
+# * -------------------------------------------------------------------------------- * #
+# * CLI
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("home", ["--sitemap"], "home"),
+        ("page", ["--sitemap", "impeach vermilion vacuum"], "impeach-vermilion-vacuum"),
+    ],
+)
+def test_sitemap_cli(test_id, args, expected, RESTORE_WIKI, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["wikiman", "up", "--jobs", "1", *args])
+    cli.main()
+    assert read_sitemap(PAGES[expected])
+
+
+def test_sitemap_cli_check(RESTORE_WIKI, monkeypatch):
+    monkeypatch.setattr(
+        sys, "argv", ["wikiman", "up", "--check", "--jobs", "1", "--sitemap"]
+    )
+    with pytest.raises(SystemExit):
+        cli.main()
+    assert not (common.WIKI_ROOT / common.CACHE_DIRNAME).exists()
+    assert not common.get_context().read_only
@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+
+# Import the CLI in a fresh interpreter, recording any access to the working directory
+IMPORT_SCRIPT = """
+import json, os, sys, time
+
+cwd = os.getcwd()
+events = []
+
+
+def audit(event, args):
+    if event in {"os.scandir", "os.listdir", "os.mkdir", "open"} and args:
+        path = args[0]
+        if isinstance(path, (str, bytes, os.PathLike)):
+            path = os.path.abspath(os.fsdecode(path))
+            if path.startswith(cwd):
+                events.append([event, path])
+
+
+sys.addaudithook(audit)
+start = time.perf_counter()
+import wikiman.cli
+elapsed = time.perf_counter() - start
+
+modules = [name for name in ("git", "markdown", "fire") if name in sys.modules]
+print(json.dumps({"elapsed": elapsed, "events": events, "modules": modules}))
+"""
+
+# Generous, so that this only fails if discovery sneaks back into import time
+MAX_IMPORT_TIME = 1.0  # seconds
+
+
+def import_cli(cwd) -> dict:
+    """Import the CLI in a fresh interpreter and report what happened."""
+
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=cwd,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_does_not_touch_wiki(tmp_path):
+    (tmp_path / "wiki").mkdir()
+    (tmp_path / "wiki" / "Home.md").touch()
+    result = import_cli(tmp_path)
+    assert not result["events"]
+
+
+def test_import_does_not_create_wiki(tmp_path):
+    import_cli(tmp_path)
+    assert not (tmp_path / "wiki").exists()
+
+
+def test_import_defers_heavy_imports(tmp_path):
+    result = import_cli(tmp_path)
+    assert not result["modules"]
+
+
+def test_import_time(tmp_path):
+    result = import_cli(tmp_path)
+    assert result["elapsed"] < MAX_IMPORT_TIME
@@ -0,0 +1,334 @@
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import api, common, transaction, tree, utils
+
+from test_api import PAGES
+
+# * -------------------------------------------------------------------------------- * #
+# * UTILITY FUNCTIONS
+
+
+def read_wiki() -> list[str]:
+    """List every file in the wiki, relative to its root."""
+
+    return sorted(
+        path.relative_to(common.WIKI_ROOT).as_posix()
+        for path in common.WIKI_ROOT.rglob("*")
+        if path.is_file() and common.CACHE_DIRNAME not in path.parts
+    )
+
+
+def count_renames(monkeypatch) -> list[Path]:
+    """Record every file and directory that gets renamed."""
+
+    renamed: list[Path] = []
+    rename = Path.rename
+
+    def record(self, target):
+        renamed.append(self)
+        return rename(self, target)
+
+    monkeypatch.setattr(Path, "rename", record)
+    return renamed
+
+
+def interrupt(monkeypatch, after: int, journaled: bool = True) -> None:
+    """Make the next edit stop after some steps, as if the process was killed.
+
+    Unless journaled, the last of those steps is taken but not recorded in the journal.
+    """
+
+    take_step = transaction.take_step
+    taken = []
+
+    def take_step_then_stop(*step):
+        if len(taken) == after:
+            raise KeyboardInterrupt
+        taken.append(step)
+        take_step(*step)
+        if len(taken) == after and not journaled:
+            raise KeyboardInterrupt
+
+    def do_not_undo(steps):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(transaction, "take_step", take_step_then_stop)
+    monkeypatch.setattr(transaction, "undo_steps", do_not_undo)
+
+
+# * -------------------------------------------------------------------------------- * #
+# * Plan
+
+
+@m.parametrize(
+    "test_id, renames, expected",
+    [
+        ("independent", {"a": "b", "c": "d"}, [("c", "d"), ("a", "b")]),
+        ("chain", {"a": "b", "b": "c"}, [("b", "c"), ("a", "b")]),
+        (
+            "swap",
+            {"a": "b", "b": "a"},
+            [("a", ".wikiman-a"), ("b", "a"), (".wikiman-a", "b")],
+        ),
+        (
+            "cycle_and_chain",
+            {"a": "b", "b": "c", "c": "a", "d": "e"},
+            [
+                ("d", "e"),
+                ("a", ".wikiman-a"),
+                ("c", "a"),
+                ("b", "c"),
+                (".wikiman-a", "b"),
+            ],
+        ),
+    ],
+)
+def test_plan_rename(test_id, renames, expected):
+    plan = transaction.Plan(Path())
+    plan.rename({Path(source): Path(dest) for source, dest in renames.items()})
+    steps = [(str(source), str(dest)) for _, source, dest in plan.steps]
+    assert steps == expected
+
+
+def test_plan_rename_order_is_safe():
+    renames = {Path(str(i)): Path(str(i + 1)) for i in range(100)}
+    plan = transaction.Plan(Path())
+    plan.rename(renames)
+
+    # Simulate the renames, which must never land on an existing directory
+    existing = set(renames)
+    for _, source, destination in plan.steps:
+        assert destination not in existing
+        existing.remove(source)
+        existing.add(destination)
+    assert existing == set(renames.values())
+
+
+def test_plan_locate():
+    plan = transaction.Plan(Path())
+    plan.rename({Path("a/00_B"): Path("a/01_B")})
+    assert plan.locate(Path("a/00_B/00_C/C.md")) == Path("a/01_B/00_C/C.md")
+    assert plan.locate(Path("a/00_BB/BB.md")) == Path("a/00_BB/BB.md")
+
+
+# * -------------------------------------------------------------------------------- * #
+# * add_page
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("first", (0,), "00_Impeach-Vermilion-Vacuum/00_New-Page/New-Page.md"),
+        ("middle", (1,), "00_Impeach-Vermilion-Vacuum/01_New-Page/New-Page.md"),
+        ("last", (), "00_Impeach-Vermilion-Vacuum/03_New-Page/New-Page.md"),
+        ("past_last", (9,), "00_Impeach-Vermilion-Vacuum/03_New-Page/New-Page.md"),
+    ],
+)
+def test_add_page(test_id, args, expected, RESTORE_WIKI):
+    parent = PAGES["impeach-vermilion-vacuum"]
+    siblings = tree.get_wiki_tree().get_children(parent)
+    files_before = len(read_wiki())
+
+    page = api.add_page("New-Page", parent, *args)
+
+    assert page == common.WIKI_ROOT / expected
+    assert page.exists()
+    children = tree.get_wiki_tree().get_children(parent)
+    assert [child.stem for child in children if child != page] == [
+        sibling.stem for sibling in siblings
+    ]
+    assert len(tree.get_wiki_tree().pages) == len(PAGES) + 1
+    assert len(read_wiki()) == files_before + 1
+
+
+def test_add_page_renames_directories_once(RESTORE_WIKI, monkeypatch):
+    renamed = count_renames(monkeypatch)
+
+    api.add_page("New-Page", PAGES["home"], 0)
+
+    # Only the directories of the two pages under Home, not the pages in them
+    assert sorted(path.name for path in renamed) == [
+        "00_Impeach-Vermilion-Vacuum",
+        "01_Equity-Substitute-Huddle",
+    ]
+    assert not transaction.get_journal_path(common.WIKI_ROOT).exists()
+
+
+def test_add_page_rolls_back_on_error(RESTORE_WIKI, monkeypatch):
+    expected = read_wiki()
+    take_step = transaction.take_step
+
+    def fail_to_create(operation, source, destination):
+        if operation == transaction.CREATE:
+            raise OSError
+        take_step(operation, source, destination)
+
+    monkeypatch.setattr(transaction, "take_step", fail_to_create)
+    with pytest.raises(OSError):
+        api.add_page("New-Page", PAGES["home"], 0)
+
+    assert read_wiki() == expected
+    assert not transaction.get_journal_path(common.WIKI_ROOT).exists()
+
+
+# * -------------------------------------------------------------------------------- * #
+# * move_page, rename_page, and remove_page
+
+
+def get_children_names(name: str) -> list[str]:
+    """Get the names of the children of a page, after editing the wiki."""
+
+    page = utils.find_page(name)
+    return [child.stem for child in tree.get_wiki_tree().get_children(page)]
+
+
+def test_move_page(RESTORE_WIKI, monkeypatch):
+    renamed = count_renames(monkeypatch)
+
+    page = api.move_page(
+        PAGES["official-union-advantage"], PAGES["equity-substitute-huddle"], 0
+    )
+
+    assert page == (
+        PAGES["equity-substitute-huddle"].parent
+        / "00_Official-Union-Advantage"
+        / "Official-Union-Advantage.md"
+    )
+    assert get_children_names("Equity-Substitute-Huddle") == [
+        "Official-Union-Advantage",
+        "Automatic-Party-Merit",
+        "Medium-Establish-Vital",
+        "Reaction-Diagonal-Patter",
+    ]
+    assert get_children_names("Impeach-Vermilion-Vacuum") == [
+        "Measure-Transient-Respite",
+        "Middle-Pasture-Floating",
+    ]
+    assert get_children_names("Transit-Thrum-Middle") == ["Knuckle-Conversion-Wound"]
+    assert len(tree.get_wiki_tree().pages) == len(PAGES)
+    # The page, the page after it, and the three pages it was moved before
+    assert len(renamed) == 5
+
+
+MEASURE, OFFICIAL, MIDDLE = (
+    "Measure-Transient-Respite",
+    "Official-Union-Advantage",
+    "Middle-Pasture-Floating",
+)
+
+
+@m.parametrize(
+    "test_id, args, expected",
+    [
+        ("first", (MIDDLE, 0), [MIDDLE, MEASURE, OFFICIAL]),
+        ("middle", (MIDDLE, 1), [MEASURE, MIDDLE, OFFICIAL]),
+        ("last", (MEASURE,), [OFFICIAL, MIDDLE, MEASURE]),
+        ("same", (OFFICIAL, 1), [MEASURE, OFFICIAL, MIDDLE]),
+    ],
+)
+def test_move_page_among_siblings(test_id, args, expected, RESTORE_WIKI):
+    name, *position = args
+    api.move_page(PAGES[name.lower()], PAGES["impeach-vermilion-vacuum"], *position)
+    assert get_children_names("Impeach-Vermilion-Vacuum") == expected
+    assert get_children_names(MIDDLE) == ["Meridian-Preserve-Winter"]
+
+
+@m.parametrize(
+    "test_id, args",
+    [
+        ("home", (PAGES["home"], PAGES["equity-substitute-huddle"])),
+        ("itself", (PAGES["transit-thrum-middle"], PAGES["transit-thrum-middle"])),
+        (
+            "own_child",
+            (PAGES["transit-thrum-middle"], PAGES["knuckle-conversion-wound"]),
+        ),
+    ],
+)
+def test_move_page_raises(test_id, args, RESTORE_WIKI):
+    with pytest.raises(ValueError):
+        api.move_page(*args)
+
+
+def test_rename_page(RESTORE_WIKI):
+    page = api.rename_page(PAGES["transit-thrum-middle"], "New Name")
+
+    parent_dir = PAGES["official-union-advantage"].parent
+    assert page == parent_dir / "01_New-Name" / "New-Name.md"
+    assert get_children_names("Official-Union-Advantage") == [
+        "Close-Waste-Transform",
+        "New-Name",
+        "Serpentine-Hurry-Butcher",
+    ]
+    assert get_children_names("New-Name") == ["Knuckle-Conversion-Wound"]
+
+
+@m.parametrize(
+    "test_id, args",
+    [
+        ("home", (PAGES["home"], "New-Name")),
+        ("existing_name", (PAGES["transit-thrum-middle"], "slate-slide-course")),
+    ],
+)
+def test_rename_page_raises(test_id, args, RESTORE_WIKI):
+    with pytest.raises(ValueError):
+        api.rename_page(*args)
+
+
+def test_remove_page(RESTORE_WIKI):
+    api.remove_page(PAGES["official-union-advantage"])
+
+    assert get_children_names("Impeach-Vermilion-Vacuum") == [
+        "Measure-Transient-Respite",
+        "Middle-Pasture-Floating",
+    ]
+    assert len(tree.get_wiki_tree().pages) == len(PAGES) - 5
+    assert not any(
+        path.name.startswith(transaction.TEMPORARY_PREFIX)
+        for path in common.WIKI_ROOT.rglob("*")
+    )
+
+
+def test_remove_page_raises(RESTORE_WIKI):
+    with pytest.raises(ValueError):
+        api.remove_page(PAGES["home"])
+
+
+# * -------------------------------------------------------------------------------- * #
+# * resume_edit and rollback_edit
+
+
+@m.parametrize("test_id, journaled", [("journaled", True), ("not_journaled", False)])
+def test_resume_edit(test_id, journaled, RESTORE_WIKI, monkeypatch):
+    with monkeypatch.context() as patch:
+        interrupt(patch, after=1, journaled=journaled)
+        with pytest.raises(KeyboardInterrupt):
+            api.add_page("New-Page", PAGES["home"], 0)
+    with pytest.raises(transaction.InterruptedEditError):
+        api.add_page("Another-Page", PAGES["home"], 0)
+
+    assert api.resume_edit()
+
+    assert [page.stem for page in tree.get_wiki_tree().get_children(PAGES["home"])] == [
+        "New-Page",
+        "Impeach-Vermilion-Vacuum",
+        "Equity-Substitute-Huddle",
+    ]
+    assert len(tree.get_wiki_tree().pages) == len(PAGES) + 1
+    assert not api.resume_edit()
+
+
+@m.parametrize("test_id, journaled", [("journaled", True), ("not_journaled", False)])
+def test_rollback_edit(test_id, journaled, RESTORE_WIKI, monkeypatch):
+    expected = read_wiki()
+    with monkeypatch.context() as patch:
+        interrupt(patch, after=2, journaled=journaled)
+        with pytest.raises(KeyboardInterrupt):
+            api.add_page("New-Page", PAGES["home"], 0)
+    assert read_wiki() != expected
+
+    assert api.rollback_edit()
+
+    assert read_wiki() == expected
+    assert not api.rollback_edit()
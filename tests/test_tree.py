@@ -0,0 +1,286 @@
+import inspect
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import common, tree
+
+from conftest import WIKI_ROOT
+from test_api import PAGES
+
+# * ---------------------------------------- * #
+# * WikiTree
+
+
+@pytest.fixture()
+def WIKI_TREE(RESTORE_WIKI) -> tree.WikiTree:
+    return tree.WikiTree(WIKI_ROOT)
+
+
+def test_pages(WIKI_TREE):
+    assert sorted(WIKI_TREE.pages) == sorted(PAGES.values())
+
+
+def test_root_page(WIKI_TREE):
+    assert WIKI_TREE.root_page == PAGES["home"]
+
+
+@m.parametrize(
+    "test_id, page, expected",
+    [
+        ("home", PAGES["home"], 0),
+        (0, PAGES["impeach-vermilion-vacuum"], 1),
+        (1, PAGES["height-collar-detail"], 4),
+    ],
+)
+def test_get_depth(test_id, page, expected, WIKI_TREE):
+    assert WIKI_TREE.get_depth(page) == expected
+
+
+@m.parametrize(
+    "test_id, page, expected",
+    [
+        ("home", PAGES["home"], 0),
+        (0, PAGES["equity-substitute-huddle"], 1),
+        (1, PAGES["serpentine-hurry-butcher"], 2),
+    ],
+)
+def test_get_position(test_id, page, expected, WIKI_TREE):
+    assert WIKI_TREE.get_position(page) == expected
+
+
+def test_ids(WIKI_TREE):
+    assert len(WIKI_TREE) == len(PAGES)
+    for page_id, page in enumerate(WIKI_TREE.pages):
+        assert page in WIKI_TREE
+        assert WIKI_TREE.get_id(page) == page_id
+        assert WIKI_TREE.get_path(page_id) == page
+        children = [WIKI_TREE.get_path(i) for i in WIKI_TREE.get_child_ids(page_id)]
+        assert children == WIKI_TREE.get_children(page)
+
+
+def test_get_id_missing(WIKI_TREE):
+    page = WIKI_ROOT / "Missing.md"
+    assert page not in WIKI_TREE
+    assert not WIKI_TREE.get_children(page)
+    with pytest.raises(KeyError):
+        WIKI_TREE.get_id(page)
+
+
+def test_get_keys(WIKI_TREE):
+    assert WIKI_TREE.get_keys() == [
+        page.relative_to(WIKI_ROOT).as_posix() for page in WIKI_TREE.pages
+    ]
+
+
+def test_pickle(WIKI_TREE):
+    wiki_tree = pickle.loads(pickle.dumps(WIKI_TREE))
+    assert wiki_tree.ids == WIKI_TREE.ids
+    assert wiki_tree.get_nearest(PAGES["home"]) == WIKI_TREE.get_nearest(PAGES["home"])
+
+
+def test_walks_only_once(RESTORE_WIKI, monkeypatch):
+    """Family lookups are answered from the index rather than the file structure."""
+
+    tree.reset()
+    wiki_tree = tree.get_wiki_tree()
+
+    def fail(*args):
+        raise AssertionError("The file structure was globbed.")
+
+    monkeypatch.setattr(Path, "glob", fail)
+    for page in wiki_tree.pages:
+        wiki_tree.get_siblings(page)
+        wiki_tree.get_children(page)
+    assert tree.get_wiki_tree() is wiki_tree
+
+
+def test_reset(RESTORE_WIKI):
+    wiki_tree = tree.get_wiki_tree()
+    tree.reset()
+    assert tree.get_wiki_tree() is not wiki_tree
+
+
+def test_no_root_page_raises(tmp_path):
+    with pytest.raises(ValueError):
+        tree.WikiTree(tmp_path)
+
+
+# * ---------------------------------------- * #
+# * get_nearest
+
+
+@m.parametrize(
+    "test_id, page, expected",
+    [
+        (
+            "home",
+            PAGES["home"],
+            (PAGES["impeach-vermilion-vacuum"], PAGES["home"], PAGES["home"]),
+        ),
+        (
+            "first_child",
+            PAGES["measure-transient-respite"],
+            (
+                PAGES["slate-slide-course"],
+                PAGES["impeach-vermilion-vacuum"],
+                PAGES["impeach-vermilion-vacuum"],
+            ),
+        ),
+        (
+            "last_in_section",
+            PAGES["height-collar-detail"],
+            (
+                PAGES["official-union-advantage"],
+                PAGES["slate-slide-course"],
+                PAGES["slate-slide-course"],
+            ),
+        ),
+        (
+            "previous_sibling",
+            PAGES["middle-pasture-floating"],
+            (
+                PAGES["meridian-preserve-winter"],
+                PAGES["official-union-advantage"],
+                PAGES["impeach-vermilion-vacuum"],
+            ),
+        ),
+        (
+            "last_page",
+            PAGES["reaction-diagonal-patter"],
+            (
+                PAGES["home"],
+                PAGES["medium-establish-vital"],
+                PAGES["equity-substitute-huddle"],
+            ),
+        ),
+    ],
+)
+def test_get_nearest(test_id, page, expected, WIKI_TREE):
+    assert WIKI_TREE.get_nearest(page) == expected
+
+
+def test_get_preorder(WIKI_TREE):
+    preorder = WIKI_TREE.get_preorder()
+    assert preorder[0] == PAGES["home"]
+    assert preorder[1:4] == [
+        PAGES["impeach-vermilion-vacuum"],
+        PAGES["measure-transient-respite"],
+        PAGES["slate-slide-course"],
+    ]
+    assert sorted(preorder) == sorted(PAGES.values())
+
+
+def test_deep_wiki(tmp_path):
+    """Wikis nested deeper than the recursion limit can be indexed."""
+
+    depth = 300
+    (tmp_path / "Home.md").touch()
+    directory = tmp_path
+    for _ in range(depth):
+        directory = directory / "0"
+        directory.mkdir()
+        (directory / "P.md").touch()
+
+    # Leave less headroom than the depth of the wiki, but enough for the test itself
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + depth // 2)
+    try:
+        wiki_tree = tree.WikiTree(tmp_path)
+        nearest = wiki_tree.get_nearest(directory / "P.md")
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+    assert wiki_tree.get_depth(directory / "P.md") == depth
+    assert nearest[0] == wiki_tree.root_page
+
+
+# * ---------------------------------------- * #
+# * Cache
+
+
+@pytest.fixture()
+def CACHED_TREE(RESTORE_WIKI) -> tree.WikiTree:
+    """Cache the index of a wiki that was last changed a while ago."""
+
+    (WIKI_ROOT / common.CACHE_DIRNAME).mkdir()
+    age_directories(WIKI_ROOT)
+    return tree.load_wiki_tree(WIKI_ROOT)
+
+
+def age_directories(root: Path) -> None:
+    """Make every directory look like it was last changed a while ago."""
+
+    mtime = time.time() - 60
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (mtime, mtime))
+
+
+def test_load(CACHED_TREE):
+    wiki_tree = tree.WikiTree.load(WIKI_ROOT)
+    assert wiki_tree is not None
+    for name in (
+        "paths",
+        "parent_ids",
+        "first_child_ids",
+        "next_sibling_ids",
+        "positions",
+        "depths",
+        "root_page",
+    ):
+        assert getattr(wiki_tree, name) == getattr(CACHED_TREE, name)
+
+
+def test_load_without_cache_dir(RESTORE_WIKI):
+    tree.load_wiki_tree(WIKI_ROOT)
+    assert not (WIKI_ROOT / common.CACHE_DIRNAME).exists()
+    assert tree.WikiTree.load(WIKI_ROOT) is None
+
+
+def test_load_does_not_walk(CACHED_TREE, monkeypatch):
+    monkeypatch.setattr(os, "scandir", None)
+    assert tree.load_wiki_tree(WIKI_ROOT).pages == CACHED_TREE.pages
+
+
+def test_load_page_added(CACHED_TREE):
+    new_page = PAGES["transit-thrum-middle"].parent / "01_New-Page" / "New-Page.md"
+    new_page.parent.mkdir()
+    new_page.touch()
+
+    assert tree.WikiTree.load(WIKI_ROOT) is None
+    assert new_page in tree.load_wiki_tree(WIKI_ROOT).pages
+
+
+def test_load_page_edited(CACHED_TREE):
+    with open(PAGES["transit-thrum-middle"], "a") as file:
+        file.write("\nChanged\n")
+    assert tree.WikiTree.load(WIKI_ROOT) is not None
+
+
+def test_load_racy(RESTORE_WIKI):
+    """Directories changed just before the walk may change again unnoticed."""
+
+    (WIKI_ROOT / common.CACHE_DIRNAME).mkdir()
+    tree.load_wiki_tree(WIKI_ROOT)
+    assert tree.WikiTree.load(WIKI_ROOT) is None
+
+
+def test_load_names(CACHED_TREE, monkeypatch):
+    monkeypatch.setattr(os, "scandir", None)
+    names = tree.load_names(WIKI_ROOT)
+    assert names.complete("transit") == ["Transit-Thrum-Middle"]
+    assert names.names == CACHED_TREE.get_names().names
+
+
+def test_load_names_without_cache(RESTORE_WIKI):
+    assert Path(tree.load_names(WIKI_ROOT).find("Home")) == PAGES["home"]
+
+
+def test_load_other_pattern(CACHED_TREE):
+    assert tree.WikiTree.load(WIKI_ROOT, "[!_]*.markdown") is None
+    wiki_tree = tree.load_wiki_tree(WIKI_ROOT, "Home.md")
+    assert wiki_tree.pages == [PAGES["home"]]
@@ -173,6 +173,7 @@ def test_get_next(test_id, args, expected):
         ("lowercase", ("impeach-vermilion-vacuum",), PAGES["impeach-vermilion-vacuum"]),
         ("uppercase", ("Impeach-Vermilion-Vacuum",), PAGES["impeach-vermilion-vacuum"]),
         ("subpage", ("measure-transient-respite",), PAGES["measure-transient-respite"]),
+        ("spaces", ("Measure Transient Respite",), PAGES["measure-transient-respite"]),
     ],
 )
 def test_find_page(test_id, args, expected, RESTORE_WIKI):
@@ -186,6 +187,14 @@ def test_find_page_raises(test_id, args, RESTORE_WIKI):
         utils.find_page(*args)
 
 
+def test_find_page_ambiguous(RESTORE_WIKI):
+    duplicate = PAGES["equity-substitute-huddle"].parent / "03_Slate-Slide-Course"
+    duplicate.mkdir()
+    (duplicate / "Slate-Slide-Course.md").touch()
+    with pytest.raises(ValueError, match="More than one page"):
+        utils.find_page("slate-slide-course")
+
+
 # * ---------------------------------------- * #
 # * init_page
 
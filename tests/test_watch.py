@@ -0,0 +1,195 @@
+import sys
+import threading
+import time
+
+import pytest
+from pytest import mark as m
+from wikiman import common, navigation, watch
+
+from test_api import PAGES
+from test_navigation import count_parses
+
+# Give up on changes that don't show up within this long
+TIMEOUT = 5.0  # seconds
+
+# * -------------------------------------------------------------------------------- * #
+# * WatchedWiki
+
+
+@pytest.fixture()
+def WIKI(RESTORE_WIKI):
+    """A watched wiki, with its navigation up to date."""
+
+    wiki = watch.WatchedWiki(jobs=1)
+    wiki.update_all()
+    return wiki
+
+
+def test_update_heading_changed(WIKI, monkeypatch):
+    page = PAGES["close-waste-transform"]
+    with open(page, "a") as file:
+        file.write("\n## A new heading\n")
+    parsed = count_parses(monkeypatch)
+
+    report = WIKI.update({page})
+
+    assert len(parsed) == 1
+    assert report.rendered == [page]
+    assert (report.written, report.unchanged) == (1, 1)
+    assert "a-new-heading" in (page.parent / common.SIDEBAR_FILENAME).read_text()
+
+
+def test_update_body_changed(WIKI):
+    page = PAGES["close-waste-transform"]
+    with open(page, "a") as file:
+        file.write("\nJust a paragraph, no headings.\n")
+    assert not WIKI.update({page}).rendered
+
+
+def test_update_page_added(WIKI):
+    parent = PAGES["reaction-diagonal-patter"]
+    new_page = parent.parent.parent / "03_New-Page" / "New-Page.md"
+    new_page.parent.mkdir()
+    new_page.touch()
+
+    rendered = WIKI.update({new_page.parent, new_page}).rendered
+
+    assert new_page in rendered
+    assert parent in rendered
+    assert PAGES["impeach-vermilion-vacuum"] not in rendered
+
+
+def test_update_page_removed(WIKI):
+    page = PAGES["reaction-diagonal-patter"]
+    for file in page.parent.iterdir():
+        file.unlink()
+    page.parent.rmdir()
+
+    rendered = WIKI.update({page.parent}).rendered
+
+    assert PAGES["medium-establish-vital"] in rendered
+    assert "Reaction" not in (page.parent.parent / common.SIDEBAR_FILENAME).read_text()
+
+
+@m.parametrize(
+    "test_id, path",
+    [
+        ("sidebar", PAGES["home"].parent / common.SIDEBAR_FILENAME),
+        ("hidden", PAGES["home"].parent / common.CACHE_DIRNAME / "manifest.json"),
+        ("not_a_page", PAGES["home"].parent / "image.png"),
+    ],
+)
+def test_update_ignored(test_id, path, WIKI):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text("Changed")
+    assert watch.get_change(path) is None
+    assert not WIKI.update({path}).rendered
+
+
+# * -------------------------------------------------------------------------------- * #
+# * Watchers
+
+
+@m.parametrize(
+    "test_id, poll",
+    [
+        ("polling", True),
+        pytest.param(
+            "inotify",
+            False,
+            marks=m.skipif(not sys.platform.startswith("linux"), reason="Linux only"),
+        ),
+    ],
+)
+def test_watcher(test_id, poll, RESTORE_WIKI):
+    watcher = watch.get_watcher(common.WIKI_ROOT, poll, interval=0.01)
+    expected_type = watch.PollingWatcher if poll else watch.InotifyWatcher
+    try:
+        assert isinstance(watcher, expected_type)
+
+        page = PAGES["close-waste-transform"]
+        with open(page, "a") as file:
+            file.write("\nChanged\n")
+        assert page in read_until(watcher, page)
+
+        # Directories created after watching started are watched, too
+        new_page = page.parent / "00_New-Page" / "New-Page.md"
+        new_page.parent.mkdir()
+        read_until(watcher, new_page.parent)
+        new_page.touch()
+        assert new_page in read_until(watcher, new_page)
+    finally:
+        watcher.close()
+
+
+def read_until(watcher, path) -> set:
+    """Read changes from a watcher until a path changes."""
+
+    changes: set = set()
+    deadline = time.monotonic() + TIMEOUT
+    while path not in changes and time.monotonic() < deadline:
+        changes |= watcher.read(0.1)
+    return changes
+
+
+def test_polling_watcher_interval(RESTORE_WIKI, monkeypatch):
+    clock = [0.0]  # A clock that only moves on when sleeping
+
+    def sleep(seconds: float) -> None:
+        clock[0] += seconds
+
+    snapshots: list = []
+    take_snapshot = watch.take_snapshot
+
+    def record(root):
+        snapshots.append(root)
+        return take_snapshot(root)
+
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(time, "sleep", sleep)
+    monkeypatch.setattr(watch, "take_snapshot", record)
+
+    watcher = watch.PollingWatcher(common.WIKI_ROOT, interval=5.0)
+    while clock[0] < 12:
+        watcher.read(watch.WAKE_INTERVAL)
+
+    # When watching starts, then after 5 and 10 seconds
+    assert len(snapshots) == 3
+
+
+# * -------------------------------------------------------------------------------- * #
+# * watch
+
+
+@m.parametrize("test_id, poll", [("polling", True), ("default", False)])
+def test_watch(test_id, poll, RESTORE_WIKI):
+    reports: list[navigation.Report] = []
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch.watch,
+        kwargs=dict(
+            jobs=1, poll=poll, interval=0.01, on_update=reports.append, stop=stop
+        ),
+    )
+    thread.start()
+    try:
+        wait_for(lambda: reports)
+        page = PAGES["close-waste-transform"]
+        with open(page, "a") as file:
+            file.write("\n## A new heading\n")
+        wait_for(lambda: len(reports) > 1)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert reports[-1].rendered == [page]
+    assert "a-new-heading" in (page.parent / common.SIDEBAR_FILENAME).read_text()
+
+
+def wait_for(condition) -> None:
+    """Wait for a condition to hold."""
+
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
@@ -0,0 +1,140 @@
+import os
+from pathlib import Path
+
+import pytest
+from pytest import mark as m
+from wikiman import writer
+
+# * ---------------------------------------- * #
+# * write_if_changed
+
+
+@m.parametrize(
+    "test_id, existing, text, expected",
+    [
+        ("missing", None, "text", True),
+        ("same", "text", "text", False),
+        ("different_length", "text", "longer text", True),
+        ("same_length", "text", "tent", True),
+    ],
+)
+def test_write_if_changed(test_id, existing, text, expected, tmp_path):
+    path = tmp_path / "file.md"
+    if existing is not None:
+        path.write_bytes(writer.encode(existing))
+    result = writer.write_if_changed(path, text)
+    assert result == expected
+    assert path.read_bytes() == writer.encode(text)
+
+
+def test_write_if_changed_atomic(tmp_path):
+    path = tmp_path / "file.md"
+    path.write_bytes(b"old")
+    writer.write_if_changed(path, "text", atomic=True)
+    assert path.read_bytes() == writer.encode("text")
+    assert [file.name for file in tmp_path.iterdir()] == ["file.md"]
+
+
+def test_write_atomically_keeps_file_on_error(tmp_path, monkeypatch):
+    path = tmp_path / "file.md"
+    path.write_bytes(b"old")
+
+    def fail(*args):
+        raise OSError
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        writer.write_atomically(path, b"new")
+
+    assert [file.name for file in tmp_path.iterdir()] == ["file.md"]
+    assert path.read_bytes() == b"old"
+
+
+# * ---------------------------------------- * #
+# * Writer
+
+
+@m.parametrize("test_id, threads", [("threads", 4), ("inline", 0)])
+def test_writer(test_id, threads, tmp_path):
+    paths = [tmp_path / f"{index}.md" for index in range(100)]
+    paths[0].write_bytes(writer.encode("text 0"))
+
+    with writer.Writer(threads=threads, queue_size=2) as file_writer:
+        for index, path in enumerate(paths):
+            file_writer.write(path, f"text {index}")
+
+    assert sorted(file_writer.changed) == sorted(paths[1:])
+    assert file_writer.unchanged == 1
+    assert all(path.read_text() == f"text {i}" for i, path in enumerate(paths))
+
+
+def test_writer_raises(tmp_path):
+    with pytest.raises(OSError):
+        with writer.Writer() as file_writer:
+            file_writer.write(tmp_path / "missing" / "file.md", "text")
+
+
+@m.parametrize(
+    "test_id, durability, expected",
+    [
+        ("none", writer.NONE, (0, 0)),
+        ("file", writer.FILE, (2, 2)),
+        ("end", writer.END, (2, 1)),
+    ],
+)
+def test_writer_durability(test_id, durability, expected, tmp_path, monkeypatch):
+    fsyncs: list[int] = []
+    directories: list[Path] = []
+    monkeypatch.setattr(os, "fsync", fsyncs.append)
+    monkeypatch.setattr(writer, "sync_directory", directories.append)
+
+    with writer.Writer(durability) as file_writer:
+        file_writer.write(tmp_path / "a.md", "a")
+        file_writer.write(tmp_path / "b.md", "b")
+
+    assert (len(fsyncs), len(directories)) == expected
+    assert set(directories) <= {tmp_path}
+
+
+def test_sync(tmp_path, monkeypatch):
+    paths = [tmp_path / "a.md", tmp_path / "b" / "b.md"]
+    paths[1].parent.mkdir()
+    for path in paths:
+        path.write_text("text")
+    descriptors: list[int] = []
+    monkeypatch.setattr(os, "fsync", descriptors.append)
+    monkeypatch.setattr(
+        os, "sync", lambda: pytest.fail("Flushed every file system."), raising=False
+    )
+
+    writer.sync(paths)
+
+    # Each file, and each of their directories unless they can't be opened on Windows
+    assert len(descriptors) == 2 + 2 * (os.name != "nt")
+
+
+def test_writer_unknown_durability():
+    with pytest.raises(ValueError):
+        writer.Writer("sometimes")
+
+
+@m.parametrize("test_id, threads", [("inline", 0), ("threads", 2)])
+def test_checker(test_id, threads, tmp_path):
+    paths = [tmp_path / f"{index}.md" for index in range(3)]
+    paths[0].write_text("text 0")
+    paths[1].write_text("old")
+
+    with writer.Checker(threads=threads) as checker:
+        for index, path in enumerate(paths):
+            checker.write(path, f"text {index}")
+
+    assert sorted(checker.changed) == paths[1:]
+    assert checker.unchanged == 1
+    assert paths[1].read_text() == "old"
+    assert not paths[2].exists()
+
+
+def test_checker_fail_fast(tmp_path):
+    with pytest.raises(writer.StaleFileError):
+        with writer.Checker(fail_fast=True) as checker:
+            checker.write(tmp_path / "file.md", "text")